@@ -0,0 +1,204 @@
+"""
+Adaptadores de plataforma para el motor de extracción (engine.py).
+
+Cada adaptador describe una plataforma sin tocar el navegador: qué elementos forman el feed,
+el script que lee todos los visibles en una sola llamada, cómo se cierra su ventana emergente,
+cómo se identifica cada elemento (para no repetirlo) y cómo se convierte al esquema de salida.
+El motor se encarga de todo lo demás (navegador, scroll, esperas, reintentos, métricas y salida),
+así que cualquier mejora del motor sirve a todas las plataformas a la vez.
+"""
+import abc
+import json
+
+from engagement import MENTION_PATTERN, extract_number
+from sinks import CSV_FIELDNAMES, FACEBOOK_COLUMNS, TWEET_COLUMNS
+from timeline import TWEET_SNAPSHOT_JS, TimelineCollector, account_name_from_url, tweet_from_snapshot
+from twitter_html import extract_status_id
+
+# Lee todas las publicaciones visibles de una página de Facebook; devuelve un arreglo JSON
+FACEBOOK_SNAPSHOT_JS = """
+function findSpan(post, pattern, useText) {
+    var spans = post.querySelectorAll(useText ? 'span' : 'span[aria-label]');
+    for (var i = 0; i < spans.length; i++) {
+        var value = useText ? spans[i].textContent : spans[i].getAttribute('aria-label');
+        if (value && pattern.test(value)) {
+            return value;
+        }
+    }
+    return '';
+}
+
+var posts = [];
+document.querySelectorAll('div[role="article"]').forEach(function (post) {
+    var textElement = post.querySelector('div[data-ad-preview*="message"], div[class*="userContent"]');
+    var linkElement = post.querySelector('a[href*="/posts/"]');
+    var dateElement = linkElement && linkElement.querySelector('span span');
+    posts.push({
+        text: textElement ? textElement.innerText : null,
+        date: dateElement ? dateElement.innerText : '',
+        url: linkElement ? linkElement.href : '',
+        labels: {
+            reactions: findSpan(post, /reaction|Reacciones/, false),
+            comments: findSpan(post, /comment|Comentarios/, false),
+            shares: findSpan(post, /compart|share/, true)
+        }
+    });
+});
+return JSON.stringify(posts);
+"""
+
+# Ventanas emergentes: inicio de sesión de X y aviso de cookies de Facebook
+CLOSE_X_POPUP_JS = """
+var button = document.querySelector('[data-testid="modal-close"], [role="button"][aria-label*="Close"], button[aria-label*="Close"]');
+if (button) {
+    button.click();
+    return true;
+}
+return false;
+"""
+CLOSE_FACEBOOK_POPUP_JS = """
+var buttons = document.querySelectorAll('div[aria-label*="Allow all cookies"], div[role="button"]');
+for (var i = 0; i < buttons.length; i++) {
+    var label = buttons[i].getAttribute('aria-label') || buttons[i].textContent || '';
+    if (label.indexOf('Allow all cookies') !== -1) {
+        buttons[i].click();
+        return true;
+    }
+}
+return false;
+"""
+
+class PlatformAdapter(abc.ABC):
+    """Interfaz de un adaptador; las subclases definen los atributos y los métodos de su plataforma."""
+    name = None
+    columns = None           # Esquema tipado de los registros (para ParquetSink)
+    fieldnames = None        # Columnas de los CSV
+    ready_selector = None    # Aparece cuando la página ya cargó
+    item_selector = None     # Elementos del feed que se agregan al hacer scroll
+    snapshot_js = None       # Devuelve en JSON los elementos visibles
+    popup_js = None          # Cierra la ventana emergente si aparece (devuelve true si cerró algo)
+    scroll_js = "window.scrollBy(0, Math.floor(window.innerHeight * 0.9));"
+
+    def job_name(self, url):
+        """Nombre por defecto de una cuenta o página a partir de su URL."""
+        return account_name_from_url(url)
+
+    @abc.abstractmethod
+    def item_key(self, raw):
+        """Identificador de un elemento crudo para no procesarlo dos veces (vacío si no se puede)."""
+
+    @abc.abstractmethod
+    def new_collector(self, job, state_store=None, recovered=None, on_add=None):
+        """
+        Acumulador que decide qué elementos se guardan y cuándo termina el recorrido.
+        recovered son registros ya extraídos antes de una interrupción; on_add recibe cada registro nuevo.
+        """
+
+    @abc.abstractmethod
+    def add(self, collector, raw, job):
+        """Convertir un elemento crudo y pasarlo al acumulador; devuelve False para terminar."""
+
+    def after_save(self, job, records, state_store=None):
+        """Actualizar el estado persistente después de guardar los registros de una cuenta."""
+        pass
+
+class TwitterAdapter(PlatformAdapter):
+    name = 'x'
+    columns = TWEET_COLUMNS
+    fieldnames = CSV_FIELDNAMES
+    ready_selector = '[data-testid="tweet"], article, [data-testid="cellInnerDiv"]'
+    item_selector = '[data-testid="cellInnerDiv"], article'
+    snapshot_js = TWEET_SNAPSHOT_JS
+    popup_js = CLOSE_X_POPUP_JS
+
+    def item_key(self, raw):
+        return extract_status_id(raw.get('url'))
+
+    def new_collector(self, job, state_store=None, recovered=None, on_add=None):
+        # Extracción incremental: solo los tweets posteriores a la última ejecución
+        since_id = state_store.get_last_status_id(job.name) if state_store else None
+        return TimelineCollector(job.limit, since_id, recovered=recovered, on_add=on_add)
+
+    def add(self, collector, raw, job):
+        if raw.get('promoted'):
+            return True
+        return collector.add(tweet_from_snapshot(raw, job.name), bool(raw.get('context')))
+
+    def after_save(self, job, records, state_store=None):
+        if not state_store:
+            return
+        status_ids = [int(extract_status_id(record['url'])) for record in records if extract_status_id(record['url'])]
+        if status_ids:
+            state_store.update_last_status_id(job.name, max(status_ids))
+
+class PostCollector:
+    def __init__(self, limit, keywords=None, recovered=None, on_add=None):
+        """
+        Acumular hasta limit publicaciones, solo las que mencionan alguna palabra clave (si se dan).
+        recovered y on_add funcionan como en timeline.TimelineCollector; las publicaciones
+        recuperadas se reconocen por fecha y texto.
+        """
+        self.limit = limit
+        self.keywords = [keyword.lower() for keyword in keywords or []]
+        self.records = list(recovered or [])
+        self.recovered_keys = {(record['date'], record['text']) for record in self.records}
+        self.on_add = on_add
+        self.finished = len(self.records) >= limit
+
+    def matches(self, text):
+        """Verificar si el texto (en minúsculas) menciona alguna palabra clave."""
+        return not self.keywords or any(keyword in text for keyword in self.keywords)
+
+    def add(self, record):
+        """Agregar una publicación; devuelve False al llegar al límite."""
+        if self.finished:
+            return False
+        if (record['date'], record['text']) in self.recovered_keys:
+            return True
+        self.records.append(record)
+        if self.on_add:
+            self.on_add(record)
+        if len(self.records) >= self.limit:
+            self.finished = True
+            return False
+        return True
+
+class FacebookAdapter(PlatformAdapter):
+    name = 'facebook'
+    columns = FACEBOOK_COLUMNS
+    fieldnames = [name for name, _ in FACEBOOK_COLUMNS]
+    ready_selector = 'div[role="article"]'
+    item_selector = 'div[role="article"]'
+    snapshot_js = FACEBOOK_SNAPSHOT_JS
+    popup_js = CLOSE_FACEBOOK_POPUP_JS
+    scroll_js = "window.scrollTo(0, document.body.scrollHeight);"
+
+    def item_key(self, raw):
+        # Las publicaciones sin texto (anuncios, recuadros de sugerencias) no se extraen
+        if raw.get('text') is None:
+            return ""
+        return raw.get('url') or json.dumps([raw.get('date'), raw.get('text')])
+
+    def new_collector(self, job, state_store=None, recovered=None, on_add=None):
+        return PostCollector(job.limit, job.keywords, recovered, on_add)
+
+    def add(self, collector, raw, job):
+        text = raw['text'].lower()
+        if not collector.matches(text):
+            return True
+        labels = raw.get('labels') or {}
+        return collector.add({
+            'page': job.name,
+            'date': raw.get('date') or "Unknown",
+            'text': text[:200],  # Texto recortado, como hasta ahora
+            'reactions': extract_number(labels.get('reactions')),
+            'comments': extract_number(labels.get('comments')),
+            'shares': extract_number(labels.get('shares')),
+            'mentions': len(MENTION_PATTERN.findall(text))  # Sin contar direcciones de correo
+        })
+
+# Adaptadores disponibles por nombre de plataforma
+ADAPTERS = {
+    'x': TwitterAdapter(),
+    'facebook': FacebookAdapter()
+}
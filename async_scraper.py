@@ -0,0 +1,385 @@
+"""
+Motor asíncrono para raspar muchas cuentas de X con un solo navegador.
+
+AsyncTwitterScraper habla directamente con Chrome por el protocolo DevTools (CDP) sobre un
+websocket y reparte las cuentas entre varias pestañas del mismo proceso. Mientras una pestaña
+espera la red, las demás siguen trabajando, así que un solo Chrome rinde más cuentas por hora
+que un Chrome por worker. Mantiene el contrato de TwitterScraper:
+    await scraper.scrape_account(account_url, num_tweets)
+devuelve la misma lista de tweets, extraídos con el snapshot JavaScript (como el modo "js").
+Las visitas de todas las pestañas se reparten el limitador de ritmo de X (ver ratelimit), y un muro
+de inicio de sesión o un desafío terminan la espera de carga y frenan el ritmo.
+Las URLs pueden apuntar a un servidor HTTP local de prueba.
+
+Uso: python async_scraper.py
+"""
+import asyncio
+import datetime
+import json
+import logging
+import os
+import random
+import urllib.request
+
+from browser_session import SESSION_DIR, is_port_open, launch_debuggable_chrome
+from ratelimit import BLOCK_SIGNALS, PAGE_STATE_JS, get_rate_limiter
+from resource_blocking import blocked_url_patterns
+from sinks import CsvSink, save_extraction_summary
+from timeline import (TWEET_SNAPSHOT_JS, TIMELINE_OBSERVER_JS, TimelineCollector, account_name_from_url,
+                      tweet_from_snapshot, wrap_script)
+from twitter_html import extract_status_id
+
+try:
+    import websockets
+except ImportError:  # websockets solo es necesario para el motor asíncrono
+    websockets = None
+
+logger = logging.getLogger(__name__)
+
+# Argumentos con los que se lanza Chrome si no hay uno escuchando en el puerto
+CHROME_ARGUMENTS = [
+    "--headless=new",
+    "--no-sandbox",
+    "--disable-gpu",
+    "--window-size=1920,1080",
+    "--disable-notifications",
+    "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+]
+
+# Selectores que indican que el timeline ya cargó
+READY_SELECTOR = '[data-testid="tweet"], article, [data-testid="cellInnerDiv"]'
+
+# Cerrar la ventana emergente de inicio de sesión si aparece
+CLOSE_POPUP_JS = """
+var button = document.querySelector('[data-testid="modal-close"], [role="button"][aria-label*="Close"], button[aria-label*="Close"]');
+if (button) {
+    button.click();
+    return true;
+}
+return false;
+"""
+
+SCROLL_VIEWPORT_JS = "window.scrollBy(0, Math.floor(window.innerHeight * 0.9)); return true;"
+
+class CDPError(Exception):
+    """Error devuelto por Chrome a un comando CDP."""
+
+def browser_websocket_url(port):
+    """Obtener la URL del websocket del navegador que escucha en el puerto de depuración."""
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=5) as response:
+        return json.load(response)['webSocketDebuggerUrl']
+
+class CDPConnection:
+    def __init__(self, ws_url):
+        """Conexión única con el navegador; los comandos de cada pestaña viajan con su sessionId."""
+        self.ws_url = ws_url
+        self.websocket = None
+        self.reader = None
+        self.next_id = 0
+        self.pending = {}
+
+    async def connect(self):
+        """Abrir el websocket y empezar a leer respuestas."""
+        if websockets is None:
+            raise ImportError("Se necesita websockets para el motor asíncrono: pip install websockets")
+        self.websocket = await websockets.connect(self.ws_url, max_size=None)
+        self.reader = asyncio.create_task(self.read_messages())
+
+    async def read_messages(self):
+        """Entregar cada respuesta al comando que la espera (los eventos se ignoran)."""
+        try:
+            async for raw_message in self.websocket:
+                message = json.loads(raw_message)
+                future = self.pending.pop(message.get('id'), None)
+                if future is None or future.done():
+                    continue
+                if 'error' in message:
+                    future.set_exception(CDPError(message['error'].get('message', 'error desconocido')))
+                else:
+                    future.set_result(message.get('result', {}))
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("La conexión con el navegador se cerró"))
+            self.pending.clear()
+
+    async def send(self, method, params=None, session_id=None):
+        """Enviar un comando CDP y esperar su resultado."""
+        self.next_id += 1
+        message = {'id': self.next_id, 'method': method, 'params': params or {}}
+        if session_id:
+            message['sessionId'] = session_id
+
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        await self.websocket.send(json.dumps(message))
+        return await future
+
+    async def close(self):
+        """Cerrar el websocket (el navegador sigue abierto)."""
+        if self.websocket is not None:
+            await self.websocket.close()
+        if self.reader is not None:
+            await self.reader
+
+class CDPTab:
+    def __init__(self, connection, target_id, session_id):
+        """Pestaña del navegador controlada a través de la conexión compartida."""
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+
+    @classmethod
+    async def create(cls, connection):
+        """Abrir una pestaña nueva y adjuntarse a ella."""
+        target = await connection.send('Target.createTarget', {'url': 'about:blank'})
+        session = await connection.send('Target.attachToTarget', {'targetId': target['targetId'], 'flatten': True})
+        return cls(connection, target['targetId'], session['sessionId'])
+
+    async def send(self, method, params=None):
+        """Enviar un comando CDP a esta pestaña."""
+        return await self.connection.send(method, params, self.session_id)
+
+    async def evaluate(self, script, *args):
+        """Ejecutar un script con 'return' (como execute_script, con args en arguments) y devolver su valor."""
+        expression = wrap_script(script)
+        if args:
+            expression = f"(function () {{{script}}}).apply(null, {json.dumps(list(args))})"
+        result = await self.send('Runtime.evaluate', {'expression': expression, 'returnByValue': True})
+        if result.get('exceptionDetails'):
+            raise CDPError(result['exceptionDetails'].get('text', 'error de JavaScript'))
+        return result.get('result', {}).get('value')
+
+    async def block_urls(self, patterns):
+        """Bloquear en esta pestaña las URLs que coinciden con los patrones (Network.setBlockedURLs)."""
+        await self.send('Network.enable')
+        await self.send('Network.setBlockedURLs', {'urls': patterns})
+
+    async def navigate(self, url):
+        """Navegar a la URL dada."""
+        await self.send('Page.navigate', {'url': url})
+
+    async def close(self):
+        """Cerrar la pestaña."""
+        await self.connection.send('Target.closeTarget', {'targetId': self.target_id})
+
+class AsyncTwitterScraper:
+    def __init__(self, num_tabs=4, debugger_port=9222, profile_dir=None, max_wait=5, page_load_timeout=15,
+                 delay_range=None, blocking_profile="none", rate_limiter=None):
+        """
+        Configurar el motor asíncrono.
+        num_tabs: pestañas que trabajan a la vez en el mismo navegador.
+        debugger_port: puerto de depuración del Chrome compartido (se lanza si no hay uno escuchando).
+        max_wait: máximo de segundos que se espera a que el timeline cargue contenido nuevo tras un scroll.
+        delay_range: pausa fija opcional de cada pestaña entre una cuenta y la siguiente.
+        blocking_profile: recursos que las pestañas no descargan ("none", "media" o "lite").
+        rate_limiter: limitador de ritmo común a todas las pestañas; por defecto, el compartido de X.
+        """
+        self.num_tabs = num_tabs
+        self.debugger_port = debugger_port
+        self.profile_dir = os.path.abspath(profile_dir or os.path.join(SESSION_DIR, f"async_{debugger_port}"))
+        self.max_wait = max_wait
+        self.page_load_timeout = page_load_timeout
+        self.delay_range = delay_range
+        self.rate_limiter = rate_limiter or get_rate_limiter('x')
+        self.blocked_patterns = blocked_url_patterns(blocking_profile)
+        self.connection = None
+        self.tabs = None
+        self.all_tabs = []
+
+    async def start(self):
+        """Conectarse al navegador (lanzándolo si hace falta) y abrir las pestañas."""
+        if not is_port_open(self.debugger_port):
+            await asyncio.to_thread(launch_debuggable_chrome, self.debugger_port, self.profile_dir, CHROME_ARGUMENTS)
+
+        ws_url = await asyncio.to_thread(browser_websocket_url, self.debugger_port)
+        self.connection = CDPConnection(ws_url)
+        await self.connection.connect()
+
+        self.tabs = asyncio.Queue()
+        self.all_tabs = [await CDPTab.create(self.connection) for _ in range(self.num_tabs)]
+        for tab in self.all_tabs:
+            # El navegador es compartido, así que el bloqueo se aplica por pestaña y no con preferencias
+            if self.blocked_patterns:
+                await tab.block_urls(self.blocked_patterns)
+            self.tabs.put_nowait(tab)
+        return self
+
+    async def close(self):
+        """Cerrar las pestañas propias y la conexión; el navegador queda abierto para otras ejecuciones."""
+        for tab in self.all_tabs:
+            try:
+                await tab.close()
+            except CDPError:
+                pass
+        self.all_tabs = []
+        if self.connection is not None:
+            await self.connection.close()
+            self.connection = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def poll(self, tab, script, timeout, interval=0.1):
+        """Evaluar script cada interval segundos hasta que devuelva un valor verdadero o pase timeout."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            if await tab.evaluate(script):
+                return True
+            if asyncio.get_running_loop().time() >= deadline:
+                return False
+            await asyncio.sleep(interval)
+
+    async def page_state(self, tab, timeout, interval=0.2):
+        """Esperar (como máximo timeout) a que la página muestre el feed o un bloqueo y devolver su estado."""
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            state = await tab.evaluate(PAGE_STATE_JS, READY_SELECTOR, BLOCK_SIGNALS['x'])
+            if state or asyncio.get_running_loop().time() >= deadline:
+                return state
+            await asyncio.sleep(interval)
+
+    async def open_account_page(self, tab, account_url):
+        """
+        Abrir el perfil en la pestaña, esperar a que aparezcan tweets y cerrar el popup de inicio de sesión.
+        La visita espera su turno en el limitador de ritmo y le informa el estado de la página.
+        """
+        # acquire duerme hasta el turno, así que va a un hilo para no frenar a las demás pestañas
+        await asyncio.to_thread(self.rate_limiter.acquire)
+        await tab.navigate(account_url)
+        logger.info("Accediendo a: %s", account_url)
+
+        state = await self.page_state(tab, self.page_load_timeout)
+        self.rate_limiter.record(state)
+        if state != 'ok':
+            logger.warning("No se pudo cargar la página correctamente%s: %s",
+                           f" (estado: {state})" if state else "", account_url)
+            return False
+
+        if await tab.evaluate(CLOSE_POPUP_JS):
+            logger.debug("Ventana emergente cerrada")
+        return True
+
+    async def scroll_one_viewport(self, tab):
+        """Desplazar una pantalla y esperar (como máximo max_wait) a que se rendericen tweets nuevos."""
+        marker = await tab.evaluate(TIMELINE_OBSERVER_JS) or 0
+        await tab.evaluate(SCROLL_VIEWPORT_JS)
+        await self.poll(tab, f"return (window.__scraperTimelineChanges || 0) > {int(marker)};", self.max_wait)
+        await tab.evaluate(CLOSE_POPUP_JS)
+
+    async def snapshot_new_tweets(self, tab, account_handle, seen_ids):
+        """Leer con una sola evaluación los tweets visibles que aún no se han visto."""
+        raw_json = await tab.evaluate(TWEET_SNAPSHOT_JS)
+        new_tweets = []
+        for snapshot in json.loads(raw_json) if raw_json else []:
+            status_id = extract_status_id(snapshot.get('url'))
+            if not status_id or status_id in seen_ids:
+                continue
+            seen_ids.add(status_id)
+            if snapshot.get('promoted'):
+                continue
+            new_tweets.append((tweet_from_snapshot(snapshot, account_handle), bool(snapshot.get('context'))))
+        return new_tweets
+
+    async def scrape_account(self, account_url, num_tweets=20, max_scrolls=None):
+        """
+        Raspar tweets de una cuenta en la primera pestaña libre, con las mismas reglas que TwitterScraper.
+        Con delay_range, la pestaña vuelve al grupo después de la pausa, sin retrasar el resultado.
+        """
+        tab = await self.tabs.get()
+        try:
+            return await self.scrape_account_in_tab(tab, account_url, num_tweets, max_scrolls)
+        except Exception as e:
+            logger.error("Error global al raspar cuenta %s: %s", account_url, e)
+            return []
+        finally:
+            if self.delay_range:
+                delay = random.uniform(*self.delay_range)
+                asyncio.get_running_loop().call_later(delay, self.tabs.put_nowait, tab)
+            else:
+                self.tabs.put_nowait(tab)
+
+    async def scrape_account_in_tab(self, tab, account_url, num_tweets, max_scrolls):
+        """Recorrer el timeline de la cuenta en la pestaña dada."""
+        if not await self.open_account_page(tab, account_url):
+            return []
+
+        # Límite de seguridad: cada scroll avanza aproximadamente una pantalla
+        if max_scrolls is None:
+            max_scrolls = max(10, num_tweets * 2)
+
+        account_handle = account_name_from_url(account_url)
+        collector = TimelineCollector(num_tweets)
+        scrolls_without_new = 0
+
+        for scroll in range(max_scrolls + 1):
+            new_tweets = await self.snapshot_new_tweets(tab, account_handle, collector.seen_ids)
+            for tweet_data, has_context in new_tweets:
+                if not collector.add(tweet_data, has_context):
+                    break
+
+            if collector.finished:
+                break
+
+            # Si varios scrolls seguidos no traen tweets nuevos, llegamos al final del timeline
+            scrolls_without_new = 0 if new_tweets else scrolls_without_new + 1
+            if scrolls_without_new >= 3:
+                logger.info("No se cargaron tweets nuevos en los últimos scrolls de %s", account_handle)
+                break
+
+            if scroll < max_scrolls:
+                await self.scroll_one_viewport(tab)
+
+        logger.info("Total de tweets válidos extraídos de %s: %d", account_handle, len(collector.tweets))
+        return collector.tweets
+
+    async def scrape_multiple_accounts(self, account_urls, output_dir='twitter_data', num_tweets_per_account=20,
+                                       sink=None):
+        """
+        Raspar todas las cuentas repartidas entre las pestañas y guardar los mismos archivos que
+        TwitterScraper.scrape_multiple_accounts (uno por cuenta y el resumen de la extracción).
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        sink = sink or CsvSink(output_dir)
+
+        async def scrape_and_save(url):
+            account_handle = account_name_from_url(url)
+            tweets = await self.scrape_account(url, num_tweets_per_account)
+            if not tweets:
+                logger.warning("No se pudieron extraer tweets de la cuenta %s", account_handle)
+                return account_handle, 0
+            try:
+                # La escritura va a un hilo para que las pestañas sigan trabajando
+                output_file = await asyncio.to_thread(sink.write, account_handle, tweets, timestamp)
+                logger.info("Datos de %s guardados en %s", account_handle, output_file)
+            except Exception as e:
+                logger.error("Error al guardar el archivo de salida para %s: %s", account_handle, e)
+            return account_handle, len(tweets)
+
+        results = await asyncio.gather(*(scrape_and_save(url) for url in account_urls))
+        sink.close()
+
+        accounts_stats = {account_handle: count for account_handle, count in results if count}
+        save_extraction_summary(accounts_stats, output_dir, timestamp)
+        return accounts_stats
+
+async def main():
+    # Lista de cuentas a raspar
+    accounts = [
+        "https://x.com/BurgerKingMX",
+        "https://x.com/KFC_MEXICO",
+        "https://x.com/littlecaesarsmx"
+    ]
+
+    async with AsyncTwitterScraper(num_tabs=3, blocking_profile="lite") as scraper:
+        await scraper.scrape_multiple_accounts(accounts, "twitter_extracciones", 20)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    asyncio.run(main())
@@ -0,0 +1,577 @@
+"""
+Banco de pruebas de rendimiento sin acceso a la red.
+
+FakeTimelineServer sirve en localhost timelines de scroll infinito con la misma estructura que
+esperan los scrapers:
+- X: celdas [data-testid="cellInnerDiv"] con article[data-testid="tweet"], tweetText, time[datetime],
+  enlace /status/, contenedores de media y contadores con aria-label. La página pide los tweets a
+  /i/api/graphql/bench/UserTweets con el mismo JSON que la API real, así que el modo "network"
+  también tiene respuestas que leer.
+- Facebook: publicaciones div[role="article"] con el texto, la fecha y los contadores que busca scrape_page.
+Se configuran los tweets por cuenta, los tweets por página de la API, la latencia de cada página
+y la carga diferida (con lazy, cada página se pide al acercarse al final; sin lazy, todas al cargar).
+
+Para cada modo de extracción se informa: tweets por segundo, llamadas a WebDriver por tweet,
+tiempo por fase (carga, scroll, descubrimiento, cada extract_*) y pico de memoria (RSS) del navegador.
+
+Uso: python benchmark.py [--modes dom,js,network] [--tweets 100] [--latency 0.2] [--facebook]
+     python benchmark.py --serve  (solo el servidor, para probar a mano o con async_scraper)
+     python benchmark.py --serve --proxies 3 [--proxy-block-rate 0.2]  (y proxies locales para identities)
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ratelimit import AdaptiveRateLimiter
+from recycling import browser_pid, process_tree_rss
+from scripts import load_facebook_scraper, load_twitter_scraper
+
+try:
+    import psutil
+except ImportError:  # psutil solo es necesario para medir la memoria del navegador
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # resource no existe en Windows
+    resource = None
+
+# Primer ID de estado del timeline falso; los siguientes son decrecientes, como en X
+BASE_STATUS_ID = 1790000000000000000
+
+# Minutos entre un tweet (o publicación) y el siguiente del timeline falso
+POST_INTERVAL_MINUTES = 90
+
+# Segundos entre muestras de memoria del navegador
+RSS_SAMPLE_INTERVAL = 0.1
+
+# Imagen GIF de 1x1 que se sirve para la media falsa
+PIXEL_GIF = bytes.fromhex('47494638396101000100800000000000ffffff21f90401000000002c00000000010001000002024401003b')
+
+# Estructura común de las páginas: carga las páginas de la API y las agrega al final del documento
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="es">
+<head>
+<meta charset="utf-8">
+<title>%(title)s</title>
+<style>
+body { margin: 0; font-family: sans-serif; }
+#feed { width: 600px; margin: 0 auto; }
+.item { min-height: 280px; border-bottom: 1px solid #ccc; padding: 12px; box-sizing: border-box; }
+.media { width: 100%%; height: 120px; background: #eee; }
+</style>
+</head>
+<body>
+<main role="main"><div id="feed" aria-label="Timeline"></div></main>
+<script>
+var API_URL = %(api_url)s;
+var LAZY = %(lazy)s;
+var state = {cursor: '0', loading: false};
+
+%(render_js)s
+
+function nearBottom() {
+    return window.innerHeight + window.scrollY >= document.body.scrollHeight - 2 * window.innerHeight;
+}
+
+function loadMore() {
+    if (state.loading || state.cursor === null) {
+        return;
+    }
+    state.loading = true;
+    var separator = API_URL.indexOf('?') === -1 ? '?' : '&';
+    fetch(API_URL + separator + 'cursor=' + state.cursor)
+        .then(function (response) { return response.json(); })
+        .then(function (payload) {
+            state.cursor = render(payload);
+            state.loading = false;
+            if (!LAZY || nearBottom()) {
+                loadMore();
+            }
+        });
+}
+
+window.addEventListener('scroll', function () {
+    if (nearBottom()) {
+        loadMore();
+    }
+});
+loadMore();
+</script>
+</body>
+</html>
+"""
+
+# Convierte una respuesta UserTweets en celdas del timeline; devuelve el cursor siguiente (o null)
+TWITTER_RENDER_JS = """
+function compact(n) {
+    if (n >= 1000000) { return (n / 1000000).toFixed(1) + 'M'; }
+    if (n >= 1000) { return (n / 1000).toFixed(1) + 'K'; }
+    return String(n);
+}
+
+function stat(testid, count, label) {
+    var text = compact(count);
+    return '<div aria-label="' + text + ' ' + label + '"><div role="button" data-testid="' + testid + '">' +
+        '<span>' + (count ? text : '') + '</span></div></div>';
+}
+
+function render(payload) {
+    var feed = document.getElementById('feed');
+    var next = null;
+    var instructions = payload.data.user.result.timeline_v2.timeline.instructions;
+    instructions.forEach(function (instruction) {
+        (instruction.entries || []).forEach(function (entry) {
+            if (entry.content.cursorType === 'Bottom') {
+                next = entry.content.value;
+                return;
+            }
+            var tweet = entry.content.itemContent.tweet_results.result;
+            var legacy = tweet.legacy;
+            var handle = tweet.core.user_results.result.legacy.screen_name;
+            var cell = document.createElement('div');
+            cell.setAttribute('data-testid', 'cellInnerDiv');
+            cell.innerHTML = '<article data-testid="tweet" class="item">' +
+                '<div data-testid="tweetText" lang="es" dir="auto">' + legacy.full_text + '</div>' +
+                '<a href="/' + handle + '/status/' + legacy.id_str + '">' +
+                '<time datetime="' + new Date(legacy.created_at).toISOString() + '">' + legacy.created_at + '</time></a>' +
+                (legacy.entities.media ? '<div data-testid="tweetPhoto"><img class="media" src="' +
+                    legacy.entities.media[0].media_url_https + '"></div>' : '') +
+                '<div role="group">' +
+                stat('reply', legacy.reply_count, 'respuestas. Responder') +
+                stat('retweet', legacy.retweet_count, 'reposts. Repostear') +
+                stat('like', legacy.favorite_count, 'Me gusta. Me gusta') +
+                stat('bookmark', legacy.bookmark_count, 'elementos guardados. Guardar') +
+                '</div></article>';
+            feed.appendChild(cell);
+        });
+    });
+    return next;
+}
+"""
+
+# Convierte una página de publicaciones falsas de Facebook en div[role="article"]
+FACEBOOK_RENDER_JS = """
+function render(payload) {
+    var feed = document.getElementById('feed');
+    payload.posts.forEach(function (post) {
+        var article = document.createElement('div');
+        article.setAttribute('role', 'article');
+        article.className = 'item';
+        article.innerHTML = '<a href="' + post.url + '"><span><span>' + post.date + '</span></span></a>' +
+            '<div data-ad-preview="message">' + post.text + '</div>' +
+            (post.media ? '<img class="media" src="' + post.media + '">' : '') +
+            '<span aria-label="Reacciones: ' + post.reactions + '">' + post.reactions + '</span> ' +
+            '<span aria-label="' + post.comments + ' Comentarios">' + post.comments + ' comentarios</span> ' +
+            '<span>' + post.shares + ' veces compartido</span>';
+        feed.appendChild(article);
+    });
+    return payload.next;
+}
+"""
+
+def fake_post_fields(index):
+    """Contadores, fecha y media deterministas de la publicación número index (0 es la más reciente)."""
+    created = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=POST_INTERVAL_MINUTES * index)
+    return {
+        'status_id': str(BASE_STATUS_ID - index * 1000),
+        'created_at': created,
+        'replies': index % 50,
+        'retweets': (index * 37) % 1500,
+        'likes': (index * 911) % 25000,
+        'bookmarks': index % 7,
+        'has_media': index % 3 == 0
+    }
+
+def fake_tweet_result(handle, index):
+    """Resultado de tweet con el formato de la API GraphQL de X."""
+    fields = fake_post_fields(index)
+    legacy = {
+        'id_str': fields['status_id'],
+        'full_text': f"Tweet {index} de {handle} #benchmark @{handle} https://example.com/{index}",
+        'created_at': fields['created_at'].strftime('%a %b %d %H:%M:%S +0000 %Y'),
+        'reply_count': fields['replies'],
+        'retweet_count': fields['retweets'],
+        'favorite_count': fields['likes'],
+        'bookmark_count': fields['bookmarks'],
+        'entities': {}
+    }
+    if fields['has_media']:
+        legacy['entities']['media'] = [{'media_url_https': f"/media/{fields['status_id']}.gif"}]
+    return {
+        '__typename': 'Tweet',
+        'rest_id': fields['status_id'],
+        'core': {'user_results': {'result': {'legacy': {'screen_name': handle}}}},
+        'legacy': legacy
+    }
+
+def fake_timeline_payload(handle, cursor, total, page_size):
+    """Página de una respuesta UserTweets desde la posición cursor, con su cursor inferior si quedan tweets."""
+    end = min(cursor + page_size, total)
+    entries = [
+        {
+            'entryId': f"tweet-{BASE_STATUS_ID - index * 1000}",
+            'content': {'itemContent': {'tweet_results': {'result': fake_tweet_result(handle, index)}}}
+        }
+        for index in range(cursor, end)
+    ]
+    if end < total:
+        entries.append({'entryId': f"cursor-bottom-{end}", 'content': {'cursorType': 'Bottom', 'value': str(end)}})
+    return {'data': {'user': {'result': {'timeline_v2': {'timeline': {
+        'instructions': [{'type': 'TimelineAddEntries', 'entries': entries}]
+    }}}}}}
+
+def fake_facebook_payload(page, cursor, total, page_size):
+    """Página de publicaciones falsas de Facebook; todas mencionan CDMX para pasar el filtro de palabras clave."""
+    end = min(cursor + page_size, total)
+    posts = []
+    for index in range(cursor, end):
+        fields = fake_post_fields(index)
+        posts.append({
+            'url': f"/{page}/posts/{fields['status_id']}",
+            'date': f"{index + 1} h",
+            'text': f"Publicación {index} de {page} en CDMX @{page} #benchmark",
+            'media': f"/media/{fields['status_id']}.gif" if fields['has_media'] else None,
+            'reactions': f"{fields['likes'] / 1000:.1f} mil".replace('.', ',') if fields['likes'] >= 1000 else str(fields['likes']),
+            'comments': fields['replies'],
+            'shares': fields['bookmarks']
+        })
+    return {'posts': posts, 'next': str(end) if end < total else None}
+
+class FakeTimelineHandler(BaseHTTPRequestHandler):
+    """Rutas del servidor falso: /{cuenta}, /facebook/{pagina}, sus APIs JSON y /media/."""
+
+    def do_GET(self):
+        config = self.server.config
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        cursor = int((query.get('cursor') or ['0'])[0])
+        parts = [part for part in url.path.split('/') if part]
+
+        if url.path.startswith('/i/api/graphql/') and url.path.endswith('/UserTweets'):
+            time.sleep(config['latency'])
+            handle = (query.get('handle') or ['bench'])[0]
+            self.send_json(fake_timeline_payload(handle, cursor, config['tweets'], config['page_size']))
+        elif len(parts) == 3 and parts[:2] == ['api', 'facebook']:
+            time.sleep(config['latency'])
+            self.send_json(fake_facebook_payload(parts[2], cursor, config['tweets'], config['page_size']))
+        elif parts and parts[0] == 'media':
+            self.send_body(PIXEL_GIF, 'image/gif')
+        elif len(parts) == 2 and parts[0] == 'facebook':
+            self.send_page(parts[1], json.dumps(f"/api/facebook/{parts[1]}"), FACEBOOK_RENDER_JS)
+        elif len(parts) == 1 and parts[0] != 'favicon.ico':
+            api_url = json.dumps(f"/i/api/graphql/bench/UserTweets?handle={parts[0]}")
+            self.send_page(parts[0], api_url, TWITTER_RENDER_JS)
+        else:
+            self.send_error(404)
+
+    def send_page(self, title, api_url, render_js):
+        """Enviar la página HTML que carga el timeline desde api_url."""
+        page = PAGE_TEMPLATE % {
+            'title': title,
+            'api_url': api_url,
+            'lazy': 'true' if self.server.config['lazy'] else 'false',
+            'render_js': render_js
+        }
+        self.send_body(page.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def send_json(self, payload):
+        """Enviar una respuesta JSON."""
+        self.send_body(json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def send_body(self, body, content_type):
+        """Enviar una respuesta 200 con el cuerpo dado."""
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        """No mostrar cada petición en la consola."""
+        pass
+
+class FakeTimelineServer:
+    def __init__(self, tweets=200, page_size=20, latency=0.2, lazy=True, port=0):
+        """
+        Servidor HTTP local con timelines falsos de X y Facebook.
+        tweets: tweets (o publicaciones) por cuenta; page_size: tweets por respuesta de la API;
+        latency: segundos que tarda cada respuesta de la API; lazy: pedir cada página al acercarse al final.
+        Con port=0 se elige un puerto libre.
+        """
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), FakeTimelineHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = {'tweets': tweets, 'page_size': page_size, 'latency': latency, 'lazy': lazy}
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def url(self, path):
+        """URL completa de una ruta del servidor."""
+        return f"http://127.0.0.1:{self.port}/{path.lstrip('/')}"
+
+    def start(self):
+        """Atender peticiones en un hilo de fondo."""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Detener el servidor."""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+# Página que devuelve un proxy falso al simular un bloqueo (la reconoce ratelimit.PAGE_STATE_JS)
+BLOCKED_PAGE = b"<html><head><title>Rate limit exceeded</title></head><body>Rate limit exceeded</body></html>"
+
+class MockProxyHandler(BaseHTTPRequestHandler):
+    """Proxy HTTP mínimo: reenvía cada GET a la URL absoluta pedida, con latencia y bloqueos simulados."""
+
+    def do_GET(self):
+        config = self.server.config
+        time.sleep(config['latency'])
+        if random.random() < config['block_rate']:
+            self.send_response(429)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(BLOCKED_PAGE)))
+            self.end_headers()
+            self.wfile.write(BLOCKED_PAGE)
+            return
+
+        try:
+            with urllib.request.urlopen(self.path, timeout=30) as response:
+                status, content_type, body = response.status, response.headers.get('Content-Type'), response.read()
+        except urllib.error.HTTPError as e:
+            status, content_type, body = e.code, e.headers.get('Content-Type'), e.read()
+        except OSError:
+            self.send_error(502)
+            return
+        self.send_response(status)
+        self.send_header('Content-Type', content_type or 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MockProxyServer(FakeTimelineServer):
+    def __init__(self, latency=0.0, block_rate=0.0, port=0):
+        """
+        Proxy HTTP local para probar el pool de identidades (identities.IdentityPool) sin proxies reales.
+        latency: segundos agregados a cada petición; block_rate: fracción de peticiones que reciben
+        una página de bloqueo en lugar de la respuesta real.
+        """
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), MockProxyHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = {'latency': latency, 'block_rate': block_rate}
+        self.thread = None
+
+    @property
+    def proxy_url(self):
+        """Dirección para --proxy-server o Identity(proxy=..., proxy_loopback=True)."""
+        return f"http://127.0.0.1:{self.port}"
+
+class PeakRssSampler:
+    def __init__(self, pid):
+        """Muestrear en segundo plano la memoria del proceso pid y de todos sus descendientes."""
+        self.pid = pid
+        self.peak = 0
+        self.running = False
+        self.thread = None
+
+    def sample(self):
+        """RSS total (bytes) del árbol de procesos."""
+        return process_tree_rss(self.pid) or 0
+
+    def run(self):
+        while self.running:
+            self.peak = max(self.peak, self.sample())
+            time.sleep(RSS_SAMPLE_INTERVAL)
+
+    def start(self):
+        """Empezar a muestrear (sin psutil no se mide nada)."""
+        if psutil is None or self.pid is None:
+            return self
+        self.running = True
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Dejar de muestrear y devolver el pico en MB (None si no se pudo medir)."""
+        if self.thread is None:
+            return None
+        self.running = False
+        self.thread.join()
+        return round(self.peak / (1024 * 1024), 1)
+
+def python_peak_rss_mb():
+    """Pico de memoria del propio proceso de Python en MB (None si no se puede medir)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB y macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def build_result(name, record, browser_rss):
+    """Completar el registro de metrics.ScrapeMetrics con el ritmo y la memoria."""
+    record = dict(record, modo=name)
+    record['tweets_por_segundo'] = round(record['tweets'] / record['segundos'], 2) if record['segundos'] else 0
+    record['rss_navegador_mb'] = browser_rss
+    record['rss_python_mb'] = python_peak_rss_mb()
+    return record
+
+def unlimited_rate_limiter():
+    """Limitador sin pausas: el servidor local no bloquea y el benchmark mide solo el scraper."""
+    return AdaptiveRateLimiter(rate=1000, min_rate=1000, max_rate=1000, increase=0, base_backoff=0,
+                               max_backoff=0, burst=1000, jitter=0, name="benchmark")
+
+def benchmark_twitter_mode(server, mode, accounts, num_tweets, max_wait=5, blocking_profile="none"):
+    """
+    Raspar las cuentas del servidor falso con TwitterScraper en el modo dado y devolver sus métricas.
+    Usa la instrumentación propia del scraper (fases de carga, scroll, descubrimiento y cada extract_*).
+    """
+    scraper_module = load_twitter_scraper()
+    scraper = scraper_module.TwitterScraper(headless=True, extraction_mode=mode, max_wait=max_wait,
+                                            blocking_profile=blocking_profile, rate_limiter=unlimited_rate_limiter())
+    sampler = PeakRssSampler(browser_pid(scraper.driver)).start()
+
+    items = 0
+    scraper.metrics.start_account(mode)
+    try:
+        for account in accounts:
+            items += len(scraper.scrape_account(server.url(account), num_tweets))
+    finally:
+        record = scraper.metrics.finish_account(items)
+        browser_rss = sampler.stop()
+        scraper.session.close()
+    return build_result(mode, record, browser_rss)
+
+def benchmark_facebook(server, pages, num_posts, blocking_profile="none"):
+    """
+    Raspar las páginas falsas con el navegador del scraper de Facebook y el motor común
+    (el mismo recorrido que scrape_page, sin reintentos) y devolver sus métricas.
+    """
+    from browser_session import BrowserSession
+    from engine import EngineWorker, ScrapeJob
+
+    facebook = load_facebook_scraper()
+    facebook.HEADLESS_MODE = True
+    facebook.BLOCKING_PROFILE = blocking_profile
+    facebook.SESSION = BrowserSession()  # Perfil temporal, sin tocar el perfil real
+
+    driver = facebook.setup_driver()
+    worker = EngineWorker(driver, max_wait=facebook.SCROLL_PAUSE_TIME, page_load_timeout=facebook.INITIAL_LOAD_TIME,
+                          rate_limiters={'facebook': unlimited_rate_limiter()})
+    sampler = PeakRssSampler(browser_pid(driver)).start()
+
+    items = 0
+    worker.metrics.start_account('facebook')
+    try:
+        for page in pages:
+            job = ScrapeJob('facebook', server.url(f"facebook/{page}"), page, limit=num_posts,
+                            keywords=facebook.KEYWORDS)
+            items += len(worker.collect(job))
+    finally:
+        record = worker.metrics.finish_account(items)
+        browser_rss = sampler.stop()
+        facebook.SESSION.close()
+    return build_result('facebook', record, browser_rss)
+
+def print_results(results):
+    """Mostrar una tabla con las métricas de cada modo."""
+    print(f"\n{'='*50}")
+    for result in results:
+        print(f"Modo {result['modo']}: {result['tweets']} tweets en {result['segundos']} s "
+              f"({result['tweets_por_segundo']} tweets/s)")
+        print(f"  Llamadas a WebDriver: {result['llamadas_webdriver']} ({result['llamadas_por_tweet']} por tweet)")
+        for phase, seconds in sorted(result['fases'].items(), key=lambda item: -item[1]):
+            print(f"  - {phase}: {seconds} s, {result['llamadas_por_fase'].get(phase, 0)} llamadas")
+        print(f"  Pico de RSS: navegador {result['rss_navegador_mb']} MB, Python {result['rss_python_mb']} MB")
+    print(f"{'='*50}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los scrapers contra un timeline falso local")
+    parser.add_argument('--modes', default='dom,js,network', help="modos de TwitterScraper separados por comas")
+    parser.add_argument('--accounts', default='bench_a,bench_b', help="cuentas falsas separadas por comas")
+    parser.add_argument('--tweets', type=int, default=60, help="tweets a extraer por cuenta")
+    parser.add_argument('--available', type=int, default=None, help="tweets que ofrece cada cuenta (por defecto --tweets + 20)")
+    parser.add_argument('--page-size', type=int, default=20, help="tweets por respuesta de la API falsa")
+    parser.add_argument('--latency', type=float, default=0.2, help="segundos de latencia de cada respuesta")
+    parser.add_argument('--eager', action='store_true', help="cargar todas las páginas al abrir, sin esperar al scroll")
+    parser.add_argument('--max-wait', type=float, default=5, help="máximo de espera tras cada scroll")
+    parser.add_argument('--blocking', default='none', help="perfil de bloqueo de recursos (none, media, lite)")
+    parser.add_argument('--facebook', action='store_true', help="incluir el scraper de Facebook")
+    parser.add_argument('--output', help="guardar los resultados en un archivo JSON")
+    parser.add_argument('--serve', action='store_true', help="solo levantar el servidor falso")
+    parser.add_argument('--port', type=int, default=0, help="puerto del servidor falso")
+    parser.add_argument('--proxies', type=int, default=0, help="con --serve, proxies locales para el pool de identidades")
+    parser.add_argument('--proxy-latency', type=float, default=0.0, help="segundos agregados por cada proxy local")
+    parser.add_argument('--proxy-block-rate', type=float, default=0.0,
+                        help="fracción de peticiones que cada proxy local responde con una página de bloqueo")
+    parser.add_argument('--verbose', action='store_true', help="mostrar la salida de los scrapers")
+    args = parser.parse_args()
+
+    # Sin --verbose solo se muestran los avisos y errores de los scrapers
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING, format="%(message)s")
+
+    accounts = [account for account in args.accounts.split(',') if account]
+    server = FakeTimelineServer(tweets=args.available or args.tweets + 20, page_size=args.page_size,
+                                latency=args.latency, lazy=not args.eager, port=args.port)
+
+    with server:
+        if args.serve:
+            print(f"Timeline falso de X en {server.url(accounts[0])}")
+            print(f"Página falsa de Facebook en {server.url('facebook/' + accounts[0])}")
+            proxies = [MockProxyServer(args.proxy_latency, args.proxy_block_rate).start() for _ in range(args.proxies)]
+            if proxies:
+                # Lista lista para guardar y cargar con identities.load_identity_pool
+                # proxy_loopback: el timeline falso está en localhost, que Chrome no envía al proxy por defecto
+                identities = [{'name': f"proxy_{i + 1}", 'proxy': proxy.proxy_url, 'proxy_loopback': True}
+                              for i, proxy in enumerate(proxies)]
+                print(f"Identidades con proxies locales: {json.dumps(identities)}")
+            print("Ctrl+C para terminar")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                return
+            finally:
+                for proxy in proxies:
+                    proxy.stop()
+
+        results = []
+        for mode in [mode for mode in args.modes.split(',') if mode]:
+            print(f"Midiendo el modo {mode}...")
+            results.append(benchmark_twitter_mode(server, mode, accounts, args.tweets, args.max_wait, args.blocking))
+        if args.facebook:
+            print("Midiendo el scraper de Facebook...")
+            results.append(benchmark_facebook(server, accounts, args.tweets, args.blocking))
+
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"Resultados guardados en {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Sesiones de Chrome reutilizables entre ejecuciones.
+
+BrowserSession arranca el navegador con un perfil persistente (--user-data-dir), de modo que
+la caché, las cookies y el inicio de sesión se conservan entre ejecuciones, y guarda la ruta
+del chromedriver para no resolverla en cada arranque. Con debugger_port se conecta a un Chrome
+que ya está corriendo (lo lanza la primera vez y lo deja abierto), así las ejecuciones
+periódicas se ahorran por completo el arranque del navegador.
+"""
+import json
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import time
+
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import SessionNotCreatedException
+
+try:
+    from webdriver_manager.chrome import ChromeDriverManager
+except ImportError:  # Sin webdriver_manager, Selenium resuelve el driver por su cuenta
+    ChromeDriverManager = None
+
+from resource_blocking import add_image_prefs
+
+logger = logging.getLogger(__name__)
+
+# Directorio por defecto para perfiles y caché del driver
+SESSION_DIR = ".browser_session"
+DRIVER_CACHE_FILE = os.path.join(SESSION_DIR, "chromedriver.json")
+
+# Ejecutables de Chrome que se prueban al lanzar un navegador para conectarse a él
+CHROME_BINARIES = ['google-chrome', 'google-chrome-stable', 'chromium', 'chromium-browser', 'chrome']
+
+# Segundos que se espera a que un Chrome recién lanzado abra su puerto de depuración
+DEBUGGER_STARTUP_TIMEOUT = 15
+
+# User-agent de escritorio para reducir la probabilidad de bloqueo
+DEFAULT_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                      "Chrome/121.0.0.0 Safari/537.36")
+
+def build_chrome_options(headless=False, user_agent=DEFAULT_USER_AGENT, proxy=None, arguments=(),
+                         blocking_profile="none", hide_automation=True, proxy_loopback=False):
+    """
+    Opciones de Chrome comunes a todos los scrapers.
+    arguments agrega argumentos propios de cada plataforma (idioma, tamaño de ventana...);
+    blocking_profile desactiva las imágenes si el perfil de bloqueo lo pide (ver resource_blocking).
+    proxy_loopback hace pasar también por el proxy las páginas de localhost (solo para los proxies
+    locales de prueba de benchmark, que sirven un timeline falso en localhost).
+    """
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")  # Modo headless más reciente
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-notifications")
+    for argument in arguments:
+        chrome_options.add_argument(argument)
+    if proxy:
+        chrome_options.add_argument(f"--proxy-server={proxy}")
+        if proxy_loopback:
+            # Chrome no pasa por el proxy para localhost salvo que se indique
+            chrome_options.add_argument("--proxy-bypass-list=<-loopback>")
+    if user_agent:
+        chrome_options.add_argument(f"user-agent={user_agent}")
+
+    # Configuraciones para evitar detección
+    if hide_automation:
+        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    add_image_prefs(chrome_options, blocking_profile)
+    return chrome_options
+
+def cached_driver_path(cache_file=DRIVER_CACHE_FILE, refresh=False):
+    """
+    Devolver la ruta del chromedriver guardada en cache_file, o instalarlo y guardarla.
+    Devuelve None si no hay webdriver_manager (Selenium elegirá el driver).
+    """
+    env_path = os.environ.get('CHROMEDRIVER_PATH')
+    if env_path:
+        return env_path
+
+    if not refresh:
+        try:
+            with open(cache_file, encoding='utf-8') as f:
+                path = json.load(f).get('path')
+            if path and os.path.exists(path):
+                return path
+        except (OSError, ValueError):
+            pass
+
+    if ChromeDriverManager is None:
+        return None
+
+    path = ChromeDriverManager().install()
+    os.makedirs(os.path.dirname(cache_file) or '.', exist_ok=True)
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'path': path}, f)
+    return path
+
+def is_port_open(port, host='127.0.0.1'):
+    """Verificar si hay algo escuchando en el puerto dado."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.settimeout(0.5)
+        return sock.connect_ex((host, port)) == 0
+
+def find_chrome_binary():
+    """Buscar el ejecutable de Chrome (CHROME_BINARY tiene prioridad)."""
+    env_binary = os.environ.get('CHROME_BINARY')
+    if env_binary:
+        return env_binary
+    for name in CHROME_BINARIES:
+        path = shutil.which(name)
+        if path:
+            return path
+    return None
+
+def launch_debuggable_chrome(port, profile_dir, arguments=()):
+    """
+    Lanzar un Chrome independiente con el puerto de depuración remota y esperar a que lo abra.
+    El navegador sigue abierto cuando termina el script, para que otras ejecuciones se conecten a él.
+    """
+    binary = find_chrome_binary()
+    if not binary:
+        raise RuntimeError("No se encontró el ejecutable de Chrome (defina CHROME_BINARY)")
+
+    os.makedirs(profile_dir, exist_ok=True)
+    command = [binary, f"--remote-debugging-port={port}", f"--user-data-dir={profile_dir}"]
+    for arg in arguments:
+        # chromedriver acepta argumentos sin "--" (como "user-agent=..."), Chrome en línea de comandos no
+        arg = arg if arg.startswith("--") else f"--{arg}"
+        if not arg.startswith("--user-data-dir"):
+            command.append(arg)
+
+    # El navegador queda fuera del grupo de procesos del script para sobrevivir a la ejecución
+    subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    logger.info("Navegador lanzado en el puerto %d", port)
+
+    deadline = time.time() + DEBUGGER_STARTUP_TIMEOUT
+    while not is_port_open(port):
+        if time.time() > deadline:
+            raise RuntimeError(f"Chrome no abrió el puerto {port}")
+        time.sleep(0.2)
+
+class BrowserSession:
+    def __init__(self, profile_dir=None, debugger_port=None, driver_cache_file=DRIVER_CACHE_FILE):
+        """
+        Configurar una sesión de navegador.
+        profile_dir: directorio de perfil persistente (None para un perfil temporal, como antes).
+        debugger_port: si se indica, conectarse al Chrome que escucha en ese puerto en lugar de lanzar uno nuevo.
+        """
+        if debugger_port and not profile_dir:
+            profile_dir = os.path.join(SESSION_DIR, f"profile_{debugger_port}")
+        self.profile_dir = os.path.abspath(profile_dir) if profile_dir else None
+        self.debugger_port = debugger_port
+        self.driver_cache_file = driver_cache_file
+        self.driver = None
+
+    def start(self, chrome_options=None):
+        """Iniciar (o conectarse a) el navegador y devolver el WebDriver."""
+        chrome_options = chrome_options or Options()
+
+        if self.debugger_port:
+            self.ensure_browser_running(chrome_options)
+            chrome_options = self.attach_options(chrome_options)
+        elif self.profile_dir:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            chrome_options.add_argument(f"--user-data-dir={self.profile_dir}")
+
+        try:
+            self.driver = self.create_driver(chrome_options, refresh=False)
+        except SessionNotCreatedException:
+            # El driver guardado puede no coincidir con un Chrome actualizado; se resuelve de nuevo
+            logger.warning("No se pudo crear la sesión con el driver guardado, se busca uno nuevo")
+            self.driver = self.create_driver(chrome_options, refresh=True)
+        return self.driver
+
+    def create_driver(self, chrome_options, refresh):
+        """Crear el WebDriver con la ruta de chromedriver en caché."""
+        driver_path = cached_driver_path(self.driver_cache_file, refresh=refresh)
+        if driver_path:
+            return webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+        return webdriver.Chrome(options=chrome_options)
+
+    def attach_options(self, chrome_options):
+        """
+        Opciones para conectarse a un Chrome existente.
+        chromedriver rechaza excludeSwitches y similares junto con debuggerAddress, así que solo
+        se conservan las capacidades de logging.
+        """
+        attach_options = Options()
+        attach_options.add_experimental_option("debuggerAddress", f"127.0.0.1:{self.debugger_port}")
+        logging_prefs = chrome_options.to_capabilities().get("goog:loggingPrefs")
+        if logging_prefs:
+            attach_options.set_capability("goog:loggingPrefs", logging_prefs)
+        return attach_options
+
+    def ensure_browser_running(self, chrome_options):
+        """Lanzar un Chrome independiente con el puerto de depuración si todavía no hay uno."""
+        if is_port_open(self.debugger_port):
+            logger.info("Conectando al navegador existente en el puerto %d", self.debugger_port)
+            return
+        launch_debuggable_chrome(self.debugger_port, self.profile_dir, chrome_options.arguments)
+
+    def restart(self, chrome_options=None):
+        """
+        Reemplazar el navegador por uno nuevo para liberar la memoria acumulada y devolver el WebDriver.
+        chrome_options deben ser opciones nuevas (start les agrega el perfil). Con perfil persistente
+        las cookies quedan en el perfil; con perfil temporal se copian al navegador nuevo. Con un
+        navegador compartido (debugger_port) solo se reemplaza la pestaña, porque el navegador sigue
+        atendiendo otras ejecuciones.
+        """
+        if self.driver is None:
+            return self.start(chrome_options)
+
+        if self.debugger_port:
+            old_tab = self.driver.current_window_handle
+            self.driver.switch_to.new_window('tab')
+            new_tab = self.driver.current_window_handle
+            self.driver.switch_to.window(old_tab)
+            self.driver.close()
+            self.driver.switch_to.window(new_tab)
+            return self.driver
+
+        cookies = []
+        if not self.profile_dir:
+            try:
+                cookies = self.driver.execute_cdp_cmd('Network.getAllCookies', {}).get('cookies', [])
+            except Exception as e:
+                logger.warning("No se pudieron copiar las cookies del navegador: %s", e)
+        self.close()
+        driver = self.start(chrome_options)
+        if cookies:
+            driver.execute_cdp_cmd('Network.setCookies', {'cookies': cookies})
+        return driver
+
+    def close(self):
+        """Cerrar la sesión; un navegador compartido se deja abierto para la siguiente ejecución."""
+        if self.driver is None:
+            return
+        try:
+            if self.debugger_port:
+                self.driver.service.stop()
+            else:
+                self.driver.quit()
+        except Exception:
+            pass
+        self.driver = None
@@ -0,0 +1,132 @@
+"""
+Diario de avance (write-ahead) para reanudar extracciones por lotes interrumpidas.
+
+Cada tweet o publicación extraída se agrega de inmediato a un archivo de líneas JSON (con fsync),
+y al guardar una cuenta se registra como terminada junto con sus métricas. Si Chrome o el proceso
+se caen a mitad del lote, la siguiente ejecución con el mismo diario:
+- reutiliza el timestamp del lote, así que los archivos de salida son los mismos;
+- salta las cuentas terminadas (su total y sus métricas siguen en el resumen);
+- retoma la cuenta interrumpida con lo que ya se había extraído y solo busca lo que falta.
+Al terminar el lote completo, el diario se borra.
+
+En memoria solo se lleva cuántos registros tiene cada cuenta; los registros de una cuenta se leen
+del diario cuando se reanuda, así que la memoria no crece con el tamaño del lote.
+
+Eventos del diario: {"evento": "inicio", "timestamp"}, {"evento": "registro", "cuenta", "datos"}
+y {"evento": "fin", "cuenta", "total", "metricas"}.
+"""
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+class CheckpointJournal:
+    def __init__(self, path):
+        """Abrir el diario path; si existe (ejecución interrumpida), cargar su avance."""
+        self.path = path
+        self.lock = threading.Lock()
+        self.timestamp = None
+        self.record_counts = defaultdict(int)
+        self.completed = {}
+        self.file = None
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        """Leer el diario existente; una última línea incompleta (escrita durante la caída) se descarta."""
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        complete_length = content.rfind(b'\n') + 1
+        if complete_length < len(content):
+            with open(self.path, 'r+b') as f:
+                f.truncate(complete_length)
+
+        for line in content[:complete_length].decode('utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            event = entry.get('evento')
+            if event == 'inicio':
+                self.timestamp = entry['timestamp']
+            elif event == 'registro':
+                self.record_counts[entry['cuenta']] += 1
+            elif event == 'fin':
+                self.completed[entry['cuenta']] = (entry['total'], entry.get('metricas'))
+
+    def write_entry(self, entry):
+        """Agregar un evento al diario y forzarlo a disco."""
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.file = open(self.path, 'a', encoding='utf-8')
+        self.file.write(json.dumps(entry, ensure_ascii=False, default=str) + '\n')
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def begin(self, timestamp):
+        """
+        Empezar el lote con timestamp, o reanudar el lote interrumpido.
+        Devuelve el timestamp que debe usar la salida (el del lote original al reanudar).
+        """
+        with self.lock:
+            if self.timestamp:
+                pending = sum(1 for account in self.record_counts if account not in self.completed)
+                logger.info("Reanudando la extracción %s: %d cuentas terminadas, %d a medias",
+                            self.timestamp, len(self.completed), pending)
+                return self.timestamp
+            self.timestamp = timestamp
+            self.write_entry({'evento': 'inicio', 'timestamp': timestamp})
+            return timestamp
+
+    def is_done(self, account):
+        """Verificar si la cuenta ya se guardó en este lote."""
+        with self.lock:
+            return account in self.completed
+
+    def result(self, account):
+        """Total guardado y métricas de una cuenta terminada."""
+        with self.lock:
+            return self.completed[account]
+
+    def records(self, account):
+        """
+        Registros ya extraídos de la cuenta en este lote (de una cuenta terminada o a medias),
+        leídos del diario.
+        """
+        with self.lock:
+            if not self.record_counts.get(account) or not os.path.exists(self.path):
+                return []
+            records = []
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry.get('evento') == 'registro' and entry.get('cuenta') == account:
+                        records.append(entry['datos'])
+            return records
+
+    def append(self, account, record):
+        """Registrar un tweet o publicación extraída en cuanto se extrae."""
+        with self.lock:
+            self.record_counts[account] += 1
+            self.write_entry({'evento': 'registro', 'cuenta': account, 'datos': record})
+
+    def finish(self, account, total, metrics=None):
+        """Marcar la cuenta como guardada, con su total y sus métricas para el resumen."""
+        with self.lock:
+            self.completed[account] = (total, metrics)
+            self.write_entry({'evento': 'fin', 'cuenta': account, 'total': total, 'metricas': metrics})
+
+    def close(self, complete=True):
+        """Cerrar el diario; con complete (el lote terminó) se borra para que el siguiente lote empiece de cero."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            if complete and os.path.exists(self.path):
+                os.remove(self.path)
@@ -0,0 +1,173 @@
+"""
+Conversión de los contadores de interacción (respuestas, retweets, me gusta...) a números.
+
+Compartido por los scrapers de X y de Facebook. Reconoce sufijos en español e inglés
+("10.2K", "1,2 mil", "3 M", "2 millones", "1.5 thousand") y separadores de miles en ambos
+idiomas ("1,234 Likes", "1.234 Me gusta"). Como los contadores son enteros, un separador
+seguido de exactamente tres dígitos y sin sufijo se toma como separador de miles; en cualquier
+otro caso el último separador es el decimal.
+
+extract_number convierte una etiqueta; normalize_labels convierte una columna completa de
+etiquetas de una sola vez con pandas/NumPy. Una etiqueta abreviada ("10.2K") pierde precisión;
+is_abbreviated la reconoce por su sufijo, y los extractores anotan en ABBREVIATED_KEY qué contadores
+de un registro salieron de una (ver enrichment).
+HASHTAG_PATTERN, MENTION_PATTERN y URL_PATTERN reconocen las entidades del texto que cuentan
+los adaptadores y el post-procesamiento.
+
+Uso: python engagement.py  (verifica la tabla de casos conocidos)
+"""
+import re
+
+try:
+    import numpy as np
+    import pandas as pd
+except ImportError:  # pandas y NumPy solo son necesarios para normalize_labels
+    np = None
+    pd = None
+
+# Clave de un registro con los contadores que salieron de etiquetas abreviadas (no se guarda en la salida)
+ABBREVIATED_KEY = 'contadores_abreviados'
+
+# Multiplicador de cada sufijo (en minúsculas)
+SUFFIX_MULTIPLIERS = {
+    'k': 1000,
+    'mil': 1000,
+    'thousand': 1000,
+    'm': 1000000,
+    'mill': 1000000,
+    'millon': 1000000,
+    'millón': 1000000,
+    'millones': 1000000,
+    'million': 1000000,
+    'millions': 1000000,
+    'mil millones': 1000000000,
+    'b': 1000000000,
+    'billion': 1000000000
+}
+
+# Primer número de la etiqueta con su sufijo opcional; las alternativas largas van primero
+# para que "mil millones" no se lea como "mil" y el sufijo debe terminar en límite de palabra
+# para no confundir "5 Me gusta" con "5 M"
+LABEL_PATTERN = re.compile(
+    r'(?P<number>\d+(?:[.,]\d+)*)'
+    r'(?:\s*(?P<suffix>mil\s+millones|millones|millón|millon|millions|million|mill|mil|thousand|billion|[kmb])(?!\w))?',
+    re.IGNORECASE
+)
+
+# Separa el último grupo de dígitos ("1,234,567" -> "1,234" y "567")
+LAST_GROUP_PATTERN = re.compile(r'^(?P<head>.*?)(?:[.,](?P<tail>\d+))?$')
+
+# Separadores de miles o decimales
+SEPARATOR_PATTERN = re.compile(r'[.,]')
+
+# Entidades del texto de un tweet o publicación; una mención no puede seguir a una palabra,
+# así que no se cuentan las direcciones de correo
+HASHTAG_PATTERN = re.compile(r'(?<![\w&])#(\w+)')
+MENTION_PATTERN = re.compile(r'(?<![\w.@])@(\w+)')
+URL_PATTERN = re.compile(r'https?://[^\s<>"]+|www\.[^\s<>"]+', re.IGNORECASE)
+
+# Tabla de casos conocidos: etiqueta cruda y valor esperado
+KNOWN_LABELS = [
+    (None, 0),
+    ("", 0),
+    ("Reply", 0),
+    ("5 respuestas", 5),
+    ("12 Replies. Reply", 12),
+    ("10.2K Me gusta", 10200),
+    ("10,2 K", 10200),
+    ("1.2K", 1200),
+    ("1,2 mil", 1200),
+    ("3 mil Me gusta", 3000),
+    ("1,234 Likes. Like", 1234),
+    ("1.234 Me gusta", 1234),
+    ("1,234,567 views", 1234567),
+    ("1.5M", 1500000),
+    ("2,3 M de reproducciones", 2300000),
+    ("2 millones", 2000000),
+    ("1 millón", 1000000),
+    ("1,5 mil millones", 1500000000),
+    ("1.5 thousand", 1500),
+    ("4.35K", 4350),
+    ("5 Me gusta", 5),
+    ("7 mentions", 7),
+    ("12h", 12),
+    ("Reacciones: 56", 56),
+    ("All reactions: 1.1K", 1100)
+]
+
+def split_number(number, has_suffix):
+    """
+    Separar un número crudo en su parte entera y su parte decimal (ambas como texto de dígitos).
+    El último separador es decimal si hay sufijo o si no le siguen exactamente tres dígitos.
+    """
+    parts = LAST_GROUP_PATTERN.match(number)
+    head, tail = parts.group('head'), parts.group('tail')
+    if tail is not None and (has_suffix or len(tail) != 3):
+        return SEPARATOR_PATTERN.sub('', head), tail
+    return SEPARATOR_PATTERN.sub('', number), ""
+
+def extract_number(text):
+    """Extraer número de texto como '5 respuestas' o '10.2K Me gusta'."""
+    if not text:
+        return 0
+
+    match = LABEL_PATTERN.search(text)
+    if not match:
+        return 0
+
+    suffix = match.group('suffix')
+    multiplier = SUFFIX_MULTIPLIERS[' '.join(suffix.lower().split())] if suffix else 1
+    integer, fraction = split_number(match.group('number'), suffix is not None)
+
+    # Aritmética entera para que "10.2K" sea exactamente 10200
+    value = int(integer or 0) * multiplier
+    if fraction:
+        value += int(fraction) * multiplier // 10 ** len(fraction)
+    return value
+
+def is_abbreviated(text):
+    """
+    Verificar si la etiqueta trae el contador abreviado con un sufijo ("10.2K", "1,2 mil", "3 M"),
+    como lo lee extract_number. "1,234 Likes" es exacto aunque sea mayor que mil.
+    """
+    if not text:
+        return False
+    match = LABEL_PATTERN.search(text)
+    return bool(match and match.group('suffix'))
+
+def normalize_labels(labels):
+    """
+    Convertir una columna de etiquetas crudas (lista o Series de pandas) en una Series int64,
+    con el mismo resultado que extract_number aplicado a cada celda.
+    Las etiquetas se repiten mucho, así que solo se convierte cada valor distinto una vez y el
+    resultado se reparte con una indexación de NumPy.
+    """
+    if pd is None:
+        raise ImportError("Se necesita pandas para normalize_labels: pip install pandas")
+
+    series = labels if isinstance(labels, pd.Series) else pd.Series(labels, dtype=object)
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+
+    # El código -1 (valores nulos) toma el 0 agregado al final
+    unique_values = np.fromiter((extract_number(label) for label in uniques), dtype=np.int64, count=len(uniques))
+    unique_values = np.append(unique_values, np.int64(0))
+    return pd.Series(unique_values[codes], index=series.index, dtype='int64')
+
+if __name__ == "__main__":
+    failures = 0
+    for label, expected in KNOWN_LABELS:
+        value = extract_number(label)
+        if value != expected:
+            failures += 1
+            print(f"extract_number({label!r}) = {value}, se esperaba {expected}")
+
+    if pd is not None:
+        labels = [label for label, _ in KNOWN_LABELS]
+        expected_values = [expected for _, expected in KNOWN_LABELS]
+        values = normalize_labels(labels).tolist()
+        for label, value, expected in zip(labels, values, expected_values):
+            if value != expected:
+                failures += 1
+                print(f"normalize_labels: {label!r} = {value}, se esperaba {expected}")
+
+    print(f"{len(KNOWN_LABELS)} casos verificados, {failures} errores")
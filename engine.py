@@ -0,0 +1,470 @@
+"""
+Motor de extracción común a todas las plataformas.
+
+El motor es dueño del navegador, del ritmo entre cuentas, de la deduplicación, de los
+reintentos, de la instrumentación y de la salida; los adaptadores de adapters.py solo aportan
+los selectores y el mapeo de campos de cada plataforma (X y Facebook). Así, cada mejora del
+motor acelera las dos plataformas, y un mismo pool de navegadores puede atender lotes mixtos.
+
+- EngineWorker recorre una cuenta o página con un navegador ya abierto: abre la página, lee
+  todos los elementos visibles con un solo execute_script, hace scroll y espera (como máximo
+  max_wait) a que el feed agregue elementos nuevos.
+- ScrapeEngine reparte un lote de ScrapeJob entre varios workers, cada uno con su navegador,
+  y guarda un archivo por cuenta y el resumen de la extracción.
+
+Uso: python engine.py
+"""
+import datetime
+import functools
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+
+from adapters import ADAPTERS
+from browser_session import DEFAULT_USER_AGENT, BrowserSession, build_chrome_options
+from checkpoint import CheckpointJournal
+from identities import LEASE_TIMEOUT
+from metrics import ScrapeMetrics, timed_phase
+from ratelimit import get_rate_limiter, page_state
+from recycling import RecyclePolicy
+from resource_blocking import apply_blocking
+from sinks import CsvSink, save_extraction_summary
+
+logger = logging.getLogger(__name__)
+
+# Argumentos de Chrome de los navegadores del motor
+ENGINE_CHROME_ARGUMENTS = ["--window-size=1920,1080", "--disable-popup-blocking", "--disable-dev-shm-usage"]
+
+# Instala (una vez por página) un MutationObserver que cuenta los elementos nuevos que coinciden
+# con el selector arguments[0]; devuelve el contador actual para usarlo como marca antes del scroll
+ITEM_OBSERVER_JS = """
+var selector = arguments[0];
+if (!window.__engineItemObserver) {
+    window.__engineItemChanges = 0;
+    window.__engineItemObserver = new MutationObserver(function (mutations) {
+        for (var i = 0; i < mutations.length; i++) {
+            var added = mutations[i].addedNodes;
+            for (var j = 0; j < added.length; j++) {
+                var node = added[j];
+                if (node.nodeType === 1 && (node.matches(selector) || node.querySelector(selector))) {
+                    window.__engineItemChanges += 1;
+                    return;
+                }
+            }
+        }
+    });
+    window.__engineItemObserver.observe(document.body, {childList: true, subtree: true});
+}
+return window.__engineItemChanges;
+"""
+
+class ScrapeJob:
+    def __init__(self, platform, url, name=None, limit=20, keywords=None):
+        """
+        Una cuenta o página a extraer.
+        name identifica la cuenta en la salida (por defecto, el último tramo de la URL);
+        limit es el máximo de elementos; keywords filtra las publicaciones (solo Facebook).
+        """
+        if platform not in ADAPTERS:
+            raise ValueError(f"Plataforma no válida: {platform}")
+        self.platform = platform
+        self.adapter = ADAPTERS[platform]
+        self.url = url
+        self.name = name or self.adapter.job_name(url)
+        self.limit = limit
+        self.keywords = keywords
+
+    def __repr__(self):
+        return f"{self.platform}:{self.name}"
+
+class EngineWorker:
+    def __init__(self, driver, max_wait=5, page_load_timeout=15, max_retries=3, retry_delay=20,
+                 max_idle_scrolls=3, state_store=None, identity="default", rate_limiters=None):
+        """
+        Extraer cuentas de cualquier plataforma con el driver dado.
+        max_wait: máximo de segundos que se espera a que el feed agregue elementos tras un scroll.
+        max_retries y retry_delay: intentos ante errores del navegador y pausa entre ellos.
+        max_idle_scrolls: scrolls seguidos sin elementos nuevos que indican el final del feed.
+        state_store: StateStore para la extracción incremental de X.
+        identity: identidad de salida (IP, proxy o cuenta) cuyo limitador de ritmo comparte este worker;
+        rate_limiters ({plataforma: AdaptiveRateLimiter}) reemplaza los limitadores compartidos.
+        """
+        self.max_wait = max_wait
+        self.page_load_timeout = page_load_timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_idle_scrolls = max_idle_scrolls
+        self.state_store = state_store
+        self.identity = identity
+        self.rate_limiters = rate_limiters or {}
+        # Estado y segundos de carga de la última página abierta (para el pool de identidades)
+        self.last_page = (None, None)
+        # Si la última extracción terminó (la página cargó y no se agotaron los reintentos)
+        self.completed = False
+        self.metrics = ScrapeMetrics()
+        self.attach(driver)
+
+    def attach(self, driver):
+        """Usar el driver dado (también después de reciclar el navegador)."""
+        self.driver = driver
+        self.metrics.instrument(driver)
+
+    def close_popup(self, adapter):
+        """Cerrar la ventana emergente de la plataforma si aparece."""
+        try:
+            if self.driver.execute_script(adapter.popup_js):
+                logger.debug("Ventana emergente cerrada")
+        except WebDriverException:
+            pass
+
+    def rate_limiter(self, platform):
+        """Limitador de ritmo de la plataforma para la identidad de este worker."""
+        return self.rate_limiters.get(platform) or get_rate_limiter(platform, self.identity)
+
+    @timed_phase('carga')
+    def open_page(self, job):
+        """
+        Abrir la página cuando el limitador de ritmo lo permite y esperar a que aparezca el feed
+        (o una página de bloqueo, que frena el ritmo); devuelve False si no cargó.
+        """
+        rate_limiter = self.rate_limiter(job.platform)
+        rate_limiter.acquire()
+        started = time.perf_counter()
+        self.driver.get(job.url)
+        logger.info("Accediendo a: %s", job.url)
+        try:
+            state = WebDriverWait(self.driver, self.page_load_timeout, poll_frequency=0.2).until(
+                lambda driver: page_state(driver, job.adapter.ready_selector, job.platform)
+            )
+        except TimeoutException:
+            state = None
+        rate_limiter.record(state)
+        self.last_page = (state, time.perf_counter() - started)
+        if state != 'ok':
+            logger.warning("No se pudo cargar la página correctamente: %s%s", job.url,
+                           f" (estado: {state})" if state else "")
+            return False
+        self.close_popup(job.adapter)
+        return True
+
+    @timed_phase('descubrimiento')
+    def snapshot(self, adapter):
+        """Leer con una sola llamada los elementos visibles del feed."""
+        raw_json = self.driver.execute_script(adapter.snapshot_js)
+        return json.loads(raw_json) if raw_json else []
+
+    @timed_phase('scroll')
+    def scroll(self, adapter):
+        """Hacer scroll y esperar a que el feed agregue elementos nuevos, como máximo max_wait segundos."""
+        marker = self.driver.execute_script(ITEM_OBSERVER_JS, adapter.item_selector) or 0
+        self.driver.execute_script(adapter.scroll_js)
+        try:
+            WebDriverWait(self.driver, self.max_wait, poll_frequency=0.1).until(
+                lambda driver: (driver.execute_script("return window.__engineItemChanges || 0;") or 0) > marker
+            )
+        except TimeoutException:
+            pass
+        self.close_popup(adapter)
+
+    def collect(self, job, checkpoint=None):
+        """
+        Recorrer el feed de la cuenta una vez y devolver los registros aceptados por el adaptador.
+        Con checkpoint (un CheckpointJournal), cada registro se agrega al diario en cuanto se acepta
+        y se conservan los que la cuenta ya tenía en el diario.
+        """
+        adapter = job.adapter
+        if checkpoint:
+            recovered = checkpoint.records(job.name)
+            on_add = functools.partial(checkpoint.append, job.name)
+        else:
+            recovered, on_add = None, None
+        if not self.open_page(job):
+            return recovered or []
+
+        # Límite de seguridad: cada scroll avanza aproximadamente una pantalla
+        max_scrolls = max(10, job.limit * 2)
+        collector = adapter.new_collector(job, self.state_store, recovered, on_add)
+        if collector.finished:
+            return collector.records
+        seen_keys = set()
+        idle_scrolls = 0
+
+        for scroll in range(max_scrolls + 1):
+            new_items = 0
+            for raw in self.snapshot(adapter):
+                key = adapter.item_key(raw)
+                if not key or key in seen_keys:
+                    continue
+                seen_keys.add(key)
+                new_items += 1
+                with self.metrics.phase('extraccion'):
+                    keep_going = adapter.add(collector, raw, job)
+                if not keep_going:
+                    break
+
+            if collector.finished:
+                break
+
+            # Si varios scrolls seguidos no traen elementos nuevos, llegamos al final del feed
+            idle_scrolls = 0 if new_items else idle_scrolls + 1
+            if idle_scrolls >= self.max_idle_scrolls:
+                logger.info("No se cargaron elementos nuevos en los últimos scrolls de %s", job)
+                break
+
+            if scroll < max_scrolls:
+                self.scroll(adapter)
+
+        logger.info("Total de elementos extraídos de %s: %d", job, len(collector.records))
+        return collector.records
+
+    def scrape(self, job, checkpoint=None):
+        """
+        Extraer la cuenta con reintentos ante errores del navegador; empieza sus métricas.
+        Con checkpoint, cada reintento conserva lo ya extraído en los intentos anteriores.
+        completed indica después si la extracción terminó o devolvió solo lo del diario.
+        """
+        self.metrics.start_account(job.name)
+        self.completed = False
+        for attempt in range(self.max_retries):
+            try:
+                records = self.collect(job, checkpoint)
+                self.completed = self.last_page[0] == 'ok'
+                return records
+            except WebDriverException as e:
+                logger.warning("Intento %d de %s fallido: %s", attempt + 1, job, str(e)[:100])
+                if attempt < self.max_retries - 1:
+                    time.sleep(self.retry_delay)
+        return checkpoint.records(job.name) if checkpoint else []
+
+    def save(self, job, records, sink, timestamp):
+        """
+        Guardar los registros de la cuenta y devolver sus métricas (también si no hay registros) y
+        si se guardaron.
+        """
+        saved = True
+        if records:
+            try:
+                with self.metrics.phase('escritura'):
+                    output_file = sink.write(job.name, records, timestamp)
+                logger.info("Datos de %s guardados en %s", job.name, output_file)
+                job.adapter.after_save(job, records, self.state_store)
+            except Exception as e:
+                logger.error("Error al guardar el archivo de salida para %s: %s", job.name, e)
+                saved = False
+        return self.metrics.finish_account(len(records)), saved
+
+class ScrapeEngine:
+    def __init__(self, num_workers=3, headless=True, blocking_profile="none", profile_root=None, max_wait=5,
+                 page_load_timeout=15, max_retries=3, retry_delay=20, delay_range=None, state_store=None,
+                 recycle_policy=None, identity_pool=None):
+        """
+        Pool de navegadores que atiende lotes de ScrapeJob de cualquier plataforma.
+        Cada worker abre un solo navegador (con perfil persistente en profile_root/worker_N si se
+        indica) y lo usa para todas sus cuentas, sean de X o de Facebook. El ritmo de visitas lo
+        marcan los limitadores compartidos de cada plataforma (ver ratelimit); delay_range agrega
+        además una pausa fija de cada worker entre una cuenta y la siguiente. recycle_policy
+        (recycling.RecyclePolicy) decide cuándo reemplazar el navegador de un worker para acotar
+        su memoria. Con identity_pool (identities.IdentityPool) cada worker sale con su propia
+        identidad (proxy, user-agent y perfil) y la cambia cuando sale de rotación.
+        """
+        self.num_workers = num_workers
+        self.headless = headless
+        self.blocking_profile = blocking_profile
+        self.profile_root = profile_root
+        self.worker_options = {
+            'max_wait': max_wait,
+            'page_load_timeout': page_load_timeout,
+            'max_retries': max_retries,
+            'retry_delay': retry_delay,
+            'state_store': state_store
+        }
+        self.delay_range = delay_range
+        self.recycle_policy = recycle_policy or RecyclePolicy()
+        self.identity_pool = identity_pool
+
+    def chrome_options(self, identity=None):
+        """Opciones de Chrome de los navegadores del pool (nuevas en cada arranque)."""
+        return build_chrome_options(headless=self.headless,
+                                    user_agent=identity.user_agent if identity else DEFAULT_USER_AGENT,
+                                    proxy=identity.proxy if identity else None,
+                                    arguments=ENGINE_CHROME_ARGUMENTS, blocking_profile=self.blocking_profile,
+                                    proxy_loopback=identity.proxy_loopback if identity else False)
+
+    def start_browser(self, worker_id, identity=None):
+        """Abrir el navegador de un worker (con la identidad dada) y devolver su sesión y su EngineWorker."""
+        if identity and identity.profile_dir:
+            profile_dir = identity.profile_dir
+        else:
+            profile_dir = os.path.join(self.profile_root, f"worker_{worker_id}") if self.profile_root else None
+        session = BrowserSession(profile_dir=profile_dir)
+        driver = session.start(self.chrome_options(identity))
+        apply_blocking(driver, self.blocking_profile)
+        return session, EngineWorker(driver, identity=identity.name if identity else "default", **self.worker_options)
+
+    def recycle_browser(self, session, worker, accounts, identity=None):
+        """Reemplazar el navegador del worker si la política lo pide; devuelve True si lo reemplazó."""
+        reason = self.recycle_policy.recycle_reason(worker.driver, accounts)
+        if not reason:
+            return False
+        logger.info("Reciclando el navegador (%s)", reason)
+        driver = session.restart(self.chrome_options(identity))
+        apply_blocking(driver, self.blocking_profile)
+        worker.attach(driver)
+        return True
+
+    def run(self, jobs, output_dir='extracciones', sinks=None, metrics_writer=None, checkpoint=None):
+        """
+        Extraer todos los trabajos y guardar un archivo por cuenta y el resumen en output_dir.
+        sinks ({plataforma: destino}) permite otra salida; por defecto, un CSV por cuenta con las
+        columnas de cada plataforma. Con checkpoint (un CheckpointJournal), un lote interrumpido
+        se reanuda con los mismos archivos, sin repetir las cuentas ya guardadas.
+        Devuelve {cuenta: elementos guardados}.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        if checkpoint:
+            timestamp = checkpoint.begin(timestamp)
+        sinks = dict(sinks or {})
+        for job in jobs:
+            if job.platform not in sinks:
+                sinks[job.platform] = CsvSink(output_dir, job.adapter.fieldnames)
+
+        pending = queue.Queue()
+        results = {}
+        for index, job in enumerate(jobs):
+            if checkpoint and checkpoint.is_done(job.name):
+                count, record = checkpoint.result(job.name)
+                results[index] = (job, count, record)
+            else:
+                pending.put((index, job))
+        results_lock = threading.Lock()
+
+        def worker_loop(worker_id):
+            identity = None
+            try:
+                identity = self.identity_pool.lease(LEASE_TIMEOUT) if self.identity_pool else None
+                session, worker = self.start_browser(worker_id, identity)
+            except Exception as e:
+                logger.error("[worker %d] No se pudo iniciar el navegador: %s", worker_id, e)
+                if identity:
+                    self.identity_pool.release(identity)
+                return
+
+            try:
+                last_finished = None
+                accounts_since_start = 0
+                switch_identity = False
+                while True:
+                    try:
+                        index, job = pending.get_nowait()
+                    except queue.Empty:
+                        break
+
+                    # Cambiar de identidad si la anterior salió de rotación; si no hay otra a tiempo
+                    # o el navegador no arranca, la cuenta vuelve a la cola para otro worker
+                    if switch_identity:
+                        try:
+                            identity = self.identity_pool.lease(LEASE_TIMEOUT)
+                            logger.info("[worker %d] Cambiando a la identidad %s", worker_id, identity)
+                            session, worker = self.start_browser(worker_id, identity)
+                        except Exception as e:
+                            logger.error("[worker %d] No se pudo cambiar de identidad: %s", worker_id, e)
+                            pending.put((index, job))
+                            return
+                        switch_identity = False
+                        accounts_since_start = 0
+
+                    # Pausa fija opcional entre cuentas de este mismo worker
+                    if self.delay_range and last_finished is not None:
+                        wait_time = random.uniform(*self.delay_range) - (time.time() - last_finished)
+                        if wait_time > 0:
+                            time.sleep(wait_time)
+
+                    # La identidad se califica solo con la página de esta cuenta, no con la de la anterior
+                    worker.last_page = (None, None)
+                    try:
+                        records = worker.scrape(job, checkpoint)
+                        record, saved = worker.save(job, records, sinks[job.platform], timestamp)
+                        if metrics_writer:
+                            metrics_writer.write(record)
+                        # Si la extracción o la escritura fallaron, la cuenta no queda terminada y el diario se conserva
+                        if saved:
+                            if checkpoint and worker.completed:
+                                checkpoint.finish(job.name, len(records), record)
+                            with results_lock:
+                                results[index] = (job, len(records), record)
+                    except Exception as e:
+                        logger.error("[worker %d] Error al extraer %s: %s", worker_id, job, e)
+                    finally:
+                        last_finished = time.time()
+
+                    # Dejar la identidad si salió de rotación; la siguiente se toma con la próxima cuenta.
+                    # Si la cuenta falló antes de cargar su página (como un proxy caído), cuenta como fallo
+                    state, seconds = worker.last_page
+                    if identity and not self.identity_pool.report(identity, state == 'ok', seconds):
+                        session.close()
+                        self.identity_pool.release(identity)
+                        identity = None
+                        switch_identity = True
+                        continue
+
+                    accounts_since_start += 1
+                    if self.recycle_browser(session, worker, accounts_since_start, identity):
+                        accounts_since_start = 0
+            finally:
+                session.close()
+                if identity:
+                    self.identity_pool.release(identity)
+
+        num_workers = min(self.num_workers, pending.qsize())
+        if self.identity_pool:
+            # Cada worker necesita una identidad propia
+            num_workers = min(num_workers, len(self.identity_pool.identities))
+        threads = [threading.Thread(target=worker_loop, args=(i + 1,), daemon=True) for i in range(num_workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if not pending.empty():
+            logger.warning("Advertencia: quedaron %d cuentas sin procesar", pending.qsize())
+
+        # Resumen en el mismo orden en que se pidieron las cuentas
+        accounts_stats = {}
+        accounts_metrics = {}
+        for index in sorted(results):
+            job, count, record = results[index]
+            if count:
+                accounts_stats[job.name] = count
+                accounts_metrics[job.name] = record
+
+        for sink in sinks.values():
+            sink.close()
+        if metrics_writer:
+            metrics_writer.close()
+        save_extraction_summary(accounts_stats, output_dir, timestamp, accounts_metrics)
+        if checkpoint:
+            checkpoint.close(complete=all(checkpoint.is_done(job.name) for job in jobs))
+        return accounts_stats
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    # Lote mixto: cuentas de X y páginas de Facebook en el mismo pool de navegadores
+    jobs = [
+        ScrapeJob('x', "https://x.com/BurgerKingMX"),
+        ScrapeJob('x', "https://x.com/KFC_MEXICO"),
+        ScrapeJob('facebook', "https://www.facebook.com/KFCMexico", "KFC México", limit=30,
+                  keywords=['ciudad de mexico', 'cdmx', 'ciudad de méxico', 'mexico city'])
+    ]
+    # Si el lote se interrumpe, la siguiente ejecución lo reanuda desde el diario
+    ScrapeEngine(num_workers=2, blocking_profile="lite").run(
+        jobs, "extracciones", checkpoint=CheckpointJournal(os.path.join("extracciones", "checkpoint.jsonl"))
+    )
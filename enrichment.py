@@ -0,0 +1,255 @@
+"""
+Enriquecimiento con contadores exactos de los tweets extraídos de la página de un perfil.
+
+El timeline muestra los contadores grandes abreviados ("10.2K"), así que extract_number solo puede
+devolver 10200. ExactCountEnricher toma, después de scrape_account, los tweets con algún contador
+que salió de una etiqueta abreviada (anotado por el extractor en engagement.ABBREVIATED_KEY) y abre sus páginas de detalle
+en un pool de pestañas del mismo navegador. En cada pestaña un script instalado antes de que cargue
+la página guarda las respuestas JSON de TweetDetail/TweetResultByRestId, que traen los contadores
+exactos; en cuanto llega la respuesta se pasa al siguiente tweet, sin esperar a que se renderice.
+Las pestañas cargan a la vez: las visitas de detalle tienen su propio limitador por identidad, con
+ráfagas del tamaño del pool, y solo un bloqueo frena también al limitador de los perfiles. Al terminar
+cada cuenta las pestañas se cierran. Los contadores se guardan en una caché por ID de estado con tiempo
+de vida, compartible entre workers.
+
+Los tweets del modo "network" ya traen contadores exactos y no necesitan este paso.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from engagement import ABBREVIATED_KEY
+from ratelimit import BLOCK_STATES, AdaptiveRateLimiter, page_state
+from resource_blocking import apply_blocking
+from twitter_graphql import DETAIL_URL_FRAGMENTS, engagement_counts, find_tweet_result
+from twitter_html import BASE_URL, extract_status_id
+
+logger = logging.getLogger(__name__)
+
+# Se instala en cada documento nuevo de la pestaña (Page.addScriptToEvaluateOnNewDocument) y guarda
+# en window.__scraperDetailResponses el cuerpo de las respuestas de detalle de tweet (XHR o fetch)
+DETAIL_CAPTURE_JS = """
+(function () {
+    var fragments = %s;
+    window.__scraperDetailResponses = [];
+    function matches(url) {
+        url = String(url || '');
+        return fragments.some(function (fragment) { return url.indexOf(fragment) !== -1; });
+    }
+    var open = XMLHttpRequest.prototype.open;
+    XMLHttpRequest.prototype.open = function (method, url) {
+        if (matches(url)) {
+            this.addEventListener('load', function () {
+                try {
+                    window.__scraperDetailResponses.push(
+                        this.responseType === 'json' ? JSON.stringify(this.response) : this.responseText);
+                } catch (e) {}
+            });
+        }
+        return open.apply(this, arguments);
+    };
+    var originalFetch = window.fetch;
+    if (originalFetch) {
+        window.fetch = function (input) {
+            var promise = originalFetch.apply(this, arguments);
+            if (matches(typeof input === 'string' ? input : input && input.url)) {
+                promise.then(function (response) { return response.clone().text(); })
+                    .then(function (text) { window.__scraperDetailResponses.push(text); })
+                    .catch(function () {});
+            }
+            return promise;
+        };
+    }
+})();
+""" % json.dumps(list(DETAIL_URL_FRAGMENTS))
+
+# Devuelve las respuestas capturadas desde la última lectura y las descarta de la página
+READ_DETAIL_RESPONSES_JS = """
+var responses = window.__scraperDetailResponses || [];
+window.__scraperDetailResponses = [];
+return responses;
+"""
+
+# Ritmo de las páginas de detalle (una sola respuesta JSON cada una, sin desplazamiento), aparte del de los perfiles
+DETAIL_LIMITS = {'rate': 1 / 2, 'min_rate': 1 / 60, 'max_rate': 1, 'increase': 0.02,
+                 'base_backoff': 30, 'max_backoff': 900}
+
+# Selector que indica que la página de detalle ya mostró el tweet (para reconocer bloqueos)
+DETAIL_READY_SELECTOR = 'article[data-testid="tweet"]'
+
+def needs_exact_counts(tweet):
+    """Verificar si algún contador del tweet salió de una etiqueta abreviada ("10.2K", no "10,200")."""
+    return bool(tweet.get(ABBREVIATED_KEY))
+
+class CountCache:
+    def __init__(self, ttl=3600):
+        """Contadores exactos por ID de estado, válidos durante ttl segundos."""
+        self.ttl = ttl
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, status_id):
+        """Contadores guardados del tweet (None si no están o ya vencieron)."""
+        with self.lock:
+            entry = self.entries.get(status_id)
+            if entry is None:
+                return None
+            stored, counts = entry
+            if time.monotonic() - stored > self.ttl:
+                del self.entries[status_id]
+                return None
+            return dict(counts)
+
+    def put(self, status_id, counts):
+        """Guardar los contadores exactos de un tweet."""
+        with self.lock:
+            self.entries[status_id] = (time.monotonic(), dict(counts))
+
+class ExactCountEnricher:
+    def __init__(self, num_tabs=3, timeout=15, poll_interval=0.2, cache=None, blocking_profile="lite",
+                 base_url=BASE_URL):
+        """
+        Reemplazar los contadores abreviados por los exactos con num_tabs pestañas a la vez.
+        Una página de detalle que no entrega su respuesta en timeout segundos conserva los contadores
+        aproximados. cache (un CountCache) puede compartirse entre los workers de una extracción en
+        paralelo; las pestañas son de cada navegador y duran lo que dura cada llamada a enrich.
+        blocking_profile se aplica a las pestañas del pool.
+        """
+        self.num_tabs = num_tabs
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.cache = cache or CountCache()
+        self.blocking_profile = blocking_profile
+        self.base_url = base_url
+        self.detail_limiters = {}
+        self.lock = threading.Lock()
+
+    def detail_limiter(self, rate_limiter):
+        """Limitador de las páginas de detalle para la identidad de rate_limiter (el de los perfiles de X)."""
+        with self.lock:
+            if rate_limiter.name not in self.detail_limiters:
+                self.detail_limiters[rate_limiter.name] = AdaptiveRateLimiter(
+                    name=f"{rate_limiter.name}/detalle", burst=self.num_tabs, **DETAIL_LIMITS)
+            return self.detail_limiters[rate_limiter.name]
+
+    def tabs(self, driver):
+        """Pestañas del pool de este navegador, abiertas si hace falta (se cierran con close_tabs)."""
+        tabs = [handle for handle in getattr(driver, 'exact_count_tabs', []) if handle in driver.window_handles]
+        while len(tabs) < self.num_tabs:
+            driver.switch_to.new_window('tab')
+            driver.execute_cdp_cmd('Page.enable', {})
+            driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': DETAIL_CAPTURE_JS})
+            apply_blocking(driver, self.blocking_profile)
+            tabs.append(driver.current_window_handle)
+        driver.exact_count_tabs = tabs
+        return tabs
+
+    def close_tabs(self, driver, main_window):
+        """Cerrar las pestañas del pool y volver a main_window."""
+        for handle in getattr(driver, 'exact_count_tabs', []):
+            if handle in driver.window_handles and handle != main_window:
+                driver.switch_to.window(handle)
+                driver.close()
+        driver.exact_count_tabs = []
+        driver.switch_to.window(main_window)
+
+    def read_counts(self, driver, status_id):
+        """Contadores exactos del tweet si la pestaña actual ya recibió su respuesta de detalle."""
+        for body in driver.execute_script(READ_DETAIL_RESPONSES_JS) or []:
+            try:
+                tweet_result = find_tweet_result(json.loads(body), status_id)
+            except ValueError:
+                continue
+            if tweet_result:
+                return engagement_counts(tweet_result['legacy'])
+        return None
+
+    def fetch_counts(self, driver, status_ids, rate_limiter=None):
+        """
+        Visitar la página de detalle de cada tweet, num_tabs a la vez, y devolver
+        {status_id: contadores} de los que respondieron a tiempo. Las visitas se reparten con el
+        limitador de detalle de la identidad de rate_limiter; un bloqueo se informa a los dos.
+        Al terminar se cierran las pestañas del pool.
+        """
+        detail_limiter = self.detail_limiter(rate_limiter) if rate_limiter else None
+        main_window = driver.current_window_handle
+        pending = deque(status_ids)
+        active = {}
+        counts = {}
+        try:
+            tabs = self.tabs(driver)
+            while pending or active:
+                # Ocupar las pestañas libres con los siguientes tweets
+                for handle in tabs:
+                    if handle in active or not pending:
+                        continue
+                    status_id = pending.popleft()
+                    if detail_limiter:
+                        detail_limiter.acquire()
+                    driver.switch_to.window(handle)
+                    driver.execute_script("window.location.href = arguments[0];",
+                                          f"{self.base_url}/i/status/{status_id}")
+                    active[handle] = (status_id, time.monotonic() + self.timeout)
+
+                finished = False
+                for handle, (status_id, deadline) in list(active.items()):
+                    driver.switch_to.window(handle)
+                    exact = self.read_counts(driver, status_id)
+                    if exact is not None:
+                        state = 'ok'
+                        counts[status_id] = exact
+                        self.cache.put(status_id, exact)
+                    elif time.monotonic() >= deadline:
+                        state = page_state(driver, DETAIL_READY_SELECTOR, 'x')
+                        logger.debug("Sin contadores exactos para %s (estado: %s)", status_id, state)
+                    else:
+                        continue
+                    if detail_limiter:
+                        detail_limiter.record(state)
+                        if state in BLOCK_STATES:
+                            rate_limiter.record(state)
+                    del active[handle]
+                    finished = True
+
+                if active and not finished:
+                    time.sleep(self.poll_interval)
+        finally:
+            self.close_tabs(driver, main_window)
+        return counts
+
+    def enrich(self, driver, tweets, rate_limiter=None):
+        """
+        Reemplazar en tweets (en el mismo lugar) los contadores que pudieron salir de etiquetas
+        abreviadas por los exactos, de la caché o de la página de detalle. Devuelve cuántos se corrigieron.
+        """
+        targets = {}
+        for tweet in tweets:
+            status_id = extract_status_id(tweet.get('url'))
+            if status_id and needs_exact_counts(tweet):
+                targets.setdefault(status_id, []).append(tweet)
+        if not targets:
+            return 0
+
+        counts = {status_id: self.cache.get(status_id) for status_id in targets}
+        missing = [status_id for status_id, exact in counts.items() if exact is None]
+        if missing:
+            try:
+                counts.update(self.fetch_counts(driver, missing, rate_limiter))
+            except Exception as e:
+                # Lo obtenido antes del error quedó en la caché
+                logger.warning("Error al obtener contadores exactos: %s", e)
+                counts.update({status_id: self.cache.get(status_id) for status_id in missing})
+
+        enriched = 0
+        for status_id, exact in counts.items():
+            if exact is None:
+                continue
+            enriched += 1
+            for tweet in targets[status_id]:
+                tweet.update(exact)
+                tweet.pop(ABBREVIATED_KEY, None)
+        logger.info("Contadores exactos para %d de %d tweets abreviados (%d de la caché)",
+                    enriched, len(targets), len(targets) - len(missing))
+        return enriched
@@ -0,0 +1,185 @@
+"""
+Pool de identidades de salida (proxy, user-agent y perfil) con puntaje de salud.
+
+El ritmo que tolera una plataforma es por IP y por cuenta, así que el rendimiento total escala
+repartiendo los workers entre varias identidades. Cada worker toma (lease) una identidad libre
+para abrir su navegador con ese proxy, user-agent y perfil, y reporta el resultado de cada página
+(éxito o bloqueo y segundos de carga). La salud de una identidad combina su tasa de éxito con su
+latencia; cuando baja de min_health, la identidad sale de rotación durante un tiempo de espera
+(que se duplica si vuelve a fallar) y el worker cambia a otra.
+
+Las identidades se definen en un JSON (lista de objetos con name, proxy, user_agent y profile_dir)
+y se cargan con load_identity_pool. Para probar sin proxies reales, benchmark.py --serve --proxies N
+levanta proxies locales (sus identidades llevan proxy_loopback).
+"""
+import contextlib
+import json
+import logging
+import random
+import threading
+import time
+
+from browser_session import DEFAULT_USER_AGENT
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima de un worker por una identidad libre; si se agota, devuelve su cuenta a la cola
+LEASE_TIMEOUT = 120
+
+# Peso de la última página en la latencia media de una identidad (media móvil exponencial)
+LATENCY_SMOOTHING = 0.3
+
+class Identity:
+    def __init__(self, name, proxy=None, user_agent=DEFAULT_USER_AGENT, profile_dir=None, proxy_loopback=False):
+        """
+        Identidad de salida: proxy (None para conexión directa), user-agent y perfil del navegador.
+        proxy_loopback también envía por el proxy las páginas de localhost (proxies locales de benchmark).
+        """
+        self.name = name
+        self.proxy = proxy
+        self.proxy_loopback = proxy_loopback
+        self.user_agent = user_agent
+        self.profile_dir = profile_dir
+        self.successes = 0
+        self.failures = 0
+        self.latency = None
+        self.rotations = 0
+        self.cooldown_until = 0.0
+        self.leased = False
+
+    def success_rate(self):
+        """Tasa de éxito suavizada (una identidad sin historial empieza en 0.5)."""
+        return (self.successes + 1) / (self.successes + self.failures + 2)
+
+    def health(self, latency_target):
+        """Salud entre 0 y 1: tasa de éxito, penalizada si la latencia media supera latency_target."""
+        score = self.success_rate()
+        if self.latency and self.latency > latency_target:
+            score *= latency_target / self.latency
+        return score
+
+    def is_cooling(self, now=None):
+        """Verificar si la identidad está fuera de rotación."""
+        return (now or time.monotonic()) < self.cooldown_until
+
+    def __repr__(self):
+        return self.name
+
+class IdentityPool:
+    def __init__(self, identities, min_health=0.3, min_samples=3, cooldown=600, max_cooldown=6 * 3600,
+                 latency_target=10):
+        """
+        Pool de identidades que los workers toman en exclusiva.
+        Una identidad con al menos min_samples páginas y salud menor que min_health sale de rotación
+        cooldown segundos (el doble en cada rotación seguida, hasta max_cooldown) y vuelve con el
+        historial en cero. latency_target es la latencia de carga (s) a partir de la cual baja la salud.
+        """
+        if not identities:
+            raise ValueError("El pool necesita al menos una identidad")
+        self.identities = list(identities)
+        self.min_health = min_health
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.latency_target = latency_target
+        self.condition = threading.Condition()
+
+    def lease(self, timeout=None):
+        """
+        Tomar la identidad libre más sana (esperando a que se libere una si hace falta).
+        Lanza RuntimeError si no hay ninguna disponible en timeout segundos.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                available = [identity for identity in self.identities
+                             if not identity.leased and not identity.is_cooling(now)]
+                if available:
+                    best = max(identity.health(self.latency_target) for identity in available)
+                    identity = random.choice([identity for identity in available
+                                              if identity.health(self.latency_target) == best])
+                    identity.leased = True
+                    logger.debug("Identidad %s asignada (salud %.2f)", identity, best)
+                    return identity
+
+                # Esperar a que se libere una identidad o termine el tiempo de espera más próximo
+                waits = [identity.cooldown_until - now for identity in self.identities if identity.is_cooling(now)]
+                if deadline is not None:
+                    if now >= deadline:
+                        raise RuntimeError("No hay identidades disponibles")
+                    waits.append(deadline - now)
+                self.condition.wait(min(waits) if waits else None)
+
+    def release(self, identity):
+        """Devolver la identidad al pool."""
+        with self.condition:
+            identity.leased = False
+            self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def leased(self, timeout=None):
+        """Usar una identidad dentro de un bloque with y devolverla al terminar."""
+        identity = self.lease(timeout)
+        try:
+            yield identity
+        finally:
+            self.release(identity)
+
+    def report(self, identity, ok, seconds=None):
+        """
+        Registrar el resultado de una página cargada con la identidad (ok y segundos de carga).
+        Devuelve False si la identidad salió de rotación y el worker debe cambiarla.
+        """
+        with self.condition:
+            if ok:
+                identity.successes += 1
+                if seconds is not None:
+                    identity.latency = (seconds if identity.latency is None else
+                                        LATENCY_SMOOTHING * seconds + (1 - LATENCY_SMOOTHING) * identity.latency)
+            else:
+                identity.failures += 1
+
+            health = identity.health(self.latency_target)
+            if identity.successes + identity.failures < self.min_samples or health >= self.min_health:
+                if ok:
+                    identity.rotations = 0
+                return True
+
+            cooldown = min(self.max_cooldown, self.cooldown * 2 ** identity.rotations)
+            identity.rotations += 1
+            identity.cooldown_until = time.monotonic() + cooldown
+            identity.successes = identity.failures = 0
+            identity.latency = None
+            logger.warning("Identidad %s fuera de rotación por %.0f s (salud %.2f)", identity, cooldown, health)
+            self.condition.notify_all()
+            return False
+
+    def summary(self):
+        """Estado de cada identidad, para registrar o mostrar."""
+        with self.condition:
+            now = time.monotonic()
+            return [{
+                'identidad': identity.name,
+                'salud': round(identity.health(self.latency_target), 3),
+                'exitos': identity.successes,
+                'fallos': identity.failures,
+                'latencia': round(identity.latency, 2) if identity.latency else None,
+                'en_espera': identity.is_cooling(now),
+                'en_uso': identity.leased
+            } for identity in self.identities]
+
+def load_identity_pool(path, **pool_options):
+    """
+    Crear un IdentityPool a partir de un JSON con la lista de identidades, por ejemplo:
+    [{"name": "proxy1", "proxy": "http://10.0.0.1:3128", "profile_dir": ".browser_session/proxy1"}]
+    """
+    with open(path, encoding='utf-8') as f:
+        entries = json.load(f)
+    identities = [Identity(entry.get('name') or entry.get('proxy') or f"identidad_{i + 1}",
+                           proxy=entry.get('proxy'),
+                           user_agent=entry.get('user_agent', DEFAULT_USER_AGENT),
+                           profile_dir=entry.get('profile_dir'),
+                           proxy_loopback=entry.get('proxy_loopback', False))
+                  for i, entry in enumerate(entries)]
+    return IdentityPool(identities, **pool_options)
@@ -0,0 +1,179 @@
+"""
+Instrumentación de las extracciones: llamadas a WebDriver y tiempo por fase, por cuenta.
+
+ScrapeMetrics cuenta cada comando que el driver envía al navegador (los WebElement también
+pasan por driver.execute) y mide el tiempo de cada fase: carga de la página, scroll,
+búsqueda de tweets, cada método extract_* y escritura de la salida. Las fases anidadas se
+descuentan de la exterior, así que los tiempos por fase suman el total de la cuenta.
+Al terminar una cuenta, finish_account devuelve un registro con todas las cifras, que puede
+escribirse como líneas JSON (JsonLinesMetricsWriter) o como métricas de Prometheus en formato
+de texto (PrometheusMetricsWriter, para el textfile collector de node_exporter).
+"""
+import contextlib
+import datetime
+import functools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# Fases en el orden en que se muestran en el resumen; "otros" es el tiempo fuera de cualquier fase
+PHASES = [
+    'carga',
+    'scroll',
+    'descubrimiento',
+    'extraccion',
+    'extract_tweet_url',
+    'extract_tweet_content',
+    'extract_tweet_date',
+    'has_media',
+    'extract_tweet_stats',
+    'enriquecimiento',
+    'escritura',
+    'otros'
+]
+
+class ScrapeMetrics:
+    def __init__(self):
+        """Contadores de la cuenta en curso; se reinician con start_account."""
+        self.account = None
+        self.account_start = None
+        self.webdriver_calls = 0
+        self.phase_calls = defaultdict(int)
+        self.phase_times = defaultdict(float)
+        self.phases = []
+
+    def instrument(self, driver):
+        """
+        Contar los comandos del driver, atribuidos a la fase activa en ese momento.
+        Si el driver ya estaba instrumentado, sus comandos pasan a contar para estas métricas.
+        """
+        instrumented = hasattr(driver, 'scrape_metrics')
+        driver.scrape_metrics = self
+        if instrumented:
+            return
+        execute = driver.execute
+
+        def counted_execute(driver_command, params=None):
+            metrics = driver.scrape_metrics
+            metrics.webdriver_calls += 1
+            metrics.phase_calls[metrics.phases[-1] if metrics.phases else 'otros'] += 1
+            return execute(driver_command, params)
+
+        driver.execute = counted_execute
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Medir el bloque como parte de la fase dada."""
+        self.phases.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases.pop()
+            self.phase_times[name] += elapsed
+            if self.phases:
+                self.phase_times[self.phases[-1]] -= elapsed
+
+    def start_account(self, account):
+        """Empezar a medir una cuenta nueva."""
+        self.account = account
+        self.account_start = time.perf_counter()
+        self.webdriver_calls = 0
+        self.phase_calls.clear()
+        self.phase_times.clear()
+
+    def finish_account(self, tweets):
+        """Terminar la cuenta en curso y devolver su registro de métricas."""
+        elapsed = time.perf_counter() - self.account_start if self.account_start else 0.0
+        phase_times = {name: seconds for name, seconds in self.phase_times.items() if name != 'otros'}
+        phase_times['otros'] = max(elapsed - sum(phase_times.values()), 0.0)
+        return {
+            'cuenta': self.account,
+            'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+            'tweets': tweets,
+            'segundos': round(elapsed, 3),
+            'llamadas_webdriver': self.webdriver_calls,
+            'llamadas_por_tweet': round(self.webdriver_calls / tweets, 2) if tweets else None,
+            'fases': {name: round(seconds, 3) for name, seconds in phase_times.items()},
+            'llamadas_por_fase': dict(self.phase_calls)
+        }
+
+def timed_phase(name):
+    """Decorador para métodos de objetos con atributo metrics: mide cada llamada dentro de la fase."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.metrics.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+class JsonLinesMetricsWriter:
+    def __init__(self, path):
+        """Agregar una línea JSON por cuenta extraída al archivo path."""
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, record):
+        """Agregar el registro de una cuenta."""
+        with self.lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def close(self):
+        """Cada registro se escribe al llegar; no hay nada pendiente."""
+        pass
+
+class PrometheusMetricsWriter:
+    def __init__(self, path, prefix='scraper'):
+        """
+        Mantener en path las métricas de la última extracción de cada cuenta en el formato de texto
+        de Prometheus. El archivo se reescribe completo (y de forma atómica) con cada cuenta.
+        """
+        self.path = path
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.records = {}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, record):
+        """Actualizar las métricas de la cuenta del registro y reescribir el archivo."""
+        with self.lock:
+            self.records[record['cuenta']] = record
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.write(self.render())
+            os.replace(temp_path, self.path)
+
+    def render(self):
+        """Texto de todas las métricas en formato de exposición de Prometheus."""
+        metrics = [
+            ('tweets', "Tweets extraídos en la última extracción", lambda r: [({}, r['tweets'])]),
+            ('duration_seconds', "Duración de la última extracción", lambda r: [({}, r['segundos'])]),
+            ('webdriver_calls', "Comandos enviados al navegador", lambda r: [({}, r['llamadas_webdriver'])]),
+            ('phase_seconds', "Tiempo por fase", lambda r: [({'fase': name}, value) for name, value in r['fases'].items()]),
+            ('phase_webdriver_calls', "Comandos al navegador por fase",
+             lambda r: [({'fase': name}, value) for name, value in r['llamadas_por_fase'].items()])
+        ]
+        lines = []
+        for name, description, samples in metrics:
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {description}")
+            lines.append(f"# TYPE {metric} gauge")
+            for account, record in sorted(self.records.items()):
+                for labels, value in samples(record):
+                    label_text = ','.join(f'{key}="{escape_label(str(val))}"'
+                                          for key, val in [('cuenta', account)] + sorted(labels.items()))
+                    lines.append(f"{metric}{{{label_text}}} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        """El archivo queda escrito después de cada cuenta; no hay nada pendiente."""
+        pass
+
+def escape_label(value):
+    """Escapar un valor de etiqueta de Prometheus."""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
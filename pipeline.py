@@ -0,0 +1,117 @@
+"""
+Canal de registros por etapas entre la extracción y el destino de salida.
+
+Los scrapers que juntaban todos los registros de la ejecución en una lista para escribirlos al
+final necesitaban memoria proporcional al número de cuentas. RecordPipeline separa las etapas:
+- captura: el scraper entrega cada registro con put (y end al terminar una cuenta);
+- normalización y filtro: generadores encadenados en un hilo escritor;
+- escritura: los registros se agrupan por cuenta y se guardan en lotes de batch_size con
+  sink.write_batch.
+Entre la captura y el hilo escritor hay una cola acotada: si el destino es lento y la cola se
+llena, put espera (contrapresión) en lugar de acumular registros, así que la memoria queda
+limitada por max_pending y batch_size sin importar cuántas cuentas tenga la extracción.
+"""
+import logging
+import queue
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Marcas que viajan por la cola junto con los registros
+END_OF_ACCOUNT = object()
+STOP = object()
+
+class RecordPipeline:
+    def __init__(self, sink, timestamp, normalize=None, keep=None, batch_size=100, max_pending=1000):
+        """
+        Canal hacia sink para la extracción timestamp.
+        normalize(registro) devuelve el registro normalizado (o None para descartarlo); keep(registro)
+        decide si se guarda. batch_size es el número de registros por escritura y max_pending el
+        máximo de registros en la cola antes de frenar la captura.
+        """
+        self.sink = sink
+        self.timestamp = timestamp
+        self.normalize = normalize
+        self.keep = keep
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.written = defaultdict(int)
+        self.outputs = {}
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name="record-pipeline", daemon=True)
+        self.thread.start()
+
+    def put(self, name, record):
+        """Entregar un registro de la cuenta name (espera si la cola está llena)."""
+        if self.error:
+            raise RuntimeError(f"El canal de registros se detuvo: {self.error}") from self.error
+        self.queue.put((name, record))
+
+    def end(self, name):
+        """Marcar el fin de la cuenta name: su último lote se escribe sin esperar a llenarse."""
+        self.queue.put((name, END_OF_ACCOUNT))
+
+    def close(self):
+        """
+        Escribir lo pendiente, detener el hilo escritor y devolver {cuenta: registros guardados}.
+        Si la escritura falló, relanza el error.
+        """
+        self.queue.put(STOP)
+        self.thread.join()
+        if self.error:
+            raise self.error
+        return dict(self.written)
+
+    def captured(self):
+        """Etapa de captura: los elementos de la cola hasta la marca STOP."""
+        while True:
+            item = self.queue.get()
+            if item is STOP:
+                return
+            yield item
+
+    def normalized(self, items):
+        """Etapa de normalización."""
+        for name, record in items:
+            if record is not END_OF_ACCOUNT and self.normalize:
+                record = self.normalize(record)
+            yield name, record
+
+    def filtered(self, items):
+        """Etapa de filtro: descarta los registros nulos o que keep rechaza."""
+        for name, record in items:
+            if record is END_OF_ACCOUNT or (record is not None and (self.keep is None or self.keep(record))):
+                yield name, record
+
+    def flush(self, name, buffer, batches):
+        """Escribir el lote acumulado de la cuenta."""
+        if not buffer:
+            return
+        self.outputs[name] = self.sink.write_batch(name, buffer, self.timestamp, batches[name])
+        logger.debug("Lote %d de %s: %d registros en %s", batches[name], name, len(buffer), self.outputs[name])
+        batches[name] += 1
+        self.written[name] += len(buffer)
+        buffer.clear()
+
+    def run(self):
+        """Hilo escritor: recorre las etapas y escribe por lotes."""
+        buffers = defaultdict(list)
+        batches = defaultdict(int)
+        items = self.captured()
+        try:
+            for name, record in self.filtered(self.normalized(items)):
+                if record is END_OF_ACCOUNT:
+                    self.flush(name, buffers.pop(name, []), batches)
+                    continue
+                buffers[name].append(record)
+                if len(buffers[name]) >= self.batch_size:
+                    self.flush(name, buffers[name], batches)
+            for name, buffer in buffers.items():
+                self.flush(name, buffer, batches)
+        except Exception as e:
+            logger.error("Error en el canal de registros: %s", e)
+            self.error = e
+            # Vaciar la cola para que la captura no quede esperando
+            for _ in items:
+                pass
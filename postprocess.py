@@ -0,0 +1,321 @@
+"""
+Post-procesamiento de registros ya capturados, repartido entre todos los núcleos.
+
+Agrega a cada tweet o publicación los campos derivados de su texto y su fecha:
+- hashtags, menciones y urls (separados por espacios en el CSV);
+- idioma ("es", "en" o "" si no se puede decidir), por las palabras frecuentes de cada idioma;
+- fecha_utc: la fecha normalizada a ISO en UTC, también para las fechas relativas ("3 h",
+  "Yesterday at 10:00") y con nombre de mes ("5 de marzo", "March 5, 2024") de Facebook, que se
+  resuelven respecto del momento de la extracción (el timestamp del nombre del archivo). Las horas
+  de reloj de esas fechas son de la zona horaria de la extracción: por defecto la local, o la
+  indicada con --zona-horaria.
+Opcionalmente filtra por palabras clave (como KEYWORDS del scraper de Facebook) y descarta
+registros repetidos (por ID de estado o, sin URL de tweet, por cuenta, fecha y texto) dentro de
+una ventana de las últimas claves vistas.
+
+Los registros se procesan en lotes independientes en un ProcessPoolExecutor, con un número
+acotado de lotes en vuelo y de claves recordadas: el tiempo escala con los núcleos y la memoria
+no depende del total.
+
+Uso: python postprocess.py <entrada.csv> [<entrada.csv> ...] -o <salida.csv> [--palabras-clave a,b]
+     [--zona-horaria America/Mexico_City]
+"""
+import argparse
+import csv
+import datetime
+import os
+import re
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from zoneinfo import ZoneInfo
+
+from engagement import HASHTAG_PATTERN, MENTION_PATTERN, URL_PATTERN
+from sinks import to_timestamp
+from twitter_html import extract_status_id
+
+# Campos del texto, la fecha y la cuenta en los registros de X y de Facebook
+TEXT_FIELDS = ('texto', 'text')
+DATE_FIELDS = ('fecha', 'date')
+ACCOUNT_FIELDS = ('cuenta', 'page')
+
+# Campos que agrega el post-procesamiento
+DERIVED_FIELDS = ['hashtags', 'menciones', 'urls', 'idioma', 'fecha_utc']
+
+WORD_PATTERN = re.compile(r'[^\W\d_]+')
+
+# Signos que no forman parte de una URL al final de una oración
+URL_TRAILING = '.,;:!?)]}\'"'
+
+# Palabras frecuentes de cada idioma; se elige el idioma con más coincidencias
+STOPWORDS = {
+    'es': {'de', 'la', 'que', 'el', 'en', 'y', 'los', 'del', 'se', 'las', 'por', 'un', 'para', 'con',
+           'una', 'su', 'al', 'lo', 'como', 'más', 'pero', 'sus', 'le', 'ya', 'o', 'este', 'sí', 'porque',
+           'esta', 'cuando', 'muy', 'sin', 'sobre', 'también', 'me', 'hasta', 'hay', 'donde', 'nos',
+           'tu', 'te', 'ti', 'es', 'son', 'está', 'están', 'aquí', 'hoy', 'nuestro', 'nuestra'},
+    'en': {'the', 'of', 'and', 'to', 'in', 'is', 'you', 'that', 'it', 'he', 'was', 'for', 'on', 'are',
+           'as', 'with', 'his', 'they', 'at', 'be', 'this', 'have', 'from', 'or', 'by', 'but', 'not',
+           'what', 'all', 'were', 'we', 'when', 'your', 'can', 'there', 'an', 'which', 'their', 'if',
+           'will', 'our', 'my', 'just', 'now', 'get', 'out', 'today', 'new', 'more', 'here'}
+}
+
+# Mínimo de palabras frecuentes para decidir el idioma
+MIN_LANGUAGE_HITS = 2
+
+# Fechas relativas: "3 h", "5 min", "2d", "1 sem", "4 weeks"
+RELATIVE_DATE_PATTERN = re.compile(
+    r'^(?:hace\s+)?(?P<amount>\d+)\s*(?P<unit>s|seg|sec|secs|segundos?|seconds?|m|min|mins|minutos?|minutes?|'
+    r'h|hr|hrs|horas?|hours?|d|días?|dias?|days?|sem|semanas?|w|wk|weeks?)\b',
+    re.IGNORECASE
+)
+UNIT_SECONDS = [('sem', 604800), ('w', 604800), ('s', 1), ('m', 60), ('h', 3600), ('d', 86400)]
+YESTERDAY_PATTERN = re.compile(r'^(yesterday|ayer)\b', re.IGNORECASE)
+
+# Fechas con nombre de mes en inglés ("March 5, 2024") y en español ("5 de marzo de 2024")
+ENGLISH_DATE_PATTERN = re.compile(r'(?P<month>[a-z]+)\.?\s+(?P<day>\d{1,2})(?:,?\s+(?P<year>\d{4}))?', re.IGNORECASE)
+SPANISH_DATE_PATTERN = re.compile(r'(?P<day>\d{1,2})\s+(?:de\s+)?(?P<month>[a-záéíóú]+)\.?(?:\s+(?:de\s+)?(?P<year>\d{4}))?',
+                                  re.IGNORECASE)
+TIME_PATTERN = re.compile(r'(?P<hour>\d{1,2}):(?P<minute>\d{2})\s*(?P<period>[ap]\.?\s?m\.?)?', re.IGNORECASE)
+MONTHS = {
+    'jan': 1, 'january': 1, 'ene': 1, 'enero': 1,
+    'feb': 2, 'february': 2, 'febrero': 2,
+    'mar': 3, 'march': 3, 'marzo': 3,
+    'apr': 4, 'april': 4, 'abr': 4, 'abril': 4,
+    'may': 5, 'mayo': 5,
+    'jun': 6, 'june': 6, 'junio': 6,
+    'jul': 7, 'july': 7, 'julio': 7,
+    'aug': 8, 'august': 8, 'ago': 8, 'agosto': 8,
+    'sep': 9, 'sept': 9, 'september': 9, 'septiembre': 9, 'setiembre': 9,
+    'oct': 10, 'october': 10, 'octubre': 10,
+    'nov': 11, 'november': 11, 'noviembre': 11,
+    'dec': 12, 'december': 12, 'dic': 12, 'diciembre': 12
+}
+
+# Timestamp de extracción en los nombres de archivo ({cuenta}_{AAAAMMDD_HHMMSS}.csv)
+FILENAME_TIMESTAMP_PATTERN = re.compile(r'(\d{8}_\d{6})')
+
+def first_field(record, fields):
+    """Valor del primer campo de fields presente en el registro ("" si no hay ninguno)."""
+    for field in fields:
+        if record.get(field) is not None:
+            return record[field]
+    return ""
+
+def extract_hashtags(text):
+    """Hashtags del texto, en minúsculas y sin repetir, en orden de aparición."""
+    return list(dict.fromkeys(tag.lower() for tag in HASHTAG_PATTERN.findall(text or "")))
+
+def extract_mentions(text):
+    """Cuentas mencionadas con @ (no cuenta las direcciones de correo), sin repetir."""
+    return list(dict.fromkeys(mention.lower() for mention in MENTION_PATTERN.findall(text or "")))
+
+def extract_urls(text):
+    """Enlaces del texto, sin la puntuación que los sigue."""
+    return list(dict.fromkeys(url.rstrip(URL_TRAILING) for url in URL_PATTERN.findall(text or "")))
+
+def detect_language(text):
+    """Idioma del texto ("es", "en" o "" si hay muy pocas palabras frecuentes o empatan)."""
+    text = URL_PATTERN.sub(' ', text or "")
+    text = MENTION_PATTERN.sub(' ', HASHTAG_PATTERN.sub(' ', text))
+    words = WORD_PATTERN.findall(text.lower())
+    hits = {language: sum(1 for word in words if word in stopwords) for language, stopwords in STOPWORDS.items()}
+    ranked = sorted(hits.items(), key=lambda item: item[1], reverse=True)
+    if ranked[0][1] < MIN_LANGUAGE_HITS or ranked[0][1] == ranked[1][1]:
+        return ""
+    return ranked[0][0]
+
+def apply_time(date, text):
+    """Agregar a date la hora del texto ("10:30", "3:15 PM"), si la tiene."""
+    match = TIME_PATTERN.search(text)
+    if not match:
+        return date
+    hour, minute = int(match.group('hour')), int(match.group('minute'))
+    period = (match.group('period') or "").lower().replace('.', '').replace(' ', '')
+    if period == 'pm' and hour < 12:
+        hour += 12
+    elif period == 'am' and hour == 12:
+        hour = 0
+    if hour > 23 or minute > 59:
+        return date
+    return date.replace(hour=hour, minute=minute, second=0, microsecond=0)
+
+def month_date(text, reference):
+    """
+    Fecha con nombre de mes en inglés o español, en la zona horaria de reference; sin año se toma
+    el último que no quede en el futuro.
+    """
+    for pattern in (ENGLISH_DATE_PATTERN, SPANISH_DATE_PATTERN):
+        for match in pattern.finditer(text):
+            month = MONTHS.get(match.group('month').lower().rstrip('.'))
+            if not month:
+                continue
+            year = int(match.group('year')) if match.group('year') else reference.year
+            try:
+                date = datetime.datetime(year, month, int(match.group('day')), tzinfo=reference.tzinfo)
+            except ValueError:
+                continue
+            date = apply_time(date, text)
+            if not match.group('year') and date > reference:
+                date = date.replace(year=year - 1)
+            return date
+    return None
+
+def normalize_timestamp(value, reference):
+    """
+    Convertir la fecha de un registro a ISO en UTC ("" si no se reconoce).
+    Las fechas relativas y las que no traen año se resuelven respecto de reference (datetime con zona);
+    sus horas de reloj ("Yesterday at 10:00") se toman en la zona horaria de reference.
+    """
+    if not value:
+        return ""
+    date = to_timestamp(value)
+    if date is None:
+        text = str(value).strip()
+        relative = RELATIVE_DATE_PATTERN.match(text)
+        if relative:
+            unit = relative.group('unit').lower()
+            seconds = next(seconds for prefix, seconds in UNIT_SECONDS if unit.startswith(prefix))
+            date = reference - datetime.timedelta(seconds=int(relative.group('amount')) * seconds)
+        elif YESTERDAY_PATTERN.match(text):
+            date = apply_time(reference - datetime.timedelta(days=1), text)
+        else:
+            date = month_date(text, reference)
+    if date is None:
+        return ""
+    return date.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def record_key(record):
+    """Clave para descartar repetidos: el ID de estado o, sin él, cuenta, fecha y texto."""
+    status_id = extract_status_id(record.get('url'))
+    if status_id:
+        return status_id
+    return (first_field(record, ACCOUNT_FIELDS), first_field(record, DATE_FIELDS), first_field(record, TEXT_FIELDS))
+
+def enrich_record(record, reference):
+    """Copia del registro con los campos derivados de su texto y su fecha."""
+    text = str(first_field(record, TEXT_FIELDS) or "")
+    enriched = dict(record)
+    enriched['hashtags'] = extract_hashtags(text)
+    enriched['menciones'] = extract_mentions(text)
+    enriched['urls'] = extract_urls(text)
+    enriched['idioma'] = detect_language(text)
+    enriched['fecha_utc'] = normalize_timestamp(first_field(record, DATE_FIELDS), reference)
+    return enriched
+
+def process_chunk(items, keywords=None):
+    """
+    Procesar un lote de pares (registro, referencia) en un proceso del pool: filtrar por palabras
+    clave y enriquecer. Devuelve pares (clave, registro enriquecido).
+    """
+    keywords = [keyword.lower() for keyword in keywords or []]
+    results = []
+    for record, reference in items:
+        if keywords:
+            text = str(first_field(record, TEXT_FIELDS) or "").lower()
+            if not any(keyword in text for keyword in keywords):
+                continue
+        results.append((record_key(record), enrich_record(record, reference)))
+    return results
+
+def iter_chunks(items, chunk_size):
+    """Agrupar un iterable en listas de chunk_size elementos."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def process_items(items, workers=None, chunk_size=2000, keywords=None, dedup=True, dedup_window=100000):
+    """
+    Procesar pares (registro, referencia) en lotes de chunk_size con un proceso por núcleo (workers=None)
+    y generar los registros enriquecidos en el orden de entrada. Con dedup se conserva solo la primera
+    aparición de cada registro entre las últimas dedup_window claves vistas (las extracciones repiten
+    tweets cercanos entre sí). Como mucho hay dos lotes en vuelo por proceso.
+    """
+    workers = workers or os.cpu_count() or 1
+    seen = OrderedDict()
+
+    def unique(results):
+        for key, record in results:
+            if dedup:
+                if key in seen:
+                    seen.move_to_end(key)
+                    continue
+                seen[key] = None
+                if len(seen) > dedup_window:
+                    seen.popitem(last=False)
+            yield record
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for chunk in iter_chunks(items, chunk_size):
+            in_flight.append(executor.submit(process_chunk, chunk, keywords))
+            if len(in_flight) >= workers * 2:
+                yield from unique(in_flight.popleft().result())
+        while in_flight:
+            yield from unique(in_flight.popleft().result())
+
+def process_records(records, reference=None, timezone=None, **options):
+    """
+    Enriquecer registros (ver process_items) resolviendo las fechas relativas respecto de reference
+    (por defecto, ahora en timezone o, sin ella, en la zona horaria local).
+    """
+    reference = reference or datetime.datetime.now().astimezone(timezone)
+    return process_items(((record, reference) for record in records), **options)
+
+def file_reference(path, timezone=None):
+    """
+    Momento de la extracción de un archivo: el timestamp de su nombre (hora de reloj de timezone o,
+    sin ella, de la zona horaria local) o, si no tiene, su fecha de modificación.
+    """
+    match = FILENAME_TIMESTAMP_PATTERN.search(os.path.basename(path))
+    if match:
+        local = datetime.datetime.strptime(match.group(1), '%Y%m%d_%H%M%S')
+        return local.replace(tzinfo=timezone) if timezone else local.astimezone()
+    return datetime.datetime.fromtimestamp(os.path.getmtime(path)).astimezone(timezone)
+
+def iter_csv_items(paths, timezone=None):
+    """Leer los CSV en orden y generar pares (registro, referencia de su archivo)."""
+    for path in paths:
+        reference = file_reference(path, timezone)
+        with open(path, newline='', encoding='utf-8') as f:
+            for record in csv.DictReader(f):
+                yield record, reference
+
+def write_records_csv(records, output_file):
+    """Guardar los registros enriquecidos (las listas separadas por espacios) y devolver cuántos se escribieron."""
+    count = 0
+    writer = None
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        for record in records:
+            if writer is None:
+                fieldnames = [field for field in record if field not in DERIVED_FIELDS] + DERIVED_FIELDS
+                writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+                writer.writeheader()
+            writer.writerow({field: ' '.join(value) if isinstance(value, list) else value
+                             for field, value in record.items()})
+            count += 1
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Post-procesar CSV de extracciones en paralelo")
+    parser.add_argument('inputs', nargs='+', help="CSV de entrada (de cualquier scraper)")
+    parser.add_argument('-o', '--output', required=True, help="CSV de salida con los campos derivados")
+    parser.add_argument('--palabras-clave', default='', help="conservar solo registros con alguna (separadas por comas)")
+    parser.add_argument('--procesos', type=int, default=None, help="procesos del pool (por defecto, uno por núcleo)")
+    parser.add_argument('--lote', type=int, default=2000, help="registros por lote enviado a cada proceso")
+    parser.add_argument('--con-repetidos', action='store_true', help="no descartar registros repetidos")
+    parser.add_argument('--ventana-repetidos', type=int, default=100000,
+                        help="claves recientes que se recuerdan para descartar repetidos")
+    parser.add_argument('--zona-horaria', type=ZoneInfo, default=None,
+                        help="zona horaria de la extracción, por ejemplo America/Mexico_City (por defecto, la local)")
+    args = parser.parse_args()
+
+    keywords = [keyword.strip() for keyword in args.palabras_clave.split(',') if keyword.strip()]
+    records = process_items(iter_csv_items(args.inputs, args.zona_horaria), workers=args.procesos,
+                            chunk_size=args.lote, keywords=keywords, dedup=not args.con_repetidos,
+                            dedup_window=args.ventana_repetidos)
+    total = write_records_csv(records, args.output)
+    print(f"{total} registros de {len(args.inputs)} archivos guardados en {args.output}")
@@ -0,0 +1,140 @@
+"""
+Ritmo adaptativo de visitas por plataforma e identidad, con detección de bloqueos.
+
+En lugar de una pausa fija entre cuentas, AdaptiveRateLimiter es un token bucket cuyo ritmo
+se ajusta con lo que devuelve cada página (AIMD):
+- cada página sana sube un poco el ritmo (hasta max_rate), así el scraper se acerca al máximo
+  ritmo que la plataforma tolera;
+- cada muro de inicio de sesión, desafío (captcha, verificación), límite de frecuencia o página
+  de error reduce el ritmo a la mitad y agrega una espera que crece exponencialmente mientras
+  los bloqueos se repitan.
+PAGE_STATE_JS reconoce esos estados por la URL y el texto de la página en la misma espera en que
+se busca el feed, así que un muro de inicio de sesión se detecta sin agotar el tiempo de espera.
+
+Un limitador se comparte por (plataforma, identidad): los workers que salen por la misma IP o
+cuenta deben repartirse el mismo ritmo (ver get_rate_limiter).
+"""
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Estados de página que indican un bloqueo
+BLOCK_STATES = ('login', 'challenge', 'rate_limited', 'error')
+
+# Señales de bloqueo por plataforma: (estado, expresión para la URL, expresión para el texto visible).
+# Solo se revisan mientras no aparece el feed (X muestra "Log in" también en perfiles que sí cargan)
+BLOCK_SIGNALS = {
+    'x': [
+        ('rate_limited', None, r"rate limit exceeded|too many requests|límite de frecuencia"),
+        ('challenge', r"/account/access|/challenge", r"captcha|unusual activity|actividad inusual|verify you are human|verifica que eres"),
+        ('login', r"/i/flow/login|/login", r"sign in to x|inicia sesión en x"),
+        ('error', None, r"something went wrong|algo salió mal|try reloading|intenta recargar")
+    ],
+    'facebook': [
+        ('rate_limited', None, r"temporarily blocked|bloqueado temporalmente|going too fast|demasiado rápido"),
+        ('challenge', r"/checkpoint/", r"captcha|security check|control de seguridad|unusual activity|actividad inusual"),
+        ('login', r"/login|login\.php", r"you must log in|log in to continue|debes iniciar sesión|inicia sesión para continuar"),
+        ('error', None, r"something went wrong|algo salió mal")
+    ]
+}
+
+# Devuelve "ok" si ya está el feed (selector arguments[0]), el estado de bloqueo que coincide con
+# las señales arguments[1], o null si la página todavía no muestra ni una cosa ni la otra
+PAGE_STATE_JS = """
+var selector = arguments[0];
+var signals = arguments[1];
+if (document.querySelector(selector)) {
+    return 'ok';
+}
+var text = document.title + '\\n' + (document.body ? document.body.innerText.slice(0, 5000) : '');
+for (var i = 0; i < signals.length; i++) {
+    var signal = signals[i];
+    if ((signal[1] && new RegExp(signal[1], 'i').test(location.href)) ||
+        (signal[2] && new RegExp(signal[2], 'i').test(text))) {
+        return signal[0];
+    }
+}
+return null;
+"""
+
+# Ritmos por plataforma en visitas por segundo; el inicial equivale a las pausas fijas anteriores
+PLATFORM_LIMITS = {
+    'x': {'rate': 1 / 6.5, 'min_rate': 1 / 120, 'max_rate': 1 / 2, 'increase': 0.01,
+          'base_backoff': 30, 'max_backoff': 900},
+    'facebook': {'rate': 1 / 20, 'min_rate': 1 / 300, 'max_rate': 1 / 5, 'increase': 0.005,
+                 'base_backoff': 60, 'max_backoff': 1800}
+}
+
+class AdaptiveRateLimiter:
+    def __init__(self, rate, min_rate, max_rate, increase, base_backoff, max_backoff, burst=1, jitter=0.3,
+                 name=""):
+        """
+        Token bucket de rate visitas por segundo (con hasta burst visitas acumuladas).
+        Cada página sana suma increase al ritmo (hasta max_rate); cada bloqueo lo divide entre dos
+        (hasta min_rate) y pausa todas las visitas base_backoff * 2^(bloqueos seguidos - 1) segundos,
+        como máximo max_backoff. jitter agrega una fracción aleatoria del intervalo a cada espera.
+        """
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.burst = burst
+        self.jitter = jitter
+        self.name = name
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.consecutive_blocks = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Esperar el turno de la siguiente visita y consumirlo."""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    wait_time = random.uniform(0, self.jitter / self.rate)
+                    break
+                wait_time = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait_time)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def record(self, state):
+        """Ajustar el ritmo con el estado de la página visitada ("ok", un estado de BLOCK_STATES o None)."""
+        with self.lock:
+            if state == 'ok':
+                self.consecutive_blocks = 0
+                self.rate = min(self.max_rate, self.rate + self.increase)
+            elif state in BLOCK_STATES:
+                self.consecutive_blocks += 1
+                self.rate = max(self.min_rate, self.rate / 2)
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (self.consecutive_blocks - 1))
+                self.blocked_until = time.monotonic() + backoff
+                self.tokens = 0.0
+                logger.warning("%s: página en estado '%s' (%d seguidos); pausa de %.0f s y ritmo de una visita "
+                               "cada %.1f s", self.name, state, self.consecutive_blocks, backoff, 1 / self.rate)
+
+# Limitadores compartidos por (plataforma, identidad)
+RATE_LIMITERS = {}
+RATE_LIMITERS_LOCK = threading.Lock()
+
+def get_rate_limiter(platform, identity="default"):
+    """Limitador compartido de la plataforma para la identidad dada (IP, proxy o cuenta de salida)."""
+    with RATE_LIMITERS_LOCK:
+        key = (platform, identity)
+        if key not in RATE_LIMITERS:
+            RATE_LIMITERS[key] = AdaptiveRateLimiter(name=f"{platform}/{identity}", **PLATFORM_LIMITS[platform])
+        return RATE_LIMITERS[key]
+
+def page_state(driver, ready_selector, platform):
+    """Estado actual de la página: "ok", un estado de bloqueo o None (todavía cargando)."""
+    return driver.execute_script(PAGE_STATE_JS, ready_selector, BLOCK_SIGNALS[platform])
@@ -0,0 +1,91 @@
+"""
+Reciclaje del navegador en extracciones largas.
+
+El timeline de X es una SPA que no deja de crecer: después de muchas cuentas, un mismo navegador
+acumula cientos de MB de heap de JavaScript, nodos del DOM y procesos de renderizado, y las cuentas
+siguientes cargan cada vez más lento. RecyclePolicy decide, después de cada cuenta, si conviene
+reemplazar el navegador por uno nuevo: al llegar a un número de cuentas o cuando la memoria medida
+(heap de JavaScript con CDP Performance.getMetrics, RSS de todos los procesos de Chrome con psutil)
+supera el umbral. El reinicio lo hace BrowserSession.restart, que conserva perfil y cookies.
+"""
+import logging
+
+try:
+    import psutil
+except ImportError:  # Sin psutil solo se mide el heap de JavaScript
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+def browser_pid(driver):
+    """PID del chromedriver, del que cuelgan los procesos de Chrome (None si no se conoce)."""
+    try:
+        return driver.service.process.pid
+    except AttributeError:
+        return None
+
+def process_tree_rss(pid):
+    """RSS total (bytes) del proceso pid y sus descendientes; None sin psutil o sin pid."""
+    if psutil is None or pid is None:
+        return None
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    total = 0
+    for process in processes:
+        try:
+            total += process.memory_info().rss
+        except psutil.Error:
+            continue
+    return total
+
+def browser_memory(driver):
+    """
+    Memoria del navegador en MB: heap de JavaScript usado y nodos del DOM de la pestaña actual
+    (CDP Performance.getMetrics) y RSS de todos los procesos. Lo que no se pueda medir queda en None.
+    """
+    usage = {'heap_mb': None, 'nodes': None, 'rss_mb': None}
+    try:
+        driver.execute_cdp_cmd('Performance.enable', {})
+        metrics = driver.execute_cdp_cmd('Performance.getMetrics', {}).get('metrics', [])
+        values = {metric['name']: metric['value'] for metric in metrics}
+        usage['heap_mb'] = round(values.get('JSHeapUsedSize', 0) / 2**20, 1)
+        usage['nodes'] = int(values.get('Nodes', 0))
+    except Exception as e:
+        logger.debug("No se pudieron leer las métricas de rendimiento: %s", e)
+
+    rss = process_tree_rss(browser_pid(driver))
+    if rss is not None:
+        usage['rss_mb'] = round(rss / 2**20, 1)
+    return usage
+
+class RecyclePolicy:
+    def __init__(self, max_accounts=50, max_heap_mb=512, max_rss_mb=2048):
+        """
+        Cuándo reemplazar el navegador: después de max_accounts cuentas, o cuando el heap de
+        JavaScript supera max_heap_mb o el RSS de Chrome supera max_rss_mb. None desactiva cada límite.
+        """
+        self.max_accounts = max_accounts
+        self.max_heap_mb = max_heap_mb
+        self.max_rss_mb = max_rss_mb
+
+    def recycle_reason(self, driver, accounts):
+        """Motivo para reciclar el navegador que ya atendió accounts cuentas (None si no hace falta)."""
+        if self.max_accounts and accounts >= self.max_accounts:
+            return f"{accounts} cuentas con el mismo navegador"
+        if not (self.max_heap_mb or self.max_rss_mb):
+            return None
+
+        usage = browser_memory(driver)
+        logger.debug("Memoria del navegador tras %d cuentas: heap %s MB, %s nodos, RSS %s MB",
+                     accounts, usage['heap_mb'], usage['nodes'], usage['rss_mb'])
+        if self.max_heap_mb and usage['heap_mb'] and usage['heap_mb'] >= self.max_heap_mb:
+            return f"heap de JavaScript de {usage['heap_mb']} MB"
+        if self.max_rss_mb and usage['rss_mb'] and usage['rss_mb'] >= self.max_rss_mb:
+            return f"RSS del navegador de {usage['rss_mb']} MB"
+        return None
+
+# Sin reciclaje: el mismo navegador durante toda la extracción
+NEVER_RECYCLE = RecyclePolicy(max_accounts=None, max_heap_mb=None, max_rss_mb=None)
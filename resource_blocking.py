@@ -0,0 +1,88 @@
+"""
+Bloqueo de recursos que el scraper no necesita descargar.
+
+Solo se guarda si un tweet o publicación tiene media (tiene_media), nunca la imagen o el video,
+así que descargar imágenes, segmentos de video, fuentes y balizas de analítica solo gasta ancho
+de banda del proxy y tiempo de renderizado. Cada perfil de bloqueo es una lista de patrones
+para el comando CDP Network.setBlockedURLs ('*' es comodín); los perfiles que bloquean
+imágenes además desactivan su carga con las preferencias de Chrome.
+
+Los scripts de la página (abs.twimg.com, static.xx.fbcdn.net) nunca se bloquean: sin ellos el
+timeline no se renderiza.
+"""
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Imágenes y video de X y de Facebook
+MEDIA_PATTERNS = [
+    '*pbs.twimg.com/*',
+    '*video.twimg.com/*',
+    '*abs-0.twimg.com/emoji/*',
+    '*scontent*.fbcdn.net/*',
+    '*video*.fbcdn.net/*',
+    '*.mp4*',
+    '*.m3u8*',
+    '*.m4s*'
+]
+
+# Fuentes web
+FONT_PATTERNS = [
+    '*.woff*',
+    '*.ttf*',
+    '*.otf*'
+]
+
+# Balizas de analítica y publicidad
+ANALYTICS_PATTERNS = [
+    '*/i/jot*',
+    '*/1.1/jot/*',
+    '*ads-twitter.com/*',
+    '*ads-api.x.com/*',
+    '*analytics.twitter.com/*',
+    '*google-analytics.com/*',
+    '*googletagmanager.com/*',
+    '*doubleclick.net/*',
+    '*facebook.com/tr?*',
+    '*facebook.com/tr/*'
+]
+
+# Perfiles disponibles: "none" no bloquea nada (comportamiento anterior), "media" solo
+# imágenes y video, "lite" además fuentes y analítica
+BLOCKING_PROFILES = {
+    'none': [],
+    'media': MEDIA_PATTERNS,
+    'lite': MEDIA_PATTERNS + FONT_PATTERNS + ANALYTICS_PATTERNS
+}
+
+# Perfiles que además desactivan las imágenes con las preferencias de Chrome
+IMAGE_BLOCKING_PROFILES = ('media', 'lite')
+
+def blocked_url_patterns(profile):
+    """Devolver los patrones de URL que bloquea el perfil dado."""
+    if profile not in BLOCKING_PROFILES:
+        raise ValueError(f"Perfil de bloqueo no válido: {profile}")
+    return list(BLOCKING_PROFILES[profile])
+
+def add_image_prefs(chrome_options, profile):
+    """
+    Desactivar la carga de imágenes en las opciones de Chrome si el perfil bloquea media.
+    Los contenedores de media siguen en el DOM, así que tiene_media se detecta igual.
+    """
+    if profile in IMAGE_BLOCKING_PROFILES:
+        chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+def apply_blocking(driver, profile):
+    """
+    Bloquear las URLs del perfil en la pestaña actual del WebDriver con Network.setBlockedURLs.
+    Las preferencias no llegan a un navegador al que solo nos conectamos (debuggerAddress);
+    el bloqueo por CDP sí, por eso se aplican los dos.
+    """
+    patterns = blocked_url_patterns(profile)
+    if not patterns:
+        return
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    except Exception as e:
+        logger.warning("No se pudo activar el bloqueo de recursos: %s", e)
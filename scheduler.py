@@ -0,0 +1,365 @@
+"""
+Planificador continuo para vigilar muchas cuentas de X y páginas de Facebook.
+
+En lugar de lanzar un navegador por cada invocación de cron, el planificador queda corriendo,
+mantiene un pool acotado de workers (cada uno con su navegador abierto entre extracciones) y
+decide qué cuenta toca en cada momento:
+- Cada cuenta tiene su intervalo de refresco. Las que publican mucho se revisan más seguido
+  (hasta min_interval_minutes): el intervalo se ajusta para traer unas target_per_run
+  publicaciones nuevas por visita, según la frecuencia de publicación observada.
+- Cuando varias cuentas están pendientes a la vez, primero van las que más publican.
+- Si una cuenta no trae nada nuevo (o falla), su intervalo se multiplica por backoff_factor
+  hasta max_backoff_minutes; vuelve a su ritmo normal en cuanto trae algo.
+Las cuentas de X se extraen de forma incremental con StateStore, así que cada visita solo
+guarda lo publicado desde la anterior.
+
+Configuración (JSON):
+{
+    "settings": {"workers": 3, "output_dir": "monitoreo", "headless": true, "extraction_mode": "js",
+                 "blocking_profile": "lite", "profile_root": ".browser_session/scheduler"},
+    "defaults": {"interval_minutes": 15, "min_interval_minutes": 5, "max_backoff_minutes": 240, "num_tweets": 20},
+    "accounts": [
+        {"platform": "x", "url": "https://x.com/KFC_MEXICO", "interval_minutes": 10},
+        {"platform": "facebook", "name": "KFC México", "url": "https://www.facebook.com/KFCMexico"}
+    ]
+}
+
+Uso: python scheduler.py config.json
+"""
+import datetime
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from browser_session import BrowserSession
+from metrics import JsonLinesMetricsWriter
+from scripts import load_facebook_scraper, load_twitter_scraper
+from sinks import CsvSink, FACEBOOK_COLUMNS
+from state_store import StateStore
+from timeline import account_name_from_url
+
+logger = logging.getLogger("scheduler")
+
+# Plataformas admitidas
+PLATFORMS = ('x', 'facebook')
+
+# Valores por defecto de cada cuenta (se pueden cambiar en "defaults" o en la propia cuenta)
+DEFAULT_ACCOUNT_SETTINGS = {
+    'interval_minutes': 15,
+    'min_interval_minutes': 5,
+    'max_backoff_minutes': 240,
+    'backoff_factor': 2.0,
+    'target_per_run': 5,
+    'num_tweets': 20
+}
+
+# Valores por defecto del planificador
+DEFAULT_SETTINGS = {
+    'workers': 3,
+    'output_dir': 'monitoreo',
+    'headless': True,
+    'extraction_mode': 'js',
+    'blocking_profile': 'lite',
+    'profile_root': os.path.join('.browser_session', 'scheduler'),
+    'delay_range': None,  # Pausa fija adicional entre visitas de un worker, p. ej. [5, 8]
+    'max_wait': 5
+}
+
+# Peso de la última visita en la frecuencia de publicación (media móvil exponencial)
+RATE_SMOOTHING = 0.3
+
+# Publicaciones de Facebook recordadas por página para contar solo las nuevas
+MAX_SEEN_POSTS = 500
+
+# Serializa el cambio temporal de facebook.SESSION mientras un worker crea su driver
+FACEBOOK_SETUP_LOCK = threading.Lock()
+
+class ScheduledAccount:
+    def __init__(self, platform, url, name=None, **settings):
+        """Una cuenta vigilada, con su intervalo, su frecuencia de publicación y su estado de backoff."""
+        if platform not in PLATFORMS:
+            raise ValueError(f"Plataforma no válida: {platform}")
+        options = dict(DEFAULT_ACCOUNT_SETTINGS, **settings)
+        self.platform = platform
+        self.url = url
+        self.name = name or account_name_from_url(url)
+        self.interval = options['interval_minutes'] * 60
+        self.min_interval = min(options['min_interval_minutes'] * 60, self.interval)
+        self.max_backoff = max(options['max_backoff_minutes'] * 60, self.interval)
+        self.backoff_factor = options['backoff_factor']
+        self.target_per_run = options['target_per_run']
+        self.num_tweets = options['num_tweets']
+        self.rate = None  # Publicaciones por hora observadas
+        self.empty_runs = 0
+        self.last_run = None
+        self.next_run = time.time()
+        self.seen_posts = {}  # Solo Facebook: publicaciones ya vistas, en orden de llegada
+
+    def next_interval(self):
+        """Segundos hasta la siguiente visita según la frecuencia observada y el backoff."""
+        if self.empty_runs:
+            return min(self.interval * self.backoff_factor ** self.empty_runs, self.max_backoff)
+        if self.rate:
+            return min(max(self.target_per_run / self.rate * 3600, self.min_interval), self.interval)
+        return self.interval
+
+    def record_run(self, new_items, finished_at):
+        """Actualizar la frecuencia de publicación y el backoff con el resultado de una visita."""
+        if self.last_run is not None:
+            hours = max(finished_at - self.last_run, 1) / 3600
+            observed = new_items / hours
+            self.rate = observed if self.rate is None else RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * self.rate
+        self.empty_runs = 0 if new_items else self.empty_runs + 1
+        self.last_run = finished_at
+        self.next_run = finished_at + self.next_interval()
+
+    def __repr__(self):
+        return f"{self.platform}:{self.name}"
+
+class ScraperWorker:
+    def __init__(self, worker_id, settings, state_store, sinks, metrics_writer):
+        """Worker con sus propios navegadores (uno por plataforma), reutilizados entre visitas."""
+        self.worker_id = worker_id
+        self.settings = settings
+        self.state_store = state_store
+        self.sinks = sinks
+        self.metrics_writer = metrics_writer
+        self.twitter = None
+        self.facebook_session = None
+        self.facebook_driver = None
+        self.last_finished = None
+
+    def profile_dir(self, platform):
+        """Perfil persistente de este worker para la plataforma dada."""
+        return os.path.join(self.settings['profile_root'], f"worker_{self.worker_id}", platform)
+
+    def twitter_scraper(self):
+        """TwitterScraper del worker, creado en la primera cuenta de X."""
+        if self.twitter is None:
+            module = load_twitter_scraper()
+            self.twitter = module.TwitterScraper(
+                headless=self.settings['headless'], extraction_mode=self.settings['extraction_mode'],
+                max_wait=self.settings['max_wait'], session=BrowserSession(profile_dir=self.profile_dir('x')),
+                blocking_profile=self.settings['blocking_profile']
+            )
+        return self.twitter
+
+    def facebook_scraper(self):
+        """Módulo de Facebook y driver del worker, creado en la primera página de Facebook."""
+        facebook = load_facebook_scraper()
+        if self.facebook_driver is None:
+            # setup_driver usa la sesión global del módulo; cada worker necesita su propio perfil
+            with FACEBOOK_SETUP_LOCK:
+                shared_session = facebook.SESSION
+                facebook.SESSION = BrowserSession(profile_dir=self.profile_dir('facebook'))
+                try:
+                    self.facebook_driver = facebook.setup_driver()
+                    self.facebook_session = facebook.SESSION
+                finally:
+                    facebook.SESSION = shared_session
+        return facebook, self.facebook_driver
+
+    def pause(self):
+        """
+        Pausa fija opcional entre dos visitas seguidas de este worker; el ritmo de las visitas
+        ya lo marcan los limitadores compartidos de cada plataforma (ver ratelimit).
+        """
+        if not self.settings['delay_range'] or self.last_finished is None:
+            return
+        wait_time = random.uniform(*self.settings['delay_range']) - (time.time() - self.last_finished)
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+    def run(self, account):
+        """Visitar una cuenta y devolver cuántas publicaciones nuevas trajo."""
+        self.pause()
+        timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        try:
+            if account.platform == 'x':
+                return self.run_twitter(account, timestamp)
+            return self.run_facebook(account, timestamp)
+        except Exception:
+            # Un navegador caído se vuelve a crear en la siguiente visita
+            self.close()
+            raise
+        finally:
+            self.last_finished = time.time()
+
+    def run_twitter(self, account, timestamp):
+        """Extraer los tweets nuevos de la cuenta (incremental con StateStore)."""
+        scraper = self.twitter_scraper()
+        _, count, record = scraper.scrape_and_save_account(account.url, self.sinks['x'], timestamp,
+                                                           account.num_tweets, self.state_store)
+        if self.metrics_writer:
+            self.metrics_writer.write(record)
+        return count
+
+    def run_facebook(self, account, timestamp):
+        """Extraer la página y guardar solo las publicaciones que no se habían visto."""
+        facebook, driver = self.facebook_scraper()
+        posts, _ = facebook.scrape_page(driver, account.name, account.url)
+
+        new_posts = []
+        for post in posts:
+            key = (post.get('date'), post.get('text'))
+            if key not in account.seen_posts:
+                account.seen_posts[key] = True
+                new_posts.append(post)
+        while len(account.seen_posts) > MAX_SEEN_POSTS:
+            account.seen_posts.pop(next(iter(account.seen_posts)))
+
+        if new_posts:
+            output_file = self.sinks['facebook'].write(account.name, new_posts, timestamp)
+            logger.info("Datos de %s guardados en %s", account.name, output_file)
+        return len(new_posts)
+
+    def close(self):
+        """Cerrar los navegadores del worker."""
+        if self.twitter is not None:
+            self.twitter.session.close()
+            self.twitter = None
+        if self.facebook_session is not None:
+            self.facebook_session.close()
+            self.facebook_session = None
+            self.facebook_driver = None
+
+class Scheduler:
+    def __init__(self, accounts, settings=None):
+        """
+        Planificar las cuentas dadas (ScheduledAccount) sobre un pool de settings['workers'] workers.
+        Las cuentas esperan en una cola ordenada por hora de la siguiente visita; al vencer pasan a una
+        cola de listas ordenada por frecuencia de publicación, de la que toman los workers libres.
+        """
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.accounts = accounts
+        self.counter = itertools.count()
+        self.waiting = []  # (siguiente visita, n, cuenta)
+        self.ready = []    # (-publicaciones por hora, siguiente visita, n, cuenta)
+        for account in accounts:
+            heapq.heappush(self.waiting, (account.next_run, next(self.counter), account))
+
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.idle_workers = threading.Semaphore(self.settings['workers'])
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def promote_due(self, now):
+        """Pasar a la cola de listas las cuentas cuya visita ya venció."""
+        while self.waiting and self.waiting[0][0] <= now:
+            next_run, _, account = heapq.heappop(self.waiting)
+            heapq.heappush(self.ready, (-(account.rate or 0), next_run, next(self.counter), account))
+
+    def dispatch(self):
+        """Entregar cuentas listas a los workers libres, primero las que más publican."""
+        while self.ready and self.idle_workers.acquire(blocking=False):
+            account = heapq.heappop(self.ready)[-1]
+            self.tasks.put(account)
+
+    def handle_result(self, account, new_items, error):
+        """Reprogramar una cuenta después de su visita."""
+        if error is not None:
+            logger.error("Error al visitar %s: %s", account, error)
+        account.record_run(new_items, time.time())
+        rate = f"{account.rate:.1f}/h" if account.rate is not None else "sin datos"
+        logger.info("%s: %d nuevas, frecuencia %s, próxima visita en %.0f min", account, new_items, rate,
+                    (account.next_run - time.time()) / 60)
+        heapq.heappush(self.waiting, (account.next_run, next(self.counter), account))
+
+    def worker_loop(self, worker):
+        """Atender cuentas hasta recibir None."""
+        try:
+            while True:
+                account = self.tasks.get()
+                if account is None:
+                    break
+                try:
+                    self.results.put((account, worker.run(account), None))
+                except Exception as e:
+                    self.results.put((account, 0, e))
+                finally:
+                    self.idle_workers.release()
+        finally:
+            worker.close()
+
+    def run(self):
+        """Ejecutar el planificador hasta stop() (o Ctrl+C)."""
+        output_dir = self.settings['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        state_store = StateStore(os.path.join(output_dir, "scraper_state.db"))
+        sinks = {
+            'x': CsvSink(os.path.join(output_dir, 'x')),
+            'facebook': CsvSink(os.path.join(output_dir, 'facebook'), [name for name, _ in FACEBOOK_COLUMNS])
+        }
+        metrics_writer = JsonLinesMetricsWriter(os.path.join(output_dir, "metricas.jsonl"))
+
+        for worker_id in range(1, self.settings['workers'] + 1):
+            worker = ScraperWorker(worker_id, self.settings, state_store, sinks, metrics_writer)
+            thread = threading.Thread(target=self.worker_loop, args=(worker,), daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+        logger.info("Planificador iniciado: %d cuentas, %d workers", len(self.accounts), self.settings['workers'])
+        try:
+            while not self.stop_event.is_set():
+                now = time.time()
+                self.promote_due(now)
+                self.dispatch()
+
+                # Dormir hasta la siguiente visita o hasta que termine alguna
+                timeout = min(self.waiting[0][0] - now, 60) if self.waiting else 60
+                try:
+                    self.handle_result(*self.results.get(timeout=max(timeout, 0.1)))
+                except queue.Empty:
+                    pass
+        except KeyboardInterrupt:
+            logger.info("Deteniendo el planificador...")
+        finally:
+            self.shutdown()
+            for sink in sinks.values():
+                sink.close()
+            metrics_writer.close()
+            state_store.close()
+
+    def stop(self):
+        """Pedir que el planificador termine después de las visitas en curso."""
+        self.stop_event.set()
+
+    def shutdown(self):
+        """Esperar a que los workers terminen su visita y cerrar sus navegadores."""
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+def load_config(path):
+    """Leer la configuración y devolver las cuentas (ScheduledAccount) y los ajustes del planificador."""
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+
+    defaults = config.get('defaults') or {}
+    accounts = []
+    for entry in config.get('accounts') or []:
+        options = dict(defaults, **entry)
+        platform = options.pop('platform', 'x')
+        url = options.pop('url')
+        name = options.pop('name', None)
+        accounts.append(ScheduledAccount(platform, url, name, **options))
+    return accounts, config.get('settings') or {}
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    accounts, settings = load_config(sys.argv[1])
+    Scheduler(accounts, settings).run()
@@ -0,0 +1,44 @@
+"""
+Carga de los scrapers principales como módulos.
+
+twitter_scraperV1.1.py y facebook_scraperV0.1.py.py tienen puntos en el nombre, así que no se
+pueden importar con import. load_twitter_scraper y load_facebook_scraper los cargan por su ruta
+(una sola vez por proceso) para usarlos desde el benchmark o el planificador.
+"""
+import importlib.util
+import os
+import sys
+import threading
+
+# Directorio de los scripts
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TWITTER_SCRIPT = os.path.join(SCRIPT_DIR, "twitter_scraperV1.1.py")
+FACEBOOK_SCRIPT = os.path.join(SCRIPT_DIR, "facebook_scraperV0.1.py.py")
+
+# Evita que dos hilos carguen el mismo script a la vez
+LOAD_LOCK = threading.Lock()
+
+def load_script(path, module_name):
+    """Cargar un script por su ruta; las llamadas siguientes devuelven el mismo módulo."""
+    with LOAD_LOCK:
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        if SCRIPT_DIR not in sys.path:
+            sys.path.insert(0, SCRIPT_DIR)
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception:
+            del sys.modules[module_name]
+            raise
+        return module
+
+def load_twitter_scraper():
+    """Módulo de twitter_scraperV1.1.py (TwitterScraper, scrape_multiple_accounts_parallel...)."""
+    return load_script(TWITTER_SCRIPT, "twitter_scraper_v1_1")
+
+def load_facebook_scraper():
+    """Módulo de facebook_scraperV0.1.py.py (setup_driver, scrape_page...)."""
+    return load_script(FACEBOOK_SCRIPT, "facebook_scraper_v0_1")
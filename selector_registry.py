@@ -0,0 +1,147 @@
+"""
+Registro de las estrategias de extracción que funcionan con la versión actual de la página.
+
+Cada campo (elementos de tweet, texto, fecha, URL, contadores) tiene varias estrategias en orden
+de preferencia, que se prueban en cascada en cada tweet: cuando X cambia su marcado, todos los
+tweets pagan las estrategias que ya no encuentran nada. Que una alternativa funcione una vez no
+basta para preferirla (un tweet sin texto hace que las heurísticas devuelvan el nombre del autor),
+así que SelectorRegistry solo la pasa al primer lugar cuando las preferidas fallan promote_after
+veces seguidas (con resultados vacíos, no con errores) y ella encuentra el campo. Las heurísticas
+de último recurso (fallbacks) nunca se promueven: se prueban siempre después de las demás. En
+cuanto la preferida vuelve a funcionar, se recupera el orden fijo.
+
+Las ganadoras promovidas se guardan en un JSON junto con la versión de la página (el hash del bundle
+principal de JavaScript, ver SITE_VERSION_JS) y se reutilizan en las ejecuciones siguientes mientras
+la versión no cambie. Cada revalidate_every usos de un campo se vuelve a probar el orden original,
+por si una estrategia preferida volvió a funcionar.
+"""
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Archivo por defecto del registro persistente
+SELECTORS_FILE = "selectores.json"
+
+# Devuelve el hash del bundle principal de la página (cambia con cada despliegue de X), o '' si no lo encuentra
+SITE_VERSION_JS = """
+var scripts = document.querySelectorAll('script[src]');
+for (var i = 0; i < scripts.length; i++) {
+    var match = scripts[i].src.match(/\\/main\\.([0-9a-f]+)\\w*\\.js/);
+    if (match) {
+        return match[1];
+    }
+}
+return '';
+"""
+
+class SelectorRegistry:
+    def __init__(self, path=None, revalidate_every=500, promote_after=20):
+        """
+        Registro de estrategias ganadoras por campo; con path se carga y se guarda en ese JSON
+        (sin path solo dura lo que dura el proceso). Una alternativa se promueve después de
+        promote_after aciertos seguidos en los que fallaron las preferidas. Puede compartirse entre hilos.
+        """
+        self.path = path
+        self.revalidate_every = revalidate_every
+        self.promote_after = promote_after
+        self.lock = threading.Lock()
+        self.version = None
+        self.winners = {}
+        self.uses = {}
+        self.streaks = {}
+        if path and os.path.exists(path):
+            self.load()
+
+    def load(self):
+        """Leer las ganadoras guardadas; un archivo dañado se ignora."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            self.version = data.get('version')
+            self.winners = dict(data.get('ganadoras') or {})
+        except (OSError, ValueError) as e:
+            logger.warning("No se pudo leer el registro de selectores %s: %s", self.path, e)
+
+    def save(self):
+        """Guardar las ganadoras (se llama con el lock tomado)."""
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.version, 'ganadoras': self.winners}, f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+
+    def set_version(self, version):
+        """Registrar la versión de la página; si cambió, las ganadoras anteriores se descartan."""
+        if not version:
+            return
+        with self.lock:
+            if version == self.version:
+                return
+            if self.version and self.winners:
+                logger.info("La página cambió de versión (%s -> %s); se vuelven a validar las estrategias",
+                            self.version, version)
+            self.version = version
+            self.winners = {}
+            self.uses = {}
+            self.streaks = {}
+            self.save()
+
+    def order(self, field, names):
+        """Nombres de las estrategias del campo en el orden en que deben probarse."""
+        with self.lock:
+            uses = self.uses.get(field, 0) + 1
+            self.uses[field] = uses
+            winner = self.winners.get(field)
+            if winner not in names or (self.revalidate_every and uses % self.revalidate_every == 0):
+                return list(names)
+            return [winner] + [name for name in names if name != winner]
+
+    def record(self, field, names, name, fallback=False):
+        """
+        Registrar que la estrategia name (de names, en orden de preferencia) encontró el campo.
+        Si es la preferida se recupera el orden fijo; si es una alternativa (que no sea un fallback),
+        pasa al primer lugar después de promote_after aciertos seguidos.
+        """
+        with self.lock:
+            winner = self.winners.get(field)
+            if names and name == names[0]:
+                self.streaks.pop(field, None)
+                if winner is not None:
+                    logger.info("La estrategia preferida para %s volvió a funcionar; se deja de probar '%s' primero",
+                                field, winner)
+                    del self.winners[field]
+                    self.save()
+                return
+            if name == winner or fallback:
+                return
+            previous, count = self.streaks.get(field, (None, 0))
+            count = count + 1 if previous == name else 1
+            if count < self.promote_after:
+                self.streaks[field] = (name, count)
+                return
+            del self.streaks[field]
+            logger.info("Estrategia '%s' para %s después de %d fallos seguidos de las preferidas", name, field, count)
+            self.winners[field] = name
+            self.save()
+
+    def first_match(self, field, strategies, *args, fallbacks=()):
+        """
+        Probar las estrategias del campo ({nombre: función}, en orden de preferencia) con args, la
+        ganadora promovida primero, y devolver el primer resultado distinto de None (None si ninguna
+        encuentra nada). Las estrategias de fallbacks se prueban al final y nunca se promueven.
+        Solo un resultado None cuenta como fallo: si una estrategia lanza una excepción (por ejemplo,
+        StaleElementReferenceException porque el tweet salió de la vista), se propaga sin registrar
+        nada, así un elemento desprendido no suma a la racha de fallos de las preferidas.
+        """
+        names = [name for name in strategies if name not in fallbacks]
+        for name in self.order(field, names) + [name for name in strategies if name in fallbacks]:
+            result = strategies[name](*args)
+            if result is not None:
+                self.record(field, names, name, fallback=name in fallbacks)
+                return result
+        return None
@@ -0,0 +1,380 @@
+"""
+Destinos de salida para los registros extraídos.
+
+Todos los destinos tienen la misma interfaz: write(nombre, registros, timestamp) guarda los
+registros de una cuenta (o página) de una extracción y devuelve la ruta escrita, y
+write_batch(nombre, registros, timestamp, batch) los guarda por lotes: el lote 0 reemplaza lo que
+hubiera de esa cuenta y extracción (por ejemplo, de una ejecución interrumpida) y los siguientes se
+agregan (ver pipeline.RecordPipeline).
+- CsvSink: un archivo {nombre}_{timestamp}.csv por cuenta, como hasta ahora.
+- ParquetSink: archivos Parquet con columnas tipadas (contadores int64, fecha como timestamp,
+  tiene_media booleano), particionados por cuenta y fecha de extracción. Cada extracción
+  agrega un archivo nuevo a su partición.
+- DatabaseSink: base SQLite (o DuckDB) con cada tweet una sola vez, identificado por su ID de
+  estado, y una fila de contadores por tweet y extracción, para consultar cómo evolucionan.
+"""
+import csv
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+
+from metrics import PHASES
+from twitter_html import extract_status_id
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow solo es necesario para ParquetSink
+    pa = None
+    pq = None
+
+try:
+    import duckdb
+except ImportError:  # duckdb solo es necesario para DatabaseSink con engine="duckdb"
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# Columnas de los CSV de salida por cuenta
+CSV_FIELDNAMES = ['cuenta', 'texto', 'fecha', 'url', 'comentarios', 'retweets', 'me_gusta', 'compartidos', 'tiene_media']
+
+# Esquemas tipados (columna, tipo) de los registros de cada plataforma
+TWEET_COLUMNS = [
+    ('cuenta', 'string'),
+    ('texto', 'string'),
+    ('fecha', 'timestamp'),
+    ('url', 'string'),
+    ('comentarios', 'int64'),
+    ('retweets', 'int64'),
+    ('me_gusta', 'int64'),
+    ('compartidos', 'int64'),
+    ('tiene_media', 'bool')
+]
+FACEBOOK_COLUMNS = [
+    ('page', 'string'),
+    ('date', 'string'),
+    ('text', 'string'),
+    ('reactions', 'int64'),
+    ('comments', 'int64'),
+    ('shares', 'int64'),
+    ('mentions', 'int64')
+]
+
+def save_tweets_csv(tweets, output_file, fieldnames=CSV_FIELDNAMES, append=False):
+    """
+    Guardar una lista de registros en un archivo CSV con las columnas indicadas.
+    Con append se agregan al final del archivo (el encabezado solo se escribe si el archivo es nuevo).
+    Los campos que no están en fieldnames (como engagement.ABBREVIATED_KEY) no se escriben.
+    """
+    # Asegurar que todos los tweets tienen todos los campos
+    for tweet in tweets:
+        for field in fieldnames:
+            if field not in tweet:
+                tweet[field] = ""
+
+    write_header = not (append and os.path.exists(output_file) and os.path.getsize(output_file) > 0)
+    with open(output_file, 'a' if append else 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames, extrasaction='ignore')
+        if write_header:
+            writer.writeheader()
+        writer.writerows(tweets)
+
+def save_extraction_summary(accounts_stats, output_dir, timestamp, accounts_metrics=None):
+    """
+    Guardar el resumen resumen_extraccion_{timestamp}.csv y mostrar los totales.
+    accounts_metrics ({cuenta: registro de metrics.ScrapeMetrics}) agrega la duración, las llamadas
+    a WebDriver y los segundos de cada fase; las columnas quedan vacías para cuentas sin métricas.
+    """
+    accounts_metrics = accounts_metrics or {}
+    try:
+        summary_file = os.path.join(output_dir, f"resumen_extraccion_{timestamp}.csv")
+        with open(summary_file, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['Cuenta', 'Tweets Extraídos', 'Fecha Extracción', 'Segundos', 'Llamadas WebDriver',
+                             'Llamadas por Tweet'] + [f"{phase} (s)" for phase in PHASES])
+            for account, count in accounts_stats.items():
+                record = accounts_metrics.get(account) or {}
+                phases = record.get('fases') or {}
+                writer.writerow(
+                    [account, count, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                     record.get('segundos', ''), record.get('llamadas_webdriver', ''), record.get('llamadas_por_tweet', '')]
+                    + [phases.get(phase, 0.0) if phases else '' for phase in PHASES]
+                )
+
+        logger.info("Resumen de la extracción guardado en %s", summary_file)
+    except Exception as e:
+        logger.error("Error al guardar el archivo de resumen: %s", e)
+
+    lines = ['=' * 50, f"Total de tweets recolectados: {sum(accounts_stats.values())}", "Tweets por cuenta:"]
+    lines.extend(f"- {account}: {count} tweets" for account, count in accounts_stats.items())
+    lines.append('=' * 50)
+    logger.info("\n".join(lines))
+
+def to_timestamp(value):
+    """
+    Convertir una fecha ISO (como '2024-05-01T12:00:00.000Z') o un datetime a datetime con zona.
+    Una fecha sin zona, sea texto o datetime, se toma como UTC (la hora local debe llegar con su zona).
+    """
+    if isinstance(value, datetime.datetime):
+        date = value
+    elif not value:
+        return None
+    else:
+        try:
+            date = datetime.datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    return date if date.tzinfo else date.replace(tzinfo=datetime.timezone.utc)
+
+def to_int(value):
+    """Convertir un contador a entero (None si está vacío o no es numérico)."""
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def to_bool(value):
+    """Convertir un indicador a booleano, aceptando también el texto 'True'/'False' de los CSV."""
+    if isinstance(value, str):
+        return value.strip().lower() in ('true', '1', 'si', 'sí')
+    return bool(value)
+
+# Conversión de cada tipo lógico a su tipo de Arrow y a su valor Python
+COLUMN_TYPES = {
+    'string': (lambda: pa.string(), lambda value: "" if value is None else str(value)),
+    'int64': (lambda: pa.int64(), to_int),
+    'bool': (lambda: pa.bool_(), to_bool),
+    'timestamp': (lambda: pa.timestamp('ms', tz='UTC'), to_timestamp)
+}
+
+class CsvSink:
+    def __init__(self, output_dir, fieldnames=CSV_FIELDNAMES, filename="{name}_{timestamp}.csv"):
+        """
+        Escribir un CSV por cuenta y extracción en output_dir.
+        filename es el patrón del nombre de archivo (con {name} y {timestamp}); uno fijo, como
+        "tweets.csv", junta todo en un solo archivo si se escribe siempre con el mismo nombre.
+        """
+        self.output_dir = output_dir
+        self.fieldnames = fieldnames
+        self.filename = filename
+        os.makedirs(output_dir or '.', exist_ok=True)
+
+    def path(self, name, timestamp):
+        """Ruta del CSV de la cuenta y la extracción."""
+        return os.path.join(self.output_dir, self.filename.format(name=name, timestamp=timestamp))
+
+    def write(self, name, records, timestamp):
+        """Guardar los registros en {nombre}_{timestamp}.csv."""
+        output_file = self.path(name, timestamp)
+        save_tweets_csv(records, output_file, self.fieldnames)
+        return output_file
+
+    def write_batch(self, name, records, timestamp, batch):
+        """Guardar un lote: el primero crea el archivo y los siguientes se agregan al final."""
+        output_file = self.path(name, timestamp)
+        save_tweets_csv(records, output_file, self.fieldnames, append=batch > 0)
+        return output_file
+
+    def close(self):
+        """Los CSV se cierran al escribirse; no hay nada pendiente."""
+        pass
+
+class ParquetSink:
+    def __init__(self, output_dir, columns=TWEET_COLUMNS, partition_column='cuenta'):
+        """
+        Escribir Parquet particionado en output_dir/{partition_column}={nombre}/fecha_extraccion={AAAA-MM-DD}/.
+        columns define el esquema tipado de los registros; la columna de partición no se repite
+        dentro de los archivos porque se reconstruye a partir de la ruta al leer el dataset.
+        """
+        if pa is None:
+            raise ImportError("Se necesita pyarrow para escribir Parquet: pip install pyarrow")
+        self.output_dir = output_dir
+        self.columns = [(name, kind) for name, kind in columns if name != partition_column]
+        self.partition_column = partition_column
+        self.schema = pa.schema([(name, COLUMN_TYPES[kind][0]()) for name, kind in self.columns])
+        os.makedirs(output_dir, exist_ok=True)
+
+    def to_table(self, records):
+        """Convertir los registros en una tabla de Arrow con el esquema tipado."""
+        arrays = {}
+        for name, kind in self.columns:
+            convert = COLUMN_TYPES[kind][1]
+            arrays[name] = [convert(record.get(name)) for record in records]
+        return pa.Table.from_pydict(arrays, schema=self.schema)
+
+    def partition_dir(self, name, timestamp):
+        """Directorio de la partición de la cuenta y del día de la extracción."""
+        extraction_date = datetime.datetime.strptime(timestamp, '%Y%m%d_%H%M%S').strftime('%Y-%m-%d')
+        partition_dir = os.path.join(
+            self.output_dir, f"{self.partition_column}={name}", f"fecha_extraccion={extraction_date}"
+        )
+        os.makedirs(partition_dir, exist_ok=True)
+        return partition_dir
+
+    def write(self, name, records, timestamp):
+        """Agregar los registros como un archivo nuevo en la partición de la cuenta y del día."""
+        output_file = os.path.join(self.partition_dir(name, timestamp), f"part-{timestamp}.parquet")
+        pq.write_table(self.to_table(records), output_file, compression='zstd')
+        return output_file
+
+    def write_batch(self, name, records, timestamp, batch):
+        """
+        Guardar un lote como part-{timestamp}-{lote}.parquet; el primero borra antes los lotes de la
+        misma extracción que hubiera dejado una ejecución interrumpida.
+        """
+        partition_dir = self.partition_dir(name, timestamp)
+        if batch == 0:
+            for filename in os.listdir(partition_dir):
+                if filename.startswith(f"part-{timestamp}-"):
+                    os.remove(os.path.join(partition_dir, filename))
+        output_file = os.path.join(partition_dir, f"part-{timestamp}-{batch:05d}.parquet")
+        pq.write_table(self.to_table(records), output_file, compression='zstd')
+        return output_file
+
+    def close(self):
+        """Cada escritura produce un archivo completo; no hay nada pendiente."""
+        pass
+
+# Tipos de columna de DatabaseSink en cada motor
+DATABASE_TYPES = {
+    'sqlite': {'string': 'TEXT', 'int64': 'INTEGER', 'bool': 'INTEGER', 'timestamp': 'TEXT'},
+    'duckdb': {'string': 'VARCHAR', 'int64': 'BIGINT', 'bool': 'BOOLEAN', 'timestamp': 'TIMESTAMP'}
+}
+
+# Contadores que se guardan como historial, una fila por tweet y extracción
+ENGAGEMENT_COLUMNS = ['comentarios', 'retweets', 'me_gusta', 'compartidos']
+
+def to_database_timestamp(value):
+    """Fecha en UTC como texto 'AAAA-MM-DD HH:MM:SS', que ordena bien en SQLite y DuckDB lo convierte."""
+    date = to_timestamp(value)
+    if date is None:
+        return None
+    return date.astimezone(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+class DatabaseSink:
+    def __init__(self, path, engine='sqlite', batch_size=500):
+        """
+        Guardar los tweets en una base embebida (SQLite por defecto, o DuckDB).
+        - tweets: una fila por ID de estado (se actualiza si el tweet vuelve a extraerse),
+          con índice por (cuenta, fecha).
+        - engagement: una fila por tweet y extracción con sus contadores; nunca se modifica,
+          así que guarda la evolución de me_gusta, retweets, etc.
+        Cada write es una transacción; los registros se insertan en lotes de batch_size.
+        """
+        if engine not in DATABASE_TYPES:
+            raise ValueError(f"Motor de base de datos no válido: {engine}")
+        if engine == 'duckdb' and duckdb is None:
+            raise ImportError("Se necesita duckdb para DatabaseSink con engine='duckdb': pip install duckdb")
+        self.path = path
+        self.engine = engine
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if engine == 'duckdb':
+            self.connection = duckdb.connect(path)
+        else:
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        self.create_tables()
+
+    def create_tables(self):
+        """Crear las tablas y los índices si no existen."""
+        types = DATABASE_TYPES[self.engine]
+        counters = ", ".join(f"{name} {types['int64']}" for name in ENGAGEMENT_COLUMNS)
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS tweets ("
+            f" status_id {types['string']} PRIMARY KEY,"
+            f" cuenta {types['string']} NOT NULL,"
+            f" texto {types['string']},"
+            f" fecha {types['timestamp']},"
+            f" url {types['string']},"
+            f" tiene_media {types['bool']},"
+            f" primera_extraccion {types['timestamp']},"
+            f" ultima_extraccion {types['timestamp']})",
+            "CREATE INDEX IF NOT EXISTS idx_tweets_cuenta_fecha ON tweets (cuenta, fecha)",
+            f"CREATE TABLE IF NOT EXISTS engagement ("
+            f" status_id {types['string']} NOT NULL,"
+            f" extraccion {types['timestamp']} NOT NULL,"
+            f" {counters},"
+            f" PRIMARY KEY (status_id, extraccion))"
+        ]
+        with self.lock:
+            for statement in statements:
+                self.connection.execute(statement)
+            self.connection.commit()
+
+    def write(self, name, records, timestamp):
+        """
+        Guardar los tweets de una cuenta en una sola transacción y devolver la ruta de la base.
+        Los tweets sin ID de estado no se pueden identificar y se omiten.
+        """
+        # El timestamp de la extracción es hora local; con su zona explícita se guarda bien en UTC
+        extraction = to_database_timestamp(datetime.datetime.strptime(timestamp, '%Y%m%d_%H%M%S').astimezone())
+        tweet_rows = []
+        engagement_rows = []
+        for record in records:
+            status_id = extract_status_id(record.get('url'))
+            if not status_id:
+                continue
+            tweet_rows.append((status_id, record.get('cuenta') or name, record.get('texto'),
+                               to_database_timestamp(record.get('fecha')), record.get('url'),
+                               to_bool(record.get('tiene_media')), extraction, extraction))
+            engagement_rows.append((status_id, extraction) + tuple(to_int(record.get(column))
+                                                                  for column in ENGAGEMENT_COLUMNS))
+        if len(tweet_rows) < len(records):
+            logger.warning("%d tweets de %s sin ID de estado no se guardaron en la base",
+                           len(records) - len(tweet_rows), name)
+
+        counter_placeholders = ", ".join("?" for _ in ENGAGEMENT_COLUMNS)
+        upsert_tweet = (
+            "INSERT INTO tweets (status_id, cuenta, texto, fecha, url, tiene_media, primera_extraccion, ultima_extraccion)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (status_id) DO UPDATE SET texto = excluded.texto, fecha = excluded.fecha,"
+            " url = excluded.url, tiene_media = excluded.tiene_media, ultima_extraccion = excluded.ultima_extraccion"
+        )
+        insert_engagement = (
+            f"INSERT INTO engagement (status_id, extraccion, {', '.join(ENGAGEMENT_COLUMNS)})"
+            f" VALUES (?, ?, {counter_placeholders}) ON CONFLICT DO NOTHING"
+        )
+        with self.lock:
+            try:
+                self.connection.execute("BEGIN TRANSACTION")
+                for start in range(0, len(tweet_rows), self.batch_size):
+                    self.connection.executemany(upsert_tweet, tweet_rows[start:start + self.batch_size])
+                    self.connection.executemany(insert_engagement, engagement_rows[start:start + self.batch_size])
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+        return self.path
+
+    def write_batch(self, name, records, timestamp, batch):
+        """Guardar un lote; las inserciones ya son idempotentes, así que todos los lotes se tratan igual."""
+        return self.write(name, records, timestamp)
+
+    def engagement_history(self, cuenta, since=None):
+        """
+        Evolución de los contadores de los tweets de una cuenta (publicados desde since, si se indica):
+        lista de (status_id, fecha, extraccion, comentarios, retweets, me_gusta, compartidos).
+        """
+        query = (
+            f"SELECT t.status_id, t.fecha, e.extraccion, {', '.join('e.' + column for column in ENGAGEMENT_COLUMNS)}"
+            " FROM tweets t JOIN engagement e ON e.status_id = t.status_id"
+            " WHERE t.cuenta = ?"
+        )
+        params = [cuenta]
+        if since:
+            query += " AND t.fecha >= ?"
+            params.append(to_database_timestamp(since))
+        query += " ORDER BY t.fecha, e.extraccion"
+        with self.lock:
+            return self.connection.execute(query, params).fetchall()
+
+    def close(self):
+        """Cerrar la conexión con la base."""
+        with self.lock:
+            self.connection.close()
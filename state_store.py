@@ -0,0 +1,54 @@
+"""
+Estado persistente entre ejecuciones para la extracción incremental.
+
+Guarda en SQLite, por cuenta, el ID de estado más reciente ya extraído (la "marca de agua").
+Los IDs de X son crecientes en el tiempo, así que cualquier tweet con un ID menor o igual
+a la marca ya se extrajo en una ejecución anterior.
+"""
+import datetime
+import sqlite3
+import threading
+
+# Archivo por defecto de la base de estado
+STATE_DB = "scraper_state.db"
+
+class StateStore:
+    def __init__(self, path=STATE_DB):
+        """Abrir (o crear) la base de estado; puede compartirse entre hilos."""
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.lock, self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS account_state ("
+                " cuenta TEXT PRIMARY KEY,"
+                " last_status_id TEXT NOT NULL,"
+                " updated_at TEXT NOT NULL)"
+            )
+
+    def get_last_status_id(self, account_handle):
+        """Devolver el último ID de estado extraído de la cuenta, o None si nunca se extrajo."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT last_status_id FROM account_state WHERE cuenta = ?", (account_handle,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def update_last_status_id(self, account_handle, status_id):
+        """Avanzar la marca de agua de la cuenta si status_id es más reciente."""
+        if not status_id:
+            return
+        current = self.get_last_status_id(account_handle)
+        if current is not None and int(current) >= int(status_id):
+            return
+
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO account_state (cuenta, last_status_id, updated_at) VALUES (?, ?, ?)",
+                (account_handle, str(status_id), datetime.datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def close(self):
+        """Cerrar la conexión con la base."""
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,198 @@
+"""
+Piezas del recorrido de un timeline de X que no dependen del cliente del navegador.
+
+Las usan tanto TwitterScraper (Selenium) como AsyncTwitterScraper (CDP con asyncio):
+los scripts que se inyectan en la página, la conversión de un snapshot JavaScript al
+esquema de salida y las reglas que deciden cuándo termina el recorrido.
+"""
+import datetime
+import json
+import logging
+
+from engagement import ABBREVIATED_KEY, extract_number, is_abbreviated
+from twitter_html import MEDIA_TESTIDS, extract_status_id
+
+logger = logging.getLogger(__name__)
+
+# Selectores CSS de los contenedores de media (no de las imágenes cargadas, que pueden estar bloqueadas)
+MEDIA_SELECTORS = [f'[data-testid="{testid}"]' for testid in MEDIA_TESTIDS] + ['video']
+
+# Contador de salida y etiqueta del snapshot de la que sale
+SNAPSHOT_COUNT_LABELS = {'comentarios': 'reply', 'retweets': 'retweet', 'me_gusta': 'like', 'compartidos': 'bookmark'}
+
+# Script que se inyecta en la página para leer, en una sola llamada al navegador,
+# todos los tweets visibles. Devuelve un arreglo JSON con los datos crudos de cada tweet.
+TWEET_SNAPSHOT_JS = """
+var mediaSelectors = %s;
+var statTestids = ['reply', 'retweet', 'like', 'bookmark'];
+
+function statLabel(tweet, testid) {
+    var element = tweet.querySelector('[data-testid="' + testid + '"]');
+    if (!element) {
+        return '';
+    }
+    var parent = element.parentElement;
+    var label = (parent && parent.getAttribute('aria-label')) || element.getAttribute('aria-label');
+    return label || (element.innerText || '').trim();
+}
+
+var tweets = [];
+document.querySelectorAll('article[data-testid="tweet"]').forEach(function (tweet) {
+    var textElement = tweet.querySelector('[data-testid="tweetText"]') || tweet.querySelector('div[lang]');
+    var timeElement = tweet.querySelector('time[datetime]');
+    var linkElement = (timeElement && timeElement.closest('a[href*="/status/"]')) ||
+        tweet.querySelector('a[href*="/status/"]');
+    var labels = {};
+    statTestids.forEach(function (testid) {
+        labels[testid] = statLabel(tweet, testid);
+    });
+    tweets.push({
+        text: textElement ? textElement.innerText : '',
+        datetime: timeElement ? timeElement.getAttribute('datetime') : '',
+        url: linkElement ? linkElement.href : '',
+        media: mediaSelectors.some(function (selector) { return tweet.querySelector(selector) !== null; }),
+        promoted: tweet.querySelector('[data-testid="socialProof"]') !== null,
+        context: tweet.querySelector('[data-testid="socialContext"]') !== null,
+        labels: labels
+    });
+});
+return JSON.stringify(tweets);
+""" % json.dumps(MEDIA_SELECTORS)
+
+# Instala (una sola vez por página) un MutationObserver que cuenta las celdas nuevas del timeline.
+# Devuelve el contador actual para usarlo como marca antes de hacer scroll.
+TIMELINE_OBSERVER_JS = """
+if (!window.__scraperTimelineObserver) {
+    window.__scraperTimelineChanges = 0;
+    window.__scraperTimelineObserver = new MutationObserver(function (mutations) {
+        for (var i = 0; i < mutations.length; i++) {
+            var added = mutations[i].addedNodes;
+            for (var j = 0; j < added.length; j++) {
+                var node = added[j];
+                if (node.nodeType === 1 && (node.matches('[data-testid="cellInnerDiv"], article') ||
+                        node.querySelector('[data-testid="cellInnerDiv"], article'))) {
+                    window.__scraperTimelineChanges += 1;
+                    return;
+                }
+            }
+        }
+    });
+    window.__scraperTimelineObserver.observe(document.body, {childList: true, subtree: true});
+}
+return window.__scraperTimelineChanges;
+"""
+
+def wrap_script(script):
+    """Convertir un script con 'return' (formato de execute_script) en una expresión evaluable por CDP."""
+    return f"(function () {{{script}}})()"
+
+def account_name_from_url(account_url):
+    """Obtener el nombre de usuario de la URL de cuenta."""
+    if not account_url:
+        return "unknown"
+    # Limpiar la URL para extraer solo el nombre de usuario y eliminar parámetros de query
+    handle = account_url.rstrip('/').split('/')[-1]
+    return handle.split('?')[0] or "unknown"
+
+def tweet_from_snapshot(snapshot, account_handle):
+    """
+    Convertir un tweet crudo del snapshot JavaScript al formato de salida.
+    Los contadores que salieron de etiquetas abreviadas quedan anotados en ABBREVIATED_KEY.
+    """
+    labels = snapshot.get('labels') or {}
+    tweet = {
+        'cuenta': account_handle,
+        'texto': snapshot.get('text') or "",
+        'fecha': snapshot.get('datetime') or "",
+        'url': snapshot.get('url') or "",
+        'tiene_media': bool(snapshot.get('media'))
+    }
+    for column, name in SNAPSHOT_COUNT_LABELS.items():
+        tweet[column] = extract_number(labels.get(name))
+    abbreviated = [column for column, name in SNAPSHOT_COUNT_LABELS.items() if is_abbreviated(labels.get(name))]
+    if abbreviated:
+        tweet[ABBREVIATED_KEY] = abbreviated
+    return tweet
+
+def is_within_days(date_str, days):
+    """Verificar si un tweet se publicó en los últimos days días."""
+    if not date_str:
+        return False
+    try:
+        tweet_date = datetime.datetime.fromisoformat(date_str.replace('Z', '+00:00'))
+        if tweet_date.tzinfo is None:
+            tweet_date = tweet_date.replace(tzinfo=datetime.timezone.utc)
+        return (datetime.datetime.now(datetime.timezone.utc) - tweet_date).days < days
+    except ValueError:
+        return False
+
+class TimelineCollector:
+    def __init__(self, num_tweets, since_id=None, refresh_days=None, is_recent=None, recovered=None, on_add=None):
+        """
+        Acumular los tweets de un recorrido incremental y decidir cuándo termina.
+        El recorrido termina al reunir num_tweets tweets, al llegar a un tweet más antiguo que 2 años
+        (is_recent permite otra regla) o, con since_id, al llegar a los ya extraídos; con refresh_days,
+        los ya extraídos de los últimos refresh_days días se aceptan de nuevo para actualizar contadores.
+        recovered son tweets ya extraídos antes de una interrupción (ver checkpoint): cuentan para
+        num_tweets y no se repiten. on_add recibe cada tweet aceptado en cuanto se acepta.
+        """
+        self.num_tweets = num_tweets
+        self.since_id = since_id
+        self.refresh_days = refresh_days
+        self.is_recent = is_recent or (lambda date_str: is_within_days(date_str, 730))
+        self.tweets = list(recovered or [])
+        self.recovered_ids = {extract_status_id(tweet['url']) for tweet in self.tweets} - {""}
+        self.seen_ids = set(self.recovered_ids)
+        self.on_add = on_add
+        self.finished = len(self.tweets) >= num_tweets
+
+    @property
+    def records(self):
+        """Tweets aceptados (nombre común a todos los acumuladores del motor)."""
+        return self.tweets
+
+    def add(self, tweet_data, has_context):
+        """
+        Procesar un tweet nuevo (has_context indica un tweet fijado o un retweet, cuya fecha no
+        sigue el orden del timeline). Devuelve False cuando el recorrido debe terminar.
+        """
+        if self.finished:
+            return False
+        tweet_date = tweet_data['fecha']
+
+        # Tweets recuperados del diario de una ejecución interrumpida
+        status_id = extract_status_id(tweet_data['url'])
+        if status_id in self.recovered_ids:
+            return True
+
+        # Tweets ya extraídos en una ejecución anterior
+        if self.since_id and status_id and int(status_id) <= int(self.since_id):
+            if has_context:
+                return True
+            if not (self.refresh_days and is_within_days(tweet_date, self.refresh_days)):
+                logger.info("Se alcanzaron los tweets extraídos en la ejecución anterior, se detiene el scroll")
+                self.finished = True
+                return False
+
+        # Si no pudimos extraer la fecha, intentamos seguir con el tweet
+        if not tweet_date:
+            logger.debug("Advertencia en tweet %d: no se pudo extraer la fecha, pero continuamos", len(self.seen_ids))
+        elif not self.is_recent(tweet_date):
+            # Los tweets fijados y los retweets pueden ser antiguos sin que termine el timeline
+            if has_context:
+                logger.debug("Saltando tweet %d: es más antiguo que 2 años", len(self.seen_ids))
+                return True
+            logger.info("Se alcanzó un tweet más antiguo que 2 años, se detiene el scroll")
+            self.finished = True
+            return False
+
+        self.tweets.append(tweet_data)
+        if self.on_add:
+            self.on_add(tweet_data)
+        logger.debug("Tweet %d extraído: %.30s...", len(self.tweets), tweet_data['texto'] or "Sin texto")
+
+        # Si ya tenemos suficientes tweets, terminamos
+        if len(self.tweets) >= self.num_tweets:
+            self.finished = True
+            return False
+        return True
@@ -0,0 +1,220 @@
+"""
+Lectura de las respuestas JSON del timeline de X (consultas GraphQL como UserTweets).
+
+La interfaz web recibe los tweets con los contadores exactos en estas respuestas; aquí se
+convierten al mismo esquema que producen los scrapers (cuenta, texto, fecha, url, ...).
+Las funciones de parseo no dependen de Selenium, por lo que pueden usarse sin navegador
+sobre respuestas grabadas previamente.
+"""
+import base64
+import datetime
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Fragmentos de URL de las consultas GraphQL que devuelven tweets del perfil
+TIMELINE_URL_FRAGMENTS = ('/UserTweets', '/UserTweetsAndReplies', '/UserMedia')
+
+# Consultas de la página de un tweet (con sesión iniciada y sin ella)
+DETAIL_URL_FRAGMENTS = ('/TweetDetail', '/TweetResultByRestId')
+
+# Formato de created_at en las respuestas, por ejemplo "Wed Oct 10 20:19:24 +0000 2018"
+CREATED_AT_FORMAT = '%a %b %d %H:%M:%S %z %Y'
+
+# Número de lecturas fallidas del cuerpo de una respuesta antes de descartarla
+MAX_BODY_ATTEMPTS = 3
+
+def find_instructions(payload):
+    """Buscar la lista 'instructions' del timeline dentro de una respuesta GraphQL."""
+    if isinstance(payload, dict):
+        instructions = payload.get('instructions')
+        if isinstance(instructions, list):
+            return instructions
+        for value in payload.values():
+            found = find_instructions(value)
+            if found is not None:
+                return found
+    elif isinstance(payload, list):
+        for value in payload:
+            found = find_instructions(value)
+            if found is not None:
+                return found
+    return None
+
+def unwrap_tweet_result(result):
+    """Obtener el objeto Tweet real (X envuelve algunos en TweetWithVisibilityResults)."""
+    if not isinstance(result, dict):
+        return None
+    if result.get('__typename') == 'TweetWithVisibilityResults':
+        result = result.get('tweet') or {}
+    return result if result.get('legacy') else None
+
+def tweet_from_item_content(item_content):
+    """Extraer el resultado de tweet de un itemContent, omitiendo los promocionados."""
+    if not item_content or item_content.get('promotedMetadata'):
+        return None
+    return unwrap_tweet_result((item_content.get('tweet_results') or {}).get('result'))
+
+def iter_timeline_entries(payload):
+    """
+    Recorrer los tweets de una respuesta del timeline en el orden en que se muestran.
+    Genera pares (tweet_result, fijado); los tweets promocionados y los cursores se omiten.
+    """
+    for instruction in find_instructions(payload) or []:
+        instruction_type = instruction.get('type')
+        if instruction_type == 'TimelinePinEntry':
+            entries, pinned = [instruction.get('entry') or {}], True
+        elif instruction_type == 'TimelineAddEntries':
+            entries, pinned = instruction.get('entries') or [], False
+        else:
+            continue
+
+        for entry in entries:
+            if entry.get('entryId', '').startswith('promoted'):
+                continue
+
+            content = entry.get('content') or {}
+            # Conversaciones: un módulo con varios tweets
+            if content.get('items'):
+                item_contents = [(item.get('item') or {}).get('itemContent') for item in content['items']]
+            else:
+                item_contents = [content.get('itemContent')]
+
+            for item_content in item_contents:
+                tweet_result = tweet_from_item_content(item_content)
+                if tweet_result:
+                    yield tweet_result, pinned
+
+def is_retweet(tweet_result):
+    """Verificar si el resultado de tweet es un retweet."""
+    return bool(tweet_result['legacy'].get('retweeted_status_result'))
+
+def format_created_at(created_at):
+    """Convertir created_at al formato ISO que usa el atributo datetime de la página."""
+    try:
+        date = datetime.datetime.strptime(created_at, CREATED_AT_FORMAT)
+        return date.astimezone(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    except (TypeError, ValueError):
+        return ""
+
+def screen_name_of(tweet_result):
+    """Obtener el nombre de usuario del autor de un tweet."""
+    user = ((tweet_result.get('core') or {}).get('user_results') or {}).get('result') or {}
+    return (user.get('legacy') or {}).get('screen_name') or (user.get('core') or {}).get('screen_name') or ""
+
+def engagement_counts(legacy):
+    """Contadores exactos de un tweet a partir de su objeto legacy."""
+    return {
+        'comentarios': int(legacy.get('reply_count') or 0),
+        'retweets': int(legacy.get('retweet_count') or 0),
+        'me_gusta': int(legacy.get('favorite_count') or 0),
+        'compartidos': int(legacy.get('bookmark_count') or 0)
+    }
+
+def find_tweet_result(payload, status_id):
+    """Buscar en cualquier respuesta GraphQL el tweet con el ID de estado dado (None si no está)."""
+    if isinstance(payload, dict):
+        tweet_result = unwrap_tweet_result(payload)
+        if tweet_result and (tweet_result.get('rest_id') or tweet_result['legacy'].get('id_str')) == status_id:
+            return tweet_result
+        values = payload.values()
+    elif isinstance(payload, list):
+        values = payload
+    else:
+        return None
+    for value in values:
+        found = find_tweet_result(value, status_id)
+        if found is not None:
+            return found
+    return None
+
+def tweet_record(tweet_result, account_handle):
+    """
+    Convertir un resultado de tweet al esquema de salida de los scrapers, con contadores exactos.
+    Como en la página, un retweet se registra con el texto, la URL y los contadores del tweet original.
+    """
+    if is_retweet(tweet_result):
+        original = unwrap_tweet_result(tweet_result['legacy']['retweeted_status_result'].get('result'))
+        if original:
+            tweet_result = original
+
+    legacy = tweet_result['legacy']
+
+    # Los tweets largos traen el texto completo en note_tweet
+    note = ((tweet_result.get('note_tweet') or {}).get('note_tweet_results') or {}).get('result') or {}
+    text = note.get('text') or legacy.get('full_text') or ""
+
+    status_id = legacy.get('id_str') or tweet_result.get('rest_id') or ""
+    screen_name = screen_name_of(tweet_result) or account_handle
+    media = (legacy.get('extended_entities') or {}).get('media') or (legacy.get('entities') or {}).get('media')
+
+    record = {
+        'cuenta': account_handle,
+        'texto': text,
+        'fecha': format_created_at(legacy.get('created_at')),
+        'url': f"https://x.com/{screen_name}/status/{status_id}" if status_id else "",
+        'tiene_media': bool(media)
+    }
+    record.update(engagement_counts(legacy))
+    return record
+
+def parse_timeline_response(payload, account_handle):
+    """Convertir una respuesta completa del timeline en una lista de tweets."""
+    return [tweet_record(tweet_result, account_handle) for tweet_result, _ in iter_timeline_entries(payload)]
+
+def load_timeline_fixture(path, account_handle):
+    """
+    Leer una respuesta grabada (o una lista de respuestas) desde un archivo JSON
+    y devolver sus tweets, sin necesidad de navegador.
+    """
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+
+    payloads = data if isinstance(data, list) else [data]
+    tweets = []
+    for payload in payloads:
+        tweets.extend(parse_timeline_response(payload, account_handle))
+    return tweets
+
+def read_timeline_responses(driver, pending):
+    """
+    Leer del log de rendimiento de Chrome las respuestas del timeline recibidas desde la última llamada
+    y obtener sus cuerpos con Network.getResponseBody.
+    pending es un diccionario {requestId: intentos} que conserva las respuestas cuyo cuerpo
+    aún no estaba disponible para reintentarlas en la siguiente llamada.
+    """
+    for log_entry in driver.get_log('performance'):
+        try:
+            message = json.loads(log_entry['message'])['message']
+        except (KeyError, ValueError):
+            continue
+        if message.get('method') != 'Network.responseReceived':
+            continue
+        params = message.get('params') or {}
+        url = (params.get('response') or {}).get('url', '')
+        if any(fragment in url for fragment in TIMELINE_URL_FRAGMENTS):
+            pending.setdefault(params.get('requestId'), 0)
+
+    payloads = []
+    for request_id in list(pending):
+        try:
+            response = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+        except Exception:
+            # El cuerpo puede no estar completo todavía; se reintenta en la siguiente lectura
+            pending[request_id] += 1
+            if pending[request_id] >= MAX_BODY_ATTEMPTS:
+                logger.warning("No se pudo leer la respuesta %s, se descarta", request_id)
+                del pending[request_id]
+            continue
+
+        del pending[request_id]
+        body = response.get('body') or ""
+        if response.get('base64Encoded'):
+            body = base64.b64decode(body).decode('utf-8')
+        try:
+            payloads.append(json.loads(body))
+        except ValueError as e:
+            logger.warning("Respuesta del timeline con JSON no válido: %s", e)
+
+    return payloads
@@ -0,0 +1,166 @@
+"""
+Parser de HTML sin navegador para páginas de perfil de X guardadas.
+
+Extrae los mismos registros que TwitterScraper (cuenta, texto, fecha, url, ...) a partir de
+driver.page_source o de archivos .html guardados, usando lxml dentro del mismo proceso.
+Así la captura solo necesita volcar el HTML y el parseo puede hacerse después, en lote,
+repartido entre todos los núcleos.
+
+Uso: python twitter_html.py <directorio_html> <salida.csv>
+"""
+import csv
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urljoin
+
+from engagement import extract_number
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # lxml solo es necesario para parsear HTML
+    lxml_html = None
+
+# Patrón del ID de estado dentro de la URL de un tweet
+STATUS_ID_PATTERN = re.compile(r'/status/(\d+)')
+
+# Dirección base para completar los enlaces relativos de las páginas guardadas
+BASE_URL = "https://x.com"
+
+# Consultas XPath equivalentes a los selectores que usa TwitterScraper
+TWEET_XPATH = '//article[@data-testid="tweet"]'
+TEXT_XPATHS = ['.//*[@data-testid="tweetText"]', './/div[@lang]']
+# Contenedores de media: siguen en el DOM aunque la imagen o el video no se descarguen
+MEDIA_TESTIDS = ['tweetPhoto', 'videoPlayer', 'videoComponent', 'mediaPreview', 'card.layoutLarge.media']
+MEDIA_XPATH = ' | '.join([f'.//*[@data-testid="{testid}"]' for testid in MEDIA_TESTIDS] + ['.//video'])
+STAT_TESTIDS = {
+    'reply': 'comentarios',
+    'retweet': 'retweets',
+    'like': 'me_gusta',
+    'bookmark': 'compartidos'
+}
+
+def extract_status_id(url):
+    """Extraer el ID numérico de estado de una URL de tweet ('' si no tiene)."""
+    if not url:
+        return ""
+    match = STATUS_ID_PATTERN.search(url)
+    return match.group(1) if match else ""
+
+def account_from_filename(path):
+    """Obtener la cuenta de un archivo volcado como {cuenta}_{fecha}_{hora}_{nnn}.html."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    parts = name.rsplit('_', 3)
+    return parts[0] if len(parts) == 4 else name
+
+def stat_label(tweet, testid):
+    """Obtener el aria-label (o el texto) del contador con el data-testid dado."""
+    elements = tweet.xpath(f'.//*[@data-testid="{testid}"]')
+    if not elements:
+        return ""
+    element = elements[0]
+    parent = element.getparent()
+    label = (parent.get('aria-label') if parent is not None else None) or element.get('aria-label')
+    return label or element.text_content().strip()
+
+def tweet_text(tweet):
+    """Obtener el texto del tweet probando los mismos selectores que el scraper."""
+    for xpath in TEXT_XPATHS:
+        elements = tweet.xpath(xpath)
+        if elements:
+            return elements[0].text_content().strip()
+    return ""
+
+def tweet_url(tweet, base_url):
+    """Obtener la URL del tweet, preferentemente el enlace de su fecha."""
+    hrefs = tweet.xpath('.//time/ancestor::a[contains(@href, "/status/")][1]/@href')
+    if not hrefs:
+        hrefs = tweet.xpath('.//a[contains(@href, "/status/")]/@href')
+    return urljoin(base_url, hrefs[0]) if hrefs else ""
+
+def parse_tweets_html(page_html, account_handle, base_url=BASE_URL):
+    """
+    Extraer los tweets de un documento HTML.
+    Omite los tweets promocionados y los repetidos; no filtra por antigüedad.
+    """
+    if lxml_html is None:
+        raise ImportError("Se necesita lxml para parsear HTML: pip install lxml")
+
+    document = lxml_html.fromstring(page_html)
+    tweets_data = []
+    seen_ids = set()
+
+    for tweet in document.xpath(TWEET_XPATH):
+        # Verificar si parece un tweet promocionado
+        if tweet.xpath('.//*[@data-testid="socialProof"]'):
+            continue
+
+        url = tweet_url(tweet, base_url)
+        status_id = extract_status_id(url)
+        if not status_id or status_id in seen_ids:
+            continue
+        seen_ids.add(status_id)
+
+        dates = tweet.xpath('.//time/@datetime')
+        tweet_data = {
+            'cuenta': account_handle,
+            'texto': tweet_text(tweet),
+            'fecha': dates[0] if dates else "",
+            'url': url,
+            'tiene_media': bool(tweet.xpath(MEDIA_XPATH))
+        }
+        for testid, stat_key in STAT_TESTIDS.items():
+            tweet_data[stat_key] = extract_number(stat_label(tweet, testid))
+
+        tweets_data.append(tweet_data)
+
+    return tweets_data
+
+def parse_html_file(path, account_handle=None, base_url=BASE_URL):
+    """Extraer los tweets de un archivo .html (la cuenta se toma del nombre si no se indica)."""
+    with open(path, encoding='utf-8') as f:
+        page_html = f.read()
+    return parse_tweets_html(page_html, account_handle or account_from_filename(path), base_url)
+
+def parse_html_files(paths, workers=None, base_url=BASE_URL):
+    """
+    Parsear muchos archivos .html en paralelo con un proceso por núcleo (workers=None).
+    Devuelve los tweets de todos los archivos sin repetir IDs de estado, en el orden de paths.
+    """
+    paths = list(paths)
+    tweets_data = []
+    seen_ids = set()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 4))
+        results = executor.map(parse_html_file, paths, [None] * len(paths), [base_url] * len(paths),
+                               chunksize=chunksize)
+        for file_tweets in results:
+            for tweet_data in file_tweets:
+                status_id = extract_status_id(tweet_data['url'])
+                if status_id in seen_ids:
+                    continue
+                seen_ids.add(status_id)
+                tweets_data.append(tweet_data)
+
+    return tweets_data
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print(__doc__.strip().splitlines()[-1])
+        sys.exit(1)
+
+    html_dir, output_file = sys.argv[1], sys.argv[2]
+    html_paths = sorted(
+        os.path.join(html_dir, name) for name in os.listdir(html_dir) if name.endswith('.html')
+    )
+
+    tweets = parse_html_files(html_paths)
+    fieldnames = ['cuenta', 'texto', 'fecha', 'url', 'comentarios', 'retweets', 'me_gusta', 'compartidos', 'tiene_media']
+    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(tweets)
+
+    print(f"{len(tweets)} tweets de {len(html_paths)} archivos guardados en {output_file}")
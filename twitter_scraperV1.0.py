@@ -1,19 +1,29 @@
 import time
-import csv
+import os
 import re
 import random
+import functools
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException
 from selenium.webdriver.common.action_chains import ActionChains
+from checkpoint import CheckpointJournal
+from pipeline import RecordPipeline
+from ratelimit import get_rate_limiter, page_state
+from sinks import CsvSink
 
 class TwitterScraper:
-    def __init__(self, headless=False):
-        """Inicializar el scraper de Twitter/X."""
+    def __init__(self, headless=False, rate_limiter=None):
+        """
+        Inicializar el scraper de Twitter/X.
+        rate_limiter (ratelimit.AdaptiveRateLimiter) marca el ritmo de visitas; por defecto, el compartido de X.
+        """
+        self.rate_limiter = rate_limiter or get_rate_limiter('x')
+        # Si la última cuenta se recorrió completa (la página cargó y se encontraron tweets)
+        self.completed = False
         chrome_options = Options()
         if headless:
             chrome_options.add_argument("--headless=new")  # Modo headless más reciente
@@ -223,27 +233,33 @@ class TwitterScraper:
         except:
             return False
             
-    def scrape_account(self, account_url, num_tweets=20):
-        """Raspar tweets de una cuenta específica de Twitter/X."""
+    def scrape_account(self, account_url, num_tweets=20, recovered=None, on_tweet=None):
+        """
+        Raspar tweets de una cuenta específica de Twitter/X.
+        recovered son tweets extraídos antes de una interrupción: se conservan y no se extraen de nuevo;
+        on_tweet recibe cada tweet nuevo en cuanto se extrae.
+        """
+        self.completed = False
+        recovered = recovered or []
+        recovered_urls = {tweet['url'] for tweet in recovered}
+        # La visita espera su turno en el limitador de ritmo (en lugar de una pausa fija entre cuentas)
+        self.rate_limiter.acquire()
         self.driver.get(account_url)
         print(f"Accediendo a: {account_url}")
         
-        # Esperar a que cargue la página
-        selectors = ['[data-testid="tweet"]', 'article', '[data-testid="cellInnerDiv"]']
-        found = False
-        
-        for selector in selectors:
-            try:
-                self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                print(f"Página cargada, encontrado selector: {selector}")
-                found = True
-                break
-            except TimeoutException:
-                continue
+        # Esperar a que cargue la página; un muro de inicio de sesión o un desafío terminan la espera
+        try:
+            state = self.wait.until(
+                lambda driver: page_state(driver, '[data-testid="tweet"], article, [data-testid="cellInnerDiv"]', 'x')
+            )
+        except TimeoutException:
+            state = None
+        self.rate_limiter.record(state)
                 
-        if not found:
-            print("No se pudo cargar la página correctamente")
-            return []
+        if state != 'ok':
+            print(f"No se pudo cargar la página correctamente (estado: {state})" if state
+                  else "No se pudo cargar la página correctamente")
+            return recovered
         
         # Scroll para cargar más tweets
         num_scrolls_needed = max(2, num_tweets // 4)  # Más scrolls para asegurar cargar suficientes tweets
@@ -265,7 +281,7 @@ class TwitterScraper:
         
         if not tweet_elements:
             print("No se encontraron tweets con ninguno de los selectores")
-            return []
+            return recovered
         
         # Filtrar tweets que parezcan promocionados o repetidos
         filtered_tweets = []
@@ -274,7 +290,7 @@ class TwitterScraper:
         for tweet in tweet_elements:
             try:
                 url = self.extract_tweet_url(tweet)
-                if url and url not in tweet_urls:
+                if url and url not in tweet_urls and url not in recovered_urls:
                     tweet_urls.add(url)
                     filtered_tweets.append(tweet)
             except:
@@ -282,11 +298,11 @@ class TwitterScraper:
                 
         print(f"Después de filtrar: {len(filtered_tweets)} tweets únicos")
         
-        # Extraer datos de los tweets
-        tweets_data = []
+        # Extraer datos de los tweets (los recuperados cuentan para num_tweets)
+        tweets_data = list(recovered)
         account_handle = account_url.split('/')[-1]
         
-        for i, tweet in enumerate(filtered_tweets[:num_tweets]):
+        for i, tweet in enumerate(filtered_tweets[:max(num_tweets - len(recovered), 0)]):
             try:
                 # Hacer scroll al tweet para asegurar que está en la vista
                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", tweet)
@@ -320,6 +336,8 @@ class TwitterScraper:
                 # Solo agregar tweets con texto o URL válida
                 if tweet_text or tweet_url:
                     tweets_data.append(tweet_data)
+                    if on_tweet:
+                        on_tweet(tweet_data)
                     print(f"Tweet {i+1} extraído: {tweet_text[:30]}..." if tweet_text else "Sin texto")
                 
             except StaleElementReferenceException:
@@ -329,52 +347,69 @@ class TwitterScraper:
                 print(f"Error general al extraer tweet {i+1}: {e}")
                 continue
         
+        self.completed = True
         return tweets_data
     
-    def scrape_multiple_accounts(self, account_urls, output_file='tweets_data.csv', num_tweets_per_account=20):
-        """Raspar múltiples cuentas de Twitter/X y guardar los resultados en un CSV."""
-        all_tweets = []
+    def scrape_multiple_accounts(self, account_urls, output_file='tweets_data.csv', num_tweets_per_account=20,
+                                 checkpoint=None, batch_size=100):
+        """
+        Raspar múltiples cuentas de Twitter/X y guardar los resultados en un CSV.
+        Los tweets se escriben en lotes de batch_size a medida que se extraen (ver pipeline.RecordPipeline),
+        sin juntar en memoria los de todas las cuentas.
+        Con checkpoint (un checkpoint.CheckpointJournal) cada tweet se registra en el diario al extraerse;
+        si la extracción se interrumpe, la siguiente ejecución con el mismo diario recupera los tweets
+        de las cuentas terminadas y retoma la cuenta interrumpida.
+        """
+        timestamp = time.strftime('%Y%m%d_%H%M%S')
+        if checkpoint:
+            timestamp = checkpoint.begin(timestamp)
         
-        for url in account_urls:
-            print(f"\n{'='*50}\nRaspando cuenta: {url}\n{'='*50}")
-            tweets = self.scrape_account(url, num_tweets_per_account)
-            all_tweets.extend(tweets)
-            # Pausa entre cuentas para evitar detección
-            time.sleep(random.uniform(5, 8))
+        fieldnames = ['cuenta', 'texto', 'fecha', 'url', 'comentarios', 'retweets', 'me_gusta', 'compartidos', 'tiene_media']
+        sink = CsvSink(os.path.dirname(output_file), fieldnames, filename=os.path.basename(output_file))
+        pipeline = RecordPipeline(sink, timestamp, batch_size=batch_size)
+        accounts = {}
+        metrics_examples = []
         
-        # Guardar resultados en CSV
-        if all_tweets:
-            fieldnames = ['cuenta', 'texto', 'fecha', 'url', 'comentarios', 'retweets', 'me_gusta', 'compartidos', 'tiene_media']
-            
-            with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                writer.writeheader()
-                writer.writerows(all_tweets)
-            
+        try:
+            for url in account_urls:
+                account_handle = url.split('/')[-1]
+                done = checkpoint and checkpoint.is_done(account_handle)
+                if done:
+                    print(f"Cuenta {account_handle} ya extraída antes de la interrupción")
+                    tweets = checkpoint.records(account_handle)
+                else:
+                    print(f"\n{'='*50}\nRaspando cuenta: {url}\n{'='*50}")
+                    if checkpoint:
+                        tweets = self.scrape_account(url, num_tweets_per_account, checkpoint.records(account_handle),
+                                                     functools.partial(checkpoint.append, account_handle))
+                    else:
+                        tweets = self.scrape_account(url, num_tweets_per_account)
+                
+                # Todas las cuentas van al mismo CSV; solo se conservan los conteos y tres ejemplos
+                for tweet in tweets:
+                    pipeline.put(output_file, tweet)
+                    accounts[tweet['cuenta']] = accounts.get(tweet['cuenta'], 0) + 1
+                    if len(metrics_examples) < 3 and any(tweet[metric] > 0 for metric in ['comentarios', 'retweets', 'me_gusta', 'compartidos']):
+                        metrics_examples.append(tweet)
+                
+                # La cuenta se marca terminada solo cuando sus tweets ya están en el canal; una cuenta
+                # que falló o vino vacía queda pendiente para la siguiente ejecución
+                if checkpoint and not done and tweets and self.completed:
+                    checkpoint.finish(account_handle, len(tweets))
+        finally:
+            total = sum(pipeline.close().values())
+        
+        if total:
             print(f"\nDatos guardados en {output_file}")
-            print(f"Total de tweets recolectados: {len(all_tweets)}")
+            print(f"Total de tweets recolectados: {total}")
             
             # Mostrar estadísticas por cuenta
-            accounts = {}
-            for tweet in all_tweets:
-                account = tweet['cuenta']
-                if account not in accounts:
-                    accounts[account] = 0
-                accounts[account] += 1
-                
             print("\nTweets por cuenta:")
             for account, count in accounts.items():
                 print(f"- {account}: {count} tweets")
                 
             # Mostrar ejemplos de métricas
             print("\nEjemplos de métricas encontradas:")
-            metrics_examples = []
-            for tweet in all_tweets:
-                if any(tweet[metric] > 0 for metric in ['comentarios', 'retweets', 'me_gusta', 'compartidos']):
-                    metrics_examples.append(tweet)
-                    if len(metrics_examples) >= 3:
-                        break
-                        
             for i, example in enumerate(metrics_examples):
                 print(f"\nEjemplo {i+1}:")
                 print(f"Texto: {example['texto'][:50]}...")
@@ -384,6 +419,10 @@ class TwitterScraper:
                 print(f"Compartidos: {example['compartidos']}")
         else:
             print("No se pudieron extraer tweets.")
+        
+        # El diario se borra solo si todas las cuentas quedaron terminadas
+        if checkpoint:
+            checkpoint.close(complete=all(checkpoint.is_done(url.split('/')[-1]) for url in account_urls))
 
 def extract_number(text):
     """Extraer número de texto como '5 respuestas' o '10.2K Me gusta'."""
@@ -431,8 +470,9 @@ if __name__ == "__main__":
     scraper = TwitterScraper(headless=False)
     
     try:
-        # Raspar 20 tweets por cuenta
-        scraper.scrape_multiple_accounts(accounts, 'fast_food_tweets.csv', 20)
+        # Raspar 20 tweets por cuenta; si se interrumpe, la siguiente ejecución retoma desde el diario
+        scraper.scrape_multiple_accounts(accounts, 'fast_food_tweets.csv', 20,
+                                         checkpoint=CheckpointJournal('fast_food_tweets.checkpoint.jsonl'))
     finally:
         # Asegurar que el navegador se cierre correctamente
         del scraper
\ No newline at end of file
@@ -1,9 +1,13 @@
 import time
-import csv
 import re
 import random
 import os
+import json
+import logging
+import queue
+import threading
 import datetime
+import functools
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
@@ -12,97 +16,319 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, StaleElementReferenceException
 from selenium.webdriver.common.action_chains import ActionChains
+from browser_session import DEFAULT_USER_AGENT, BrowserSession, build_chrome_options
+from checkpoint import CheckpointJournal
+from engagement import ABBREVIATED_KEY, extract_number, is_abbreviated
+from identities import LEASE_TIMEOUT
+from twitter_graphql import iter_timeline_entries, is_retweet, read_timeline_responses, tweet_record
+from twitter_html import extract_status_id
+from timeline import (MEDIA_SELECTORS, TWEET_SNAPSHOT_JS, TIMELINE_OBSERVER_JS, TimelineCollector,
+                      account_name_from_url, is_within_days, tweet_from_snapshot)
+from resource_blocking import apply_blocking
+from recycling import RecyclePolicy
+from selector_registry import SITE_VERSION_JS, SelectorRegistry
+from ratelimit import get_rate_limiter, page_state
+from state_store import StateStore
+from sinks import CsvSink, save_extraction_summary
+from metrics import JsonLinesMetricsWriter, ScrapeMetrics, timed_phase
+
+logger = logging.getLogger("twitter_scraper")
 
 class TwitterScraper:
-    def __init__(self, headless=False):
-        """Inicializar el scraper de Twitter/X."""
-        chrome_options = Options()
-        if headless:
-            chrome_options.add_argument("--headless=new")  # Modo headless más reciente
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-gpu")
-        chrome_options.add_argument("--window-size=1920,1080")
-        chrome_options.add_argument("--disable-notifications")
-        chrome_options.add_argument("--disable-popup-blocking")
-        chrome_options.add_argument("--disable-automation")  # Evitar detección de automatización
-        
-        # Configuraciones para evitar detección
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # Agregar user-agent personalizado para reducir probabilidad de bloqueo
-        chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36")
-        
-        self.driver = webdriver.Chrome(options=chrome_options)
+    def __init__(self, headless=False, extraction_mode="dom", max_wait=5, session=None, blocking_profile="none",
+                 recycle_policy=None, rate_limiter=None, identity=None, enricher=None, selector_registry=None):
+        """
+        Inicializar el scraper de Twitter/X.
+        extraction_mode puede ser "dom" (un elemento a la vez con WebDriver), "js"
+        (un solo execute_script por scroll que devuelve todos los tweets visibles) o "network"
+        (lee los tweets del JSON que recibe la página, con contadores exactos).
+        max_wait es el máximo de segundos que se espera a que el timeline cargue contenido nuevo.
+        session es un BrowserSession para reutilizar perfil y navegador entre ejecuciones
+        (por defecto, un navegador nuevo con perfil temporal).
+        blocking_profile elige qué recursos no se descargan ("none", "media" o "lite", ver
+        resource_blocking); tiene_media se sigue detectando por los contenedores de media.
+        recycle_policy (un recycling.RecyclePolicy) decide cuándo reemplazar el navegador entre cuentas
+        para que la memoria no crezca en extracciones largas (por defecto, RecyclePolicy();
+        recycling.NEVER_RECYCLE lo desactiva).
+        rate_limiter (un ratelimit.AdaptiveRateLimiter) marca el ritmo de las visitas a perfiles; por
+        defecto, el limitador compartido de X, que frena ante bloqueos y acelera con páginas sanas.
+        identity (un identities.Identity) fija el proxy, el user-agent y el perfil del navegador;
+        el limitador de ritmo por defecto es entonces el de esa identidad.
+        enricher (un enrichment.ExactCountEnricher) reemplaza, antes de guardar cada cuenta, los contadores
+        abreviados ("10.2K") por los exactos de la página de cada tweet; el modo "network" no lo necesita.
+        selector_registry (un selector_registry.SelectorRegistry) recuerda qué selector o método funcionó
+        para cada campo en el modo "dom" y lo prueba primero; con un archivo, la elección se conserva entre
+        ejecuciones (por defecto, solo durante esta ejecución).
+        """
+        if extraction_mode not in ("dom", "js", "network"):
+            raise ValueError(f"Modo de extracción no válido: {extraction_mode}")
+        self.extraction_mode = extraction_mode
+        self.max_wait = max_wait
+        self.headless = headless
+        self.blocking_profile = blocking_profile
+        self.recycle_policy = recycle_policy or RecyclePolicy()
+        self.identity = identity
+        self.enricher = enricher if extraction_mode != "network" else None
+        self.selectors = selector_registry or SelectorRegistry()
+        self.rate_limiter = rate_limiter or get_rate_limiter('x', identity.name if identity else "default")
+        # Estado y segundos de carga de la última página abierta (para el pool de identidades)
+        self.last_page = (None, None)
+        
+        # Llamadas a WebDriver y tiempo por fase de cada cuenta
+        self.metrics = ScrapeMetrics()
+        self.session = session or BrowserSession(profile_dir=identity.profile_dir if identity else None)
+        self.start_browser()
+    
+    def chrome_options(self):
+        """Opciones de Chrome del scraper (nuevas en cada llamada, para cada arranque del navegador)."""
+        chrome_options = build_chrome_options(
+            headless=self.headless,
+            user_agent=self.identity.user_agent if self.identity else DEFAULT_USER_AGENT,
+            proxy=self.identity.proxy if self.identity else None,
+            arguments=["--window-size=1920,1080", "--disable-popup-blocking", "--disable-automation"],
+            blocking_profile=self.blocking_profile,  # Sin imágenes la página pesa mucho menos
+            proxy_loopback=self.identity.proxy_loopback if self.identity else False
+        )
+        
+        # El modo "network" necesita el log de rendimiento para ver las respuestas de red
+        if self.extraction_mode == "network":
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        return chrome_options
+    
+    def start_browser(self, restart=False):
+        """Iniciar el navegador (o, con restart, reemplazarlo por uno nuevo con el mismo perfil y cookies)."""
+        if restart:
+            self.driver = self.session.restart(self.chrome_options())
+        else:
+            self.driver = self.session.start(self.chrome_options())
+        apply_blocking(self.driver, self.blocking_profile)
+        self.metrics.instrument(self.driver)
         self.wait = WebDriverWait(self.driver, 15)
         self.actions = ActionChains(self.driver)
+        # Respuestas del timeline pendientes de leer en modo "network" ({requestId: intentos})
+        self.pending_responses = {}
+        self.accounts_since_start = 0
+    
+    def recycle_if_needed(self):
+        """Después de cada cuenta: reemplazar el navegador si la política de reciclaje lo pide."""
+        self.accounts_since_start += 1
+        reason = self.recycle_policy.recycle_reason(self.driver, self.accounts_since_start)
+        if not reason:
+            return False
+        logger.info("Reciclando el navegador (%s)", reason)
+        self.start_browser(restart=True)
+        return True
         
     def __del__(self):
         """Cerrar el navegador cuando se destruye el objeto."""
         try:
-            self.driver.quit()
+            self.session.close()
         except:
             pass
     
-    def scroll_down(self, num_scrolls=5, pause=2):
+    def close_popups(self):
+        """Cerrar la ventana emergente de inicio de sesión si aparece."""
+        try:
+            close_buttons = self.driver.find_elements(By.CSS_SELECTOR, '[data-testid="modal-close"], [role="button"][aria-label*="Close"], button[aria-label*="Close"]')
+            if close_buttons:
+                close_buttons[0].click()
+                logger.debug("Ventana emergente cerrada")
+                # Esperar a que el modal desaparezca en lugar de una pausa fija
+                WebDriverWait(self.driver, 1).until(EC.staleness_of(close_buttons[0]))
+        except:
+            pass
+    
+    def mark_timeline(self):
+        """Instalar el observador del timeline y devolver el contador actual de cambios."""
+        try:
+            return self.driver.execute_script(TIMELINE_OBSERVER_JS) or 0
+        except Exception as e:
+            logger.warning("Error al instalar el observador del timeline: %s", e)
+            return None
+    
+    def wait_for_timeline_change(self, marker, timeout=None):
+        """
+        Esperar hasta que el timeline agregue celdas nuevas después de la marca dada,
+        con un máximo de timeout segundos (self.max_wait por defecto).
+        Devuelve True si hubo cambios y False si se agotó el tiempo.
+        """
+        timeout = self.max_wait if timeout is None else timeout
+        
+        # Sin observador (por ejemplo, si la inyección falló) se espera el máximo configurado
+        if marker is None:
+            time.sleep(timeout)
+            return False
+        
+        try:
+            WebDriverWait(self.driver, timeout, poll_frequency=0.1).until(
+                lambda driver: (driver.execute_script("return window.__scraperTimelineChanges || 0;") or 0) > marker
+            )
+            return True
+        except TimeoutException:
+            return False
+    
+    @timed_phase('scroll')
+    def scroll_down(self, num_scrolls=5, max_wait=None):
         """Desplazar hacia abajo para cargar más tweets."""
         for i in range(num_scrolls):
-            print(f"Scroll {i+1}/{num_scrolls}")
+            logger.debug("Scroll %d/%d", i + 1, num_scrolls)
+            marker = self.mark_timeline()
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(random.uniform(pause * 0.8, pause * 1.2))  # Pausa aleatoria
+            self.wait_for_timeline_change(marker, max_wait)
             
             # Verificar si hay una ventana emergente de inicio de sesión y cerrarla
-            try:
-                close_buttons = self.driver.find_elements(By.CSS_SELECTOR, '[data-testid="modal-close"], [role="button"][aria-label*="Close"], button[aria-label*="Close"]')
-                if close_buttons:
-                    close_buttons[0].click()
-                    print("Ventana emergente cerrada")
-                    time.sleep(1)
-            except:
-                pass
-    
-    def extract_stat_direct(self, tweet, data_testid):
-        """Extraer estadística directamente usando data-testid."""
+            self.close_popups()
+    
+    @timed_phase('scroll')
+    def scroll_one_viewport(self, max_wait=None):
+        """
+        Desplazar aproximadamente una pantalla hacia abajo y esperar a que se rendericen tweets nuevos.
+        A diferencia de scroll_down, no salta tweets que X elimina del DOM al quedar fuera de la vista.
+        """
+        marker = self.mark_timeline()
+        self.driver.execute_script("window.scrollBy(0, Math.floor(window.innerHeight * 0.9));")
+        self.wait_for_timeline_change(marker, max_wait)
+        self.close_popups()
+    
+    def stat_label_direct(self, tweet, data_testid):
+        """Etiqueta de una estadística buscada directamente por data-testid (None si el tweet no tiene ese elemento)."""
         try:
             # Intentar encontrar el elemento específico por data-testid
             group_elements = tweet.find_elements(By.CSS_SELECTOR, f'[data-testid="{data_testid}"]')
             if not group_elements:
-                return 0
-                
+                return None
+            
             group_element = group_elements[0]
             
             # En Twitter/X, el texto con el número está en un span dentro del elemento con data-testid
             # o podría estar en el aria-label del elemento padre
             try:
-                # Intentar obtener del aria-label
+                # Intentar obtener del aria-label (del padre o del propio elemento, como en TWEET_SNAPSHOT_JS)
                 parent = group_element.find_element(By.XPATH, './..')
-                aria_label = parent.get_attribute('aria-label')
+                aria_label = parent.get_attribute('aria-label') or group_element.get_attribute('aria-label')
                 if aria_label:
-                    print(f"Aria-label encontrado para {data_testid}: {aria_label}")
-                    return extract_number(aria_label)
+                    logger.debug("Aria-label encontrado para %s: %s", data_testid, aria_label)
+                    return aria_label
                 
                 # Si no hay aria-label, intentar obtener del texto
                 spans = group_element.find_elements(By.CSS_SELECTOR, 'span')
                 for span in spans:
                     span_text = span.text.strip()
                     if span_text:
-                        print(f"Texto encontrado para {data_testid}: {span_text}")
-                        return extract_number(span_text)
+                        logger.debug("Texto encontrado para %s: %s", data_testid, span_text)
+                        return span_text
                 
-                return 0
+                return ""
+            except StaleElementReferenceException:
+                raise
             except Exception as e:
-                print(f"Error al extraer texto para {data_testid}: {e}")
-                return 0
-
+                logger.debug("Error al extraer texto para %s: %s", data_testid, e)
+                return ""
+        
+        except StaleElementReferenceException:
+            raise
         except NoSuchElementException:
-            print(f"No se encontró elemento para {data_testid}")
-            return 0
+            logger.debug("No se encontró elemento para %s", data_testid)
+            return None
         except Exception as e:
-            print(f"Error general al buscar {data_testid}: {e}")
-            return 0
+            logger.debug("Error general al buscar %s: %s", data_testid, e)
+            return None
     
+    def stats_from_testids(self, tweet):
+        """Método 1: buscar cada contador directamente por data-testid (None si no hay ninguno)."""
+        data_testids = {
+            'reply': 'comentarios',
+            'retweet': 'retweets',
+            'like': 'me_gusta',
+            'bookmark': 'compartidos'
+        }
+        labels = {stat_key: self.stat_label_direct(tweet, testid) for testid, stat_key in data_testids.items()}
+        if all(label is None for label in labels.values()):
+            return None
+        stats = {stat_key: extract_number(label) for stat_key, label in labels.items()}
+        abbreviated = [stat_key for stat_key, label in labels.items() if is_abbreviated(label)]
+        if abbreviated:
+            stats[ABBREVIATED_KEY] = abbreviated
+        return stats
+    
+    def stats_from_group_buttons(self, tweet):
+        """Método 2: leer los botones con role="button" dentro de groups (None si no hay)."""
+        metrics_groups = tweet.find_elements(By.CSS_SELECTOR, '[role="group"] [role="button"]')
+        if not metrics_groups:
+            return None
+        
+        stats = dict.fromkeys(['comentarios', 'retweets', 'me_gusta', 'compartidos'], 0)
+        abbreviated = []
+        for metric in metrics_groups:
+            try:
+                # Obtener el texto y el aria-label
+                aria_text = metric.get_attribute('aria-label') or ""
+                inner_text = metric.text or ""
+                
+                # Usar el texto que tenga información
+                metric_text = aria_text if len(aria_text) > len(inner_text) else inner_text
+                metric_text = metric_text.lower()
+                
+                logger.debug("Texto de métrica encontrado: %s", metric_text)
+                
+                # Check que tipo de métrica es
+                stat_key = None
+                if any(keyword in metric_text for keyword in ["repl", "respuesta", "comment"]):
+                    stat_key = 'comentarios'
+                elif any(keyword in metric_text for keyword in ["retweet", "retuit"]):
+                    stat_key = 'retweets'
+                elif any(keyword in metric_text for keyword in ["like", "me gusta"]):
+                    stat_key = 'me_gusta'
+                elif any(keyword in metric_text for keyword in ["bookmark", "guardar", "compartir"]):
+                    stat_key = 'compartidos'
+                if stat_key:
+                    stats[stat_key] = extract_number(metric_text)
+                    if is_abbreviated(metric_text):
+                        abbreviated.append(stat_key)
+            except StaleElementReferenceException:
+                raise
+            except Exception as e:
+                logger.debug("Error al procesar métrica: %s", e)
+                continue
+        if abbreviated:
+            stats[ABBREVIATED_KEY] = abbreviated
+        return stats
+    
+    def stats_from_numeric_spans(self, tweet):
+        """Método 3: extraer números directamente de los spans del tweet (None si no se reconoce ninguno)."""
+        stats = {}
+        all_spans = tweet.find_elements(By.CSS_SELECTOR, 'span')
+        for span in all_spans:
+            try:
+                span_text = span.text.strip()
+                if span_text and re.match(r'^\d+$', span_text):  # Solo números
+                    # Intentar determinar el tipo de métrica por su posición o contexto
+                    parent = span.find_element(By.XPATH, './..')
+                    grandparent = parent.find_element(By.XPATH, './..')
+                    
+                    # Verificar si hay iconos cercanos que indiquen el tipo
+                    outer_html = grandparent.get_attribute('outerHTML').lower()
+                    if "comment" in outer_html or "reply" in outer_html:
+                        stats['comentarios'] = int(span_text)
+                    elif "retweet" in outer_html:
+                        stats['retweets'] = int(span_text)
+                    elif "like" in outer_html or "heart" in outer_html:
+                        stats['me_gusta'] = int(span_text)
+                    elif "bookmark" in outer_html or "share" in outer_html:
+                        stats['compartidos'] = int(span_text)
+            except StaleElementReferenceException:
+                raise
+            except Exception:
+                continue
+        return stats or None
+    
+    @timed_phase('extract_tweet_stats')
     def extract_tweet_stats(self, tweet):
-        """Extraer estadísticas de un tweet (me gusta, comentarios, retweets)."""
+        """
+        Extraer estadísticas de un tweet (me gusta, comentarios, retweets).
+        Los contadores que salieron de etiquetas abreviadas quedan anotados en ABBREVIATED_KEY.
+        Los métodos se prueban en orden de preferencia (ver selector_registry); los spans son el último recurso.
+        """
         stats = {
             'comentarios': 0,
             'retweets': 0,
@@ -110,184 +336,151 @@ class TwitterScraper:
             'compartidos': 0
         }
         
-        # Asegurarnos de que el tweet es visible y esperar a que se carguen las estadísticas
-        self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", tweet)
-        time.sleep(1)  # Esperar más tiempo para que se carguen las estadísticas
-        
+        # El tweet se procesa justo después de renderizarse en la vista, sus contadores ya están cargados
         try:
-            # Método 1: Buscar directamente por data-testid
-            data_testids = {
-                'reply': 'comentarios',
-                'retweet': 'retweets',
-                'like': 'me_gusta',
-                'bookmark': 'compartidos'
-            }
-            
-            for testid, stat_key in data_testids.items():
-                value = self.extract_stat_direct(tweet, testid)
-                if value > 0:  # Solo actualizar si encontramos un valor positivo
-                    stats[stat_key] = value
-                    
-            # Si no encontramos nada, intentamos el método alternativo
-            if all(v == 0 for v in stats.values()):
-                print("Intentando método alternativo para extraer estadísticas...")
-                
-                # Método 2: Buscar todos los elementos con role="button" dentro de groups
-                metrics_groups = tweet.find_elements(By.CSS_SELECTOR, '[role="group"] [role="button"]')
-                for metric in metrics_groups:
-                    try:
-                        # Obtener el texto y el aria-label
-                        aria_text = metric.get_attribute('aria-label') or ""
-                        inner_text = metric.text or ""
-                        
-                        # Usar el texto que tenga información
-                        metric_text = aria_text if len(aria_text) > len(inner_text) else inner_text
-                        metric_text = metric_text.lower()
-                        
-                        print(f"Texto de métrica encontrado: {metric_text}")
-                        
-                        # Check que tipo de métrica es
-                        if any(keyword in metric_text for keyword in ["repl", "respuesta", "comment"]):
-                            stats['comentarios'] = extract_number(metric_text)
-                        elif any(keyword in metric_text for keyword in ["retweet", "retuit"]):
-                            stats['retweets'] = extract_number(metric_text)
-                        elif any(keyword in metric_text for keyword in ["like", "me gusta"]):
-                            stats['me_gusta'] = extract_number(metric_text)
-                        elif any(keyword in metric_text for keyword in ["bookmark", "guardar", "compartir"]):
-                            stats['compartidos'] = extract_number(metric_text)
-                    except StaleElementReferenceException:
-                        print("Elemento ya no está disponible (stale)")
-                        continue
-                    except Exception as e:
-                        print(f"Error al procesar métrica: {e}")
-                        continue
-            
-            # Método 3: Si aún tenemos ceros, intentemos extraer números directamente
-            if all(v == 0 for v in stats.values()):
-                print("Intentando extraer números directamente del tweet...")
-                all_spans = tweet.find_elements(By.CSS_SELECTOR, 'span')
-                for span in all_spans:
-                    try:
-                        span_text = span.text.strip()
-                        if span_text and re.match(r'^\d+$', span_text):  # Solo números
-                            # Intentar determinar el tipo de métrica por su posición o contexto
-                            parent = span.find_element(By.XPATH, './..')
-                            grandparent = parent.find_element(By.XPATH, './..')
-                            
-                            # Verificar si hay iconos cercanos que indiquen el tipo
-                            outer_html = grandparent.get_attribute('outerHTML').lower()
-                            if "comment" in outer_html or "reply" in outer_html:
-                                stats['comentarios'] = int(span_text)
-                            elif "retweet" in outer_html:
-                                stats['retweets'] = int(span_text)
-                            elif "like" in outer_html or "heart" in outer_html:
-                                stats['me_gusta'] = int(span_text)
-                            elif "bookmark" in outer_html or "share" in outer_html:
-                                stats['compartidos'] = int(span_text)
-                    except:
-                        continue
-                
+            found = self.selectors.first_match('estadisticas', {
+                'data-testid': self.stats_from_testids,
+                'botones': self.stats_from_group_buttons,
+                'spans': self.stats_from_numeric_spans
+            }, tweet, fallbacks=('spans',))
+            if found:
+                stats.update(found)
+        except StaleElementReferenceException:
+            raise
         except Exception as e:
-            print(f"Error general al extraer estadísticas: {e}")
-
-        print(f"Estadísticas finales extraídas: {stats}")
+            logger.warning("Error general al extraer estadísticas: %s", e)
+        
+        logger.debug("Estadísticas finales extraídas: %s", stats)
         return stats
     
+    def text_by_selector(self, tweet, selector, min_length=0):
+        """Primer texto de los elementos del selector con más de min_length caracteres (None si no hay)."""
+        try:
+            elements = tweet.find_elements(By.CSS_SELECTOR, selector)
+            if not min_length:
+                return elements[0].text if elements else None
+            for element in elements:
+                text = element.text.strip()
+                if text and len(text) > min_length:  # Probablemente sea el texto del tweet
+                    return text
+        except StaleElementReferenceException:
+            # El tweet salió del DOM: no es que el selector no encuentre nada, iter_new_tweets lo reintenta
+            raise
+        except Exception as e:
+            logger.debug("Error al leer el texto con %s: %s", selector, e)
+        return None
+    
+    @timed_phase('extract_tweet_content')
     def extract_tweet_content(self, tweet):
         """Extraer el contenido del tweet."""
+        # Selector principal y alternativos; los div[dir="auto"] también encuentran el nombre del autor,
+        # así que son solo el último recurso y nunca se prueban primero
+        selectors = {
+            '[data-testid="tweetText"]': 0,
+            'div[lang]': 5,
+            'div[dir="auto"]': 5,
+            'div[role="group"] div[dir="auto"]': 5
+        }
+        strategies = {selector: functools.partial(self.text_by_selector, selector=selector, min_length=min_length)
+                      for selector, min_length in selectors.items()}
+        return self.selectors.first_match('texto', strategies, tweet,
+                                          fallbacks=('div[dir="auto"]', 'div[role="group"] div[dir="auto"]')) or ""
+    
+    def date_by_selector(self, tweet, selector):
+        """Atributo datetime del primer elemento del selector (None si no hay)."""
         try:
-            tweet_text_elements = tweet.find_elements(By.CSS_SELECTOR, '[data-testid="tweetText"]')
-            if tweet_text_elements:
-                return tweet_text_elements[0].text
-        except:
-            pass
-            
-        # Intentar selectores alternativos
-        selectors = ['div[lang]', 'div[dir="auto"]', 'div[role="group"] div[dir="auto"]']
-        for selector in selectors:
-            try:
-                elements = tweet.find_elements(By.CSS_SELECTOR, selector)
-                for element in elements:
-                    text = element.text.strip()
-                    if text and len(text) > 5:  # Probablemente sea el texto del tweet
-                        return text
-            except:
-                continue
-                
-        return ""
-
-    def extract_tweet_date(self, tweet):
-        """Extraer la fecha del tweet."""
-        try:
-            time_elements = tweet.find_elements(By.TAG_NAME, "time")
-            if time_elements:
-                return time_elements[0].get_attribute("datetime")
-        except:
-            pass
-            
-        # Intentar con selectores alternativos
-        try:
-            # Buscar elementos con atributos de tiempo
-            time_elements = tweet.find_elements(By.CSS_SELECTOR, '[datetime]')
+            time_elements = tweet.find_elements(By.CSS_SELECTOR, selector)
             if time_elements:
                 return time_elements[0].get_attribute("datetime")
-        except:
-            pass
-            
-        return ""
+        except StaleElementReferenceException:
+            raise
+        except Exception as e:
+            logger.debug("Error al leer la fecha con %s: %s", selector, e)
+        return None
     
-    def extract_tweet_url(self, tweet):
-        """Extraer la URL del tweet."""
+    @timed_phase('extract_tweet_date')
+    def extract_tweet_date(self, tweet):
+        """Extraer la fecha del tweet (del elemento time o, si no hay, de cualquier elemento con datetime)."""
+        strategies = {selector: functools.partial(self.date_by_selector, selector=selector)
+                      for selector in ['time', '[datetime]']}
+        return self.selectors.first_match('fecha', strategies, tweet) or ""
+    
+    def url_from_status_link(self, tweet):
+        """Buscar enlaces que contengan "/status/" en su URL."""
         try:
-            # Buscar enlaces que contengan "/status/" en su URL
             link_elements = tweet.find_elements(By.CSS_SELECTOR, 'a[href*="/status/"]')
             if link_elements:
                 return link_elements[0].get_attribute("href")
-        except:
-            pass
-            
-        # Método alternativo: buscar el timestamp que suele ser un enlace al tweet
+        except StaleElementReferenceException:
+            raise
+        except Exception as e:
+            logger.debug("Error al buscar enlaces de estado: %s", e)
+        return None
+    
+    def url_from_time_link(self, tweet):
+        """Método alternativo: el timestamp suele ser un enlace al tweet."""
         try:
             time_elements = tweet.find_elements(By.CSS_SELECTOR, 'time')
             if time_elements:
                 time_link = time_elements[0].find_element(By.XPATH, './..')
                 if time_link.tag_name == 'a':
                     return time_link.get_attribute("href")
-        except:
+        except StaleElementReferenceException:
+            raise
+        except NoSuchElementException:
             pass
-        
-        # Tercer método: buscar cualquier enlace que contenga un ID de tweet (números largos)
+        except Exception as e:
+            logger.debug("Error al leer el enlace de la fecha: %s", e)
+        return None
+    
+    def url_from_any_link(self, tweet):
+        """Tercer método: buscar cualquier enlace que contenga un ID de tweet (números largos)."""
         try:
             links = tweet.find_elements(By.TAG_NAME, 'a')
             for link in links:
                 href = link.get_attribute('href') or ""
                 if '/status/' in href and re.search(r'/status/\d+', href):
                     return href
-        except:
-            pass
-            
-        return ""
+        except StaleElementReferenceException:
+            raise
+        except Exception as e:
+            logger.debug("Error al buscar enlaces: %s", e)
+        return None
     
+    @timed_phase('extract_tweet_url')
+    def extract_tweet_url(self, tweet):
+        """Extraer la URL del tweet."""
+        return self.selectors.first_match('url', {
+            'enlace_status': self.url_from_status_link,
+            'enlace_fecha': self.url_from_time_link,
+            'cualquier_enlace': self.url_from_any_link
+        }, tweet, fallbacks=('cualquier_enlace',)) or ""
+    
+    @timed_phase('has_media')
     def has_media(self, tweet):
-        """Verificar si el tweet tiene imágenes o videos."""
+        """
+        Verificar si el tweet tiene imágenes o videos.
+        Se buscan los contenedores de media y no las imágenes cargadas, así funciona igual
+        cuando el perfil de bloqueo impide descargarlas.
+        """
         try:
-            # Buscar diversos tipos de media
-            media_selectors = [
-                '[data-testid="tweetPhoto"]', 
-                'video',
-                'img[src*="pbs.twimg.com"]',
-                '[data-testid="videoPlayer"]',
-                '[data-testid="mediaPreview"]'
-            ]
-            
-            for selector in media_selectors:
-                elements = tweet.find_elements(By.CSS_SELECTOR, selector)
-                if elements:
-                    return True
-            return False
-        except:
+            return bool(tweet.find_elements(By.CSS_SELECTOR, ', '.join(MEDIA_SELECTORS)))
+        except StaleElementReferenceException:
+            raise
+        except Exception as e:
+            logger.debug("Error al buscar media: %s", e)
             return False
     
+    @timed_phase('descubrimiento')
+    def snapshot_visible_tweets(self):
+        """Obtener con un solo execute_script los datos crudos de todos los tweets visibles."""
+        try:
+            raw_json = self.driver.execute_script(TWEET_SNAPSHOT_JS)
+            return json.loads(raw_json) if raw_json else []
+        except Exception as e:
+            logger.warning("Error al obtener el snapshot de tweets: %s", e)
+            return []
+    
     def is_tweet_less_than_two_years_old(self, date_str):
         """Verificar si un tweet tiene menos de dos años desde su publicación."""
         if not date_str:
@@ -314,311 +507,548 @@ class TwitterScraper:
             # Verificar si es menor a 2 años (730 días aproximadamente)
             is_recent = days_difference < 730
             
-            print(f"Fecha del tweet: {tweet_date}, Diferencia de días: {days_difference}, Es reciente: {is_recent}")
+            logger.debug("Fecha del tweet: %s, Diferencia de días: %d, Es reciente: %s", tweet_date, days_difference, is_recent)
             return is_recent
         except Exception as e:
-            print(f"Error al verificar la antigüedad del tweet: {e}")
+            logger.warning("Error al verificar la antigüedad del tweet: %s", e)
             return False
     
+    def is_tweet_within_days(self, date_str, days):
+        """Verificar si un tweet se publicó en los últimos days días."""
+        return is_within_days(date_str, days)
+    
     def get_account_name(self, account_url):
         """Obtener el nombre de usuario de la URL de cuenta."""
-        if not account_url:
-            return "unknown"
-            
-        try:
-            # Limpiar la URL para extraer solo el nombre de usuario
-            handle = account_url.rstrip('/').split('/')[-1]
-            # Eliminar parámetros de query si existen
-            if '?' in handle:
-                handle = handle.split('?')[0]
-            return handle
-        except:
-            return "unknown"
+        return account_name_from_url(account_url)
             
-    def scrape_account(self, account_url, num_tweets=20):
-        """Raspar tweets de una cuenta específica de Twitter/X."""
+    def elements_by_selector(self, selector):
+        """Elementos de la página con el selector (None si no hay ninguno)."""
+        return self.driver.find_elements(By.CSS_SELECTOR, selector) or None
+    
+    @timed_phase('descubrimiento')
+    def find_tweet_elements(self):
+        """
+        Buscar los elementos de tweet renderizados probando diferentes selectores en orden de
+        preferencia (ver selector_registry). Los contenedores cellInnerDiv también existen sin tweet
+        (cargando, separadores), así que son solo el último recurso.
+        """
+        selectors = [
+            '[data-testid="tweet"]',
+            'article',
+            '[data-testid="cellInnerDiv"] div[data-testid]',
+            '[data-testid="cellInnerDiv"]'
+        ]
+        strategies = {selector: functools.partial(self.elements_by_selector, selector) for selector in selectors}
+        return self.selectors.first_match('tweets', strategies, fallbacks=selectors[2:]) or []
+    
+    def tweet_from_element(self, tweet, account_handle, tweet_url):
+        """Extraer los datos de un tweet a partir de su WebElement."""
+        tweet_data = {
+            'cuenta': account_handle,
+            'texto': self.extract_tweet_content(tweet) or "",  # Asegurar que no sea None
+            'fecha': self.extract_tweet_date(tweet) or "",     # Asegurar que no sea None
+            'url': tweet_url or "",                            # Asegurar que no sea None
+            'tiene_media': self.has_media(tweet),
+            'comentarios': 0,
+            'retweets': 0,
+            'me_gusta': 0,
+            'compartidos': 0
+        }
+        
+        # Extraer estadísticas
         try:
-            self.driver.get(account_url)
-            print(f"Accediendo a: {account_url}")
-            
-            # Esperar a que cargue la página
-            selectors = ['[data-testid="tweet"]', 'article', '[data-testid="cellInnerDiv"]']
-            found = False
-            
-            for selector in selectors:
-                try:
-                    self.wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
-                    print(f"Página cargada, encontrado selector: {selector}")
-                    found = True
-                    break
-                except TimeoutException:
+            stats = self.extract_tweet_stats(tweet)
+            tweet_data.update(stats)
+        except StaleElementReferenceException:
+            raise
+        except Exception as stat_error:
+            logger.warning("Error al extraer estadísticas: %s", stat_error)
+            # Mantenemos los valores por defecto (ceros)
+        
+        return tweet_data
+    
+    def iter_new_tweets(self, account_handle, seen_ids):
+        """
+        Recorrer los tweets renderizados en la vista actual que aún no se han visto.
+        Genera pares (tweet_data, tiene_contexto); tiene_contexto indica un tweet fijado o un retweet,
+        cuya fecha no sigue el orden cronológico del timeline. Los tweets promocionados se omiten.
+        """
+        if self.extraction_mode == "network":
+            # Tweets tomados de las respuestas JSON del timeline recibidas desde la última lectura
+            with self.metrics.phase('descubrimiento'):
+                payloads = read_timeline_responses(self.driver, self.pending_responses)
+            for payload in payloads:
+                for tweet_result, pinned in iter_timeline_entries(payload):
+                    with self.metrics.phase('extraccion'):
+                        tweet_data = tweet_record(tweet_result, account_handle)
+                    status_id = extract_status_id(tweet_data['url'])
+                    if not status_id or status_id in seen_ids:
+                        continue
+                    seen_ids.add(status_id)
+                    yield tweet_data, pinned or is_retweet(tweet_result)
+            return
+        
+        if self.extraction_mode == "js":
+            # Una sola llamada a WebDriver para todos los tweets visibles
+            for snapshot in self.snapshot_visible_tweets():
+                status_id = extract_status_id(snapshot.get('url'))
+                if not status_id or status_id in seen_ids:
                     continue
-                    
-            if not found:
-                print("No se pudo cargar la página correctamente")
-                return []
-                
-            # Verificar si hay un popup de inicio sesión y cerrarlo
+                seen_ids.add(status_id)
+                if snapshot.get('promoted'):
+                    continue
+                with self.metrics.phase('extraccion'):
+                    tweet_data = tweet_from_snapshot(snapshot, account_handle)
+                yield tweet_data, bool(snapshot.get('context'))
+            return
+        
+        for tweet in self.find_tweet_elements():
+            status_id = None
             try:
-                close_buttons = self.driver.find_elements(By.CSS_SELECTOR, '[data-testid="modal-close"], [role="button"][aria-label*="Close"], button[aria-label*="Close"]')
-                if close_buttons:
-                    close_buttons[0].click()
-                    print("Popup de inicio de sesión cerrado")
-                    time.sleep(1)
-            except:
-                pass
-            
-            # Scroll para cargar más tweets - aumentamos el número para conseguir suficientes tweets recientes
-            num_scrolls_needed = max(7, num_tweets // 2)  # Más scrolls para asegurar cargar suficientes tweets
-            self.scroll_down(num_scrolls_needed, pause=2)
-            
-            # Recolectar tweets con diferentes selectores
-            tweet_elements = []
-            selectors = [
-                '[data-testid="tweet"]',
-                'article',
-                '[data-testid="cellInnerDiv"] div[data-testid]',
-                '[data-testid="cellInnerDiv"]'
-            ]
-            
-            for selector in selectors:
-                tweet_elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
-                if len(tweet_elements) > 0:
-                    print(f"Encontrados {len(tweet_elements)} tweets con selector: {selector}")
-                    break
+                # Extraer URL para verificar duplicados antes de cualquier otra consulta
+                tweet_url = self.extract_tweet_url(tweet)
+                status_id = extract_status_id(tweet_url)
+                if not status_id or status_id in seen_ids:
+                    continue
+                
+                # Verificar si parece un tweet promocionado
+                if tweet.find_elements(By.CSS_SELECTOR, '[data-testid="socialProof"]'):
+                    seen_ids.add(status_id)
+                    continue
+                
+                has_context = bool(tweet.find_elements(By.CSS_SELECTOR, '[data-testid="socialContext"]'))
+                tweet_data = self.tweet_from_element(tweet, account_handle, tweet_url)
+            except StaleElementReferenceException:
+                # X elimina del DOM los tweets que salen de la vista; sin marcarlo como visto,
+                # se vuelve a leer en otra pasada si reaparece
+                logger.debug("Error: Elemento ya no disponible (stale)")
+                continue
+            except Exception as e:
+                logger.warning("Error general al extraer tweet: %s", e)
+                if status_id:
+                    seen_ids.add(status_id)
+                continue
             
-            if not tweet_elements:
-                print("No se encontraron tweets con ninguno de los selectores")
-                return []
+            # Solo se marca como visto una vez extraído completo
+            seen_ids.add(status_id)
+            yield tweet_data, has_context
+    
+    @timed_phase('carga')
+    def open_account_page(self, account_url):
+        """
+        Abrir el perfil, esperar a que aparezcan tweets y cerrar el popup de inicio de sesión.
+        La visita espera su turno en el limitador de ritmo; un muro de inicio de sesión, un desafío
+        o una página de error terminan la espera de inmediato y frenan el ritmo.
+        """
+        # Descartar respuestas de red de la cuenta anterior
+        if self.extraction_mode == "network":
+            self.driver.get_log('performance')
+            self.pending_responses = {}
+        
+        self.rate_limiter.acquire()
+        started = time.perf_counter()
+        self.driver.get(account_url)
+        logger.info("Accediendo a: %s", account_url)
+        
+        # Esperar a que cargue la página (o a que muestre un bloqueo)
+        try:
+            state = self.wait.until(
+                lambda driver: page_state(driver, '[data-testid="tweet"], article, [data-testid="cellInnerDiv"]', 'x')
+            )
+        except TimeoutException:
+            state = None
+        self.rate_limiter.record(state)
+        self.last_page = (state, time.perf_counter() - started)
+        
+        if state != 'ok':
+            logger.warning("No se pudo cargar la página correctamente%s",
+                           f" (estado: {state})" if state else "")
+            return False
+        
+        # Con una versión nueva de la página, las estrategias ganadoras se vuelven a validar
+        if self.extraction_mode == "dom":
+            self.selectors.set_version(self.driver.execute_script(SITE_VERSION_JS))
             
-            # Filtrar tweets que parezcan promocionados o repetidos
-            filtered_tweets = []
-            tweet_urls = set()
+        # Verificar si hay un popup de inicio sesión y cerrarlo
+        self.close_popups()
+        return True
+    
+    def scrape_account(self, account_url, num_tweets=20, max_scrolls=None, since_id=None, refresh_days=None,
+                       recovered=None, on_tweet=None):
+        """
+        Raspar tweets de una cuenta específica de Twitter/X.
+        Los tweets se procesan a medida que se renderizan en cada scroll, sin duplicados por ID de estado;
+        el recorrido termina al reunir num_tweets tweets o al encontrar uno más antiguo que 2 años.
+        Con since_id solo se devuelven tweets posteriores a ese ID y el recorrido termina al llegar a los
+        ya extraídos; con refresh_days, los ya extraídos de los últimos refresh_days días se devuelven
+        de nuevo para actualizar sus contadores.
+        recovered (tweets extraídos antes de una interrupción) se conservan y cuentan para num_tweets;
+        on_tweet recibe cada tweet nuevo en cuanto se extrae (ver checkpoint.CheckpointJournal).
+        """
+        recovered = recovered or []
+        collector = None
+        try:
+            if not self.open_account_page(account_url):
+                return recovered
             
-            for tweet in tweet_elements:
-                try:
-                    # Verificar si parece un tweet promocionado
-                    is_promoted = False
-                    try:
-                        promoted_labels = tweet.find_elements(By.CSS_SELECTOR, '[data-testid="socialProof"]')
-                        if promoted_labels:
-                            is_promoted = True
-                    except:
-                        pass
-                    
-                    if is_promoted:
-                        continue
-                    
-                    # Extraer URL para verificar duplicados
-                    url = self.extract_tweet_url(tweet)
-                    if url and url not in tweet_urls:
-                        tweet_urls.add(url)
-                        filtered_tweets.append(tweet)
-                except Exception as e:
-                    print(f"Error al filtrar tweet: {e}")
-                    continue
-                    
-            print(f"Después de filtrar: {len(filtered_tweets)} tweets únicos")
+            # Límite de seguridad: cada scroll avanza aproximadamente una pantalla
+            if max_scrolls is None:
+                max_scrolls = max(10, num_tweets * 2)
             
-            # Extraer datos de los tweets
-            tweets_data = []
             account_handle = self.get_account_name(account_url)
-            tweets_processed = 0
+            collector = TimelineCollector(num_tweets, since_id, refresh_days,
+                                          is_recent=self.is_tweet_less_than_two_years_old,
+                                          recovered=recovered, on_add=on_tweet)
+            scrolls_without_new = 0
             
-            for i, tweet in enumerate(filtered_tweets):
-                try:
-                    # Hacer scroll al tweet para asegurar que está en la vista
-                    self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", tweet)
-                    time.sleep(0.5)  # Esperar a que se carguen los contadores
-                    
-                    # Extraer la fecha primero para filtrar por antigüedad
-                    tweet_date = self.extract_tweet_date(tweet)
-                    
-                    # Si no pudimos extraer la fecha, intentamos seguir con el tweet
-                    if not tweet_date:
-                        print(f"Advertencia en tweet {i+1}: no se pudo extraer la fecha, pero continuamos")
-                    else:
-                        # Verificar si el tweet tiene menos de dos años
-                        if not self.is_tweet_less_than_two_years_old(tweet_date):
-                            print(f"Saltando tweet {i+1}: es más antiguo que 2 años")
-                            continue
-                    
-                    # Continuar con la extracción de datos
-                    tweet_text = self.extract_tweet_content(tweet)
-                    tweet_url = self.extract_tweet_url(tweet)
-                    has_media = self.has_media(tweet)
-                    
-                    tweet_data = {
-                        'cuenta': account_handle,
-                        'texto': tweet_text or "",  # Asegurar que no sea None
-                        'fecha': tweet_date or "",  # Asegurar que no sea None
-                        'url': tweet_url or "",     # Asegurar que no sea None
-                        'tiene_media': has_media,
-                        'comentarios': 0,
-                        'retweets': 0,
-                        'me_gusta': 0,
-                        'compartidos': 0
-                    }
-                    
-                    # Extraer estadísticas
-                    try:
-                        stats = self.extract_tweet_stats(tweet)
-                        tweet_data.update(stats)
-                    except Exception as stat_error:
-                        print(f"Error al extraer estadísticas: {stat_error}")
-                        # Mantenemos los valores por defecto (ceros)
-                    
-                    # Agregar el tweet a nuestra colección
-                    tweets_data.append(tweet_data)
-                    print(f"Tweet {i+1} extraído: {tweet_text[:30]}..." if tweet_text else "Sin texto")
-                    tweets_processed += 1
-                    
-                    # Si ya tenemos suficientes tweets, salimos
-                    if tweets_processed >= num_tweets:
+            for scroll in range(0 if collector.finished else max_scrolls + 1):
+                new_tweets = 0
+                
+                for tweet_data, has_context in self.iter_new_tweets(account_handle, collector.seen_ids):
+                    new_tweets += 1
+                    if not collector.add(tweet_data, has_context):
                         break
-                    
-                except StaleElementReferenceException:
-                    print(f"Error: Elemento ya no disponible (stale) para tweet {i+1}")
-                    continue
-                except Exception as e:
-                    print(f"Error general al extraer tweet {i+1}: {e}")
-                    continue
+                
+                if collector.finished:
+                    break
+                
+                # Si varios scrolls seguidos no traen tweets nuevos, llegamos al final del timeline
+                scrolls_without_new = 0 if new_tweets else scrolls_without_new + 1
+                if scrolls_without_new >= 3:
+                    logger.info("No se cargaron tweets nuevos en los últimos scrolls")
+                    break
+                
+                if scroll < max_scrolls:
+                    # En modo "network" hay que llegar al final para que la página pida la siguiente página de tweets
+                    if self.extraction_mode == "network":
+                        self.scroll_down(1)
+                    else:
+                        self.scroll_one_viewport()
             
-            print(f"Total de tweets válidos extraídos: {len(tweets_data)}")
-            return tweets_data
+            logger.info("Total de tweets válidos extraídos: %d", len(collector.tweets))
+            return collector.tweets
             
         except Exception as e:
-            print(f"Error global al raspar cuenta {account_url}: {e}")
-            return []
+            logger.error("Error global al raspar cuenta %s: %s", account_url, e)
+            # Lo ya extraído antes del error se conserva
+            return collector.tweets if collector else recovered
     
-    def scrape_multiple_accounts(self, account_urls, output_dir='twitter_data', num_tweets_per_account=20):
+    def dump_account_html(self, account_url, output_dir, timestamp=None, num_scrolls=10):
+        """
+        Guardar el HTML de la página después de cada scroll, sin extraer nada.
+        Los archivos {cuenta}_{timestamp}_{nnn}.html se parsean después con twitter_html.parse_html_files.
+        """
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        timestamp = timestamp or datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        account_handle = self.get_account_name(account_url)
+        paths = []
+        
+        try:
+            if not self.open_account_page(account_url):
+                return paths
+            
+            for i in range(num_scrolls + 1):
+                path = os.path.join(output_dir, f"{account_handle}_{timestamp}_{i:03d}.html")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(self.driver.page_source)
+                paths.append(path)
+                
+                if i < num_scrolls:
+                    self.scroll_one_viewport()
+        except Exception as e:
+            logger.error("Error al guardar el HTML de %s: %s", account_url, e)
+        
+        logger.info("%d páginas de %s guardadas en %s", len(paths), account_handle, output_dir)
+        return paths
+    
+    def scrape_multiple_accounts(self, account_urls, output_dir='twitter_data', num_tweets_per_account=20,
+                                 state_store=None, refresh_days=None, sink=None, metrics_writer=None,
+                                 checkpoint=None):
         """
         Raspar múltiples cuentas de Twitter/X y guardar los resultados en archivos CSV separados.
         Cada extracción genera un nuevo archivo con marca de tiempo en el directorio especificado.
+        Con state_store (un StateStore) solo se extraen los tweets posteriores a la ejecución anterior.
+        sink permite otro destino de salida (por ejemplo, sinks.ParquetSink o sinks.DatabaseSink); por defecto, CSV en output_dir.
+        metrics_writer (por ejemplo, metrics.JsonLinesMetricsWriter) recibe las métricas de cada cuenta,
+        que también se agregan al resumen.
+        Con checkpoint (un checkpoint.CheckpointJournal) cada tweet se registra en el diario al extraerse;
+        si la extracción se interrumpe, la siguiente ejecución con el mismo diario usa el mismo timestamp,
+        salta las cuentas ya guardadas y retoma la cuenta interrumpida.
         """
         # Crear directorio de salida si no existe
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
-            print(f"Directorio creado: {output_dir}")
+            logger.info("Directorio creado: %s", output_dir)
             
-        # Generar un timestamp para esta extracción
+        # Generar un timestamp para esta extracción (o recuperar el de la extracción interrumpida)
         timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        if checkpoint:
+            timestamp = checkpoint.begin(timestamp)
         
         # Estadísticas generales
-        all_tweets_count = 0
         accounts_stats = {}
+        accounts_metrics = {}
+        sink = sink or CsvSink(output_dir)
         
         # Procesamos cada cuenta por separado
         for url in account_urls:
-            print(f"\n{'='*50}\nRaspando cuenta: {url}\n{'='*50}")
-            
-            # Obtener el nombre de usuario de la URL
             account_handle = self.get_account_name(url)
-            
-            # Crear nombre de archivo para esta cuenta
-            filename = f"{account_handle}_{timestamp}.csv"
-            output_file = os.path.join(output_dir, filename)
-            
-            # Raspar tweets de esta cuenta
-            tweets = self.scrape_account(url, num_tweets_per_account)
-            
-            # Guardar resultados en CSV específico para esta cuenta
-            if tweets:
-                fieldnames = ['cuenta', 'texto', 'fecha', 'url', 'comentarios', 'retweets', 'me_gusta', 'compartidos', 'tiene_media']
-                
-                # Asegurar que todos los tweets tienen todos los campos
-                for tweet in tweets:
-                    for field in fieldnames:
-                        if field not in tweet:
-                            tweet[field] = ""
-                
-                try:
-                    with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                        writer.writeheader()
-                        writer.writerows(tweets)
-                    
-                    print(f"\nDatos de {account_handle} guardados en {output_file}")
-                except Exception as e:
-                    print(f"Error al guardar el archivo CSV para {account_handle}: {e}")
-                
-                # Actualizar estadísticas
-                all_tweets_count += len(tweets)
-                accounts_stats[account_handle] = len(tweets)
-                
-                # Mostrar ejemplos de métricas para esta cuenta
-                if tweets:
-                    print("\nEjemplos de métricas encontradas:")
-                    for i, tweet in enumerate(tweets[:3]):
-                        print(f"\nEjemplo {i+1}:")
-                        print(f"Fecha: {tweet.get('fecha', 'No disponible')}")
-                        texto = tweet.get('texto', '')
-                        print(f"Texto: {texto[:50]}..." if len(texto) > 50 else texto)
-                        print(f"Comentarios: {tweet.get('comentarios', 0)}")
-                        print(f"Retweets: {tweet.get('retweets', 0)}")
-                        print(f"Me gusta: {tweet.get('me_gusta', 0)}")
-                        print(f"Compartidos: {tweet.get('compartidos', 0)}")
+            if checkpoint and checkpoint.is_done(account_handle):
+                # Cuenta ya guardada antes de la interrupción
+                count, record = checkpoint.result(account_handle)
             else:
-                print(f"No se pudieron extraer tweets de la cuenta {account_handle}")
-            
-            # Pausa entre cuentas para evitar detección
-            time.sleep(random.uniform(5, 8))
+                account_handle, count, record = self.scrape_and_save_account(url, sink, timestamp, num_tweets_per_account,
+                                                                             state_store, refresh_days, checkpoint)
+                if metrics_writer:
+                    metrics_writer.write(record)
+            if count:
+                accounts_stats[account_handle] = count
+                accounts_metrics[account_handle] = record
+        
+        sink.close()
+        if metrics_writer:
+            metrics_writer.close()
+        save_extraction_summary(accounts_stats, output_dir, timestamp, accounts_metrics)
+        if checkpoint:
+            # El diario se conserva si alguna cuenta no se pudo guardar
+            checkpoint.close(complete=all(checkpoint.is_done(self.get_account_name(url)) for url in account_urls))
+    
+    def scrape_and_save_account(self, url, sink, timestamp, num_tweets=20, state_store=None, refresh_days=None,
+                                checkpoint=None):
+        """
+        Raspar una cuenta y guardar sus tweets en el destino sink (por ejemplo, {cuenta}_{timestamp}.csv).
+        Devuelve el nombre de la cuenta, el número de tweets guardados (0 si falló la escritura) y las
+        métricas de la cuenta. Con checkpoint, los tweets se registran en el diario al extraerse y la
+        cuenta queda marcada como terminada solo después de guardarla.
+        """
+        logger.info("\n%s\nRaspando cuenta: %s\n%s", "=" * 50, url, "=" * 50)
+        
+        # Obtener el nombre de usuario de la URL
+        account_handle = self.get_account_name(url)
+        self.metrics.start_account(account_handle)
+        
+        # Último tweet extraído de esta cuenta en ejecuciones anteriores
+        since_id = state_store.get_last_status_id(account_handle) if state_store else None
         
-        # Guardar también un resumen general de esta extracción
+        # Raspar tweets de esta cuenta (retomando los ya registrados en el diario, si los hay)
+        recovered, on_tweet = None, None
+        if checkpoint:
+            recovered = checkpoint.records(account_handle)
+            on_tweet = functools.partial(checkpoint.append, account_handle)
+        tweets = self.scrape_account(url, num_tweets, since_id=since_id, refresh_days=refresh_days,
+                                     recovered=recovered, on_tweet=on_tweet)
+        
+        if not tweets:
+            if since_id:
+                logger.info("No hay tweets nuevos de la cuenta %s", account_handle)
+            else:
+                logger.warning("No se pudieron extraer tweets de la cuenta %s", account_handle)
+            record = self.metrics.finish_account(0)
+            if checkpoint:
+                checkpoint.finish(account_handle, 0, record)
+            self.recycle_if_needed()
+            return account_handle, 0, record
+        
+        # Contadores exactos para los tweets con etiquetas abreviadas
+        if self.enricher:
+            with self.metrics.phase('enriquecimiento'):
+                self.enricher.enrich(self.driver, tweets, self.rate_limiter)
+        
+        # Guardar resultados en el archivo específico para esta cuenta
         try:
-            summary_file = os.path.join(output_dir, f"resumen_extraccion_{timestamp}.csv")
-            with open(summary_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(['Cuenta', 'Tweets Extraídos', 'Fecha Extracción'])
-                for account, count in accounts_stats.items():
-                    writer.writerow([account, count, datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
-            
-            print(f"\nResumen de la extracción guardado en {summary_file}")
+            with self.metrics.phase('escritura'):
+                output_file = sink.write(account_handle, tweets, timestamp)
+            logger.info("Datos de %s guardados en %s", account_handle, output_file)
+            # Avanzar la marca de agua solo si el archivo se guardó, para no saltar esos tweets la próxima vez
+            if state_store:
+                status_ids = [int(extract_status_id(tweet['url'])) for tweet in tweets if extract_status_id(tweet['url'])]
+                if status_ids:
+                    state_store.update_last_status_id(account_handle, max(status_ids))
         except Exception as e:
-            print(f"Error al guardar el archivo de resumen: {e}")
-        
-        print(f"\n{'='*50}")
-        print(f"Total de tweets recolectados: {all_tweets_count}")
-        print(f"Tweets por cuenta:")
-        for account, count in accounts_stats.items():
-            print(f"- {account}: {count} tweets")
-        print(f"{'='*50}")
+            logger.error("Error al guardar el archivo de salida para %s: %s", account_handle, e)
+            # La cuenta no queda terminada: sus tweets siguen en el diario para la próxima ejecución
+            record = self.metrics.finish_account(len(tweets))
+            self.recycle_if_needed()
+            return account_handle, 0, record
+        
+        record = self.metrics.finish_account(len(tweets))
+        if checkpoint:
+            checkpoint.finish(account_handle, len(tweets), record)
+        logger.info("%s: %d tweets en %.1f s, %d llamadas a WebDriver", account_handle, len(tweets),
+                    record['segundos'], record['llamadas_webdriver'])
+        
+        # Mostrar ejemplos de métricas para esta cuenta
+        if logger.isEnabledFor(logging.DEBUG):
+            for i, tweet in enumerate(tweets[:3]):
+                texto = tweet.get('texto', '')
+                logger.debug("Ejemplo %d:\nFecha: %s\nTexto: %s\nComentarios: %s\nRetweets: %s\nMe gusta: %s\nCompartidos: %s",
+                             i + 1, tweet.get('fecha', 'No disponible'), f"{texto[:50]}..." if len(texto) > 50 else texto,
+                             tweet.get('comentarios', 0), tweet.get('retweets', 0), tweet.get('me_gusta', 0),
+                             tweet.get('compartidos', 0))
+        
+        self.recycle_if_needed()
+        return account_handle, len(tweets), record
 
-def extract_number(text):
-    """Extraer número de texto como '5 respuestas' o '10.2K Me gusta'."""
-    if not text:
-        return 0
-        
-    # Primero, intentemos encontrar patrones comunes de Twitter con K/M
-    k_pattern = re.search(r'(\d+(?:[.,]\d+)?)[kK]', text)
-    m_pattern = re.search(r'(\d+(?:[.,]\d+)?)[mM]', text)
-    
-    if k_pattern:
-        return int(float(k_pattern.group(1).replace(',', '.')) * 1000)
-    if m_pattern:
-        return int(float(m_pattern.group(1).replace(',', '.')) * 1000000)
-    
-    # Buscar patrones como "mil" o "millones"
-    if 'mil' in text.lower():
-        mil_pattern = re.search(r'(\d+(?:[.,]\d+)?)\s*mil', text.lower())
-        if mil_pattern:
-            return int(float(mil_pattern.group(1).replace(',', '.')) * 1000)
-    
-    if 'millon' in text.lower() or 'millones' in text.lower():
-        mill_pattern = re.search(r'(\d+(?:[.,]\d+)?)\s*millon(?:es)?', text.lower())
-        if mill_pattern:
-            return int(float(mill_pattern.group(1).replace(',', '.')) * 1000000)
-    
-    # Finalmente, buscar cualquier número
-    number_pattern = re.search(r'(\d+(?:[.,]\d+)?)', text)
-    if number_pattern:
-        # Manejar delimitadores decimales
-        return int(float(number_pattern.group(1).replace(',', '.')))
-    
-    return 0
+def scrape_multiple_accounts_parallel(account_urls, output_dir='twitter_data', num_tweets_per_account=20,
+                                      num_workers=3, headless=True, extraction_mode="dom", delay_range=None,
+                                      max_wait=5, profile_root=None, state_store=None, refresh_days=None,
+                                      sink=None, blocking_profile="none", metrics_writer=None, checkpoint=None,
+                                      recycle_policy=None, identity_pool=None, enricher=None,
+                                      selector_registry=None):
+    """
+    Raspar múltiples cuentas con un pool de navegadores independientes.
+    Cada worker es su propio TwitterScraper (su propia sesión de Chrome) y toma cuentas de una
+    cola compartida. El ritmo lo marca el limitador compartido de X (ver ratelimit), común a todos los
+    workers porque salen por la misma IP; delay_range agrega además una pausa fija por worker.
+    Genera los mismos CSV por cuenta y el mismo resumen que scrape_multiple_accounts.
+    Las URLs pueden apuntar a un servidor HTTP local con páginas de perfil guardadas.
+    Con profile_root cada worker conserva su propio perfil persistente en profile_root/worker_N.
+    state_store, refresh_days, sink, metrics_writer y checkpoint funcionan igual que en scrape_multiple_accounts.
+    blocking_profile y recycle_policy se aplican a todos los navegadores del pool (ver TwitterScraper).
+    Con identity_pool (un identities.IdentityPool) cada worker toma una identidad (proxy, user-agent
+    y perfil), reporta el resultado de cada cuenta y cambia de identidad cuando la suya sale de rotación.
+    Con enricher (un enrichment.ExactCountEnricher) cada worker corrige los contadores abreviados con su
+    propio pool de pestañas; la caché de contadores es común a todos.
+    selector_registry (un selector_registry.SelectorRegistry) se comparte entre los workers, así lo que
+    aprende uno sobre los selectores que funcionan lo aprovechan todos.
+    """
+    # Crear directorio de salida si no existe
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+        logger.info("Directorio creado: %s", output_dir)
+    
+    # Un solo timestamp compartido por todos los workers de esta extracción
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    if checkpoint:
+        timestamp = checkpoint.begin(timestamp)
+    sink = sink or CsvSink(output_dir)
+    selector_registry = selector_registry or SelectorRegistry()
+    
+    pending = queue.Queue()
+    results = {}
+    results_lock = threading.Lock()
+    for url in account_urls:
+        account_handle = account_name_from_url(url)
+        if checkpoint and checkpoint.is_done(account_handle):
+            # Cuenta ya guardada antes de la interrupción
+            results[url] = (account_handle,) + checkpoint.result(account_handle)
+        else:
+            pending.put(url)
+    
+    def start_scraper(worker_id, identity):
+        # Chrome bloquea el directorio de perfil, así que cada worker (o identidad) usa el suyo
+        if identity and identity.profile_dir:
+            profile_dir = identity.profile_dir
+        else:
+            profile_dir = os.path.join(profile_root, f"worker_{worker_id}") if profile_root else None
+        return TwitterScraper(headless=headless, extraction_mode=extraction_mode, max_wait=max_wait,
+                              session=BrowserSession(profile_dir=profile_dir), blocking_profile=blocking_profile,
+                              recycle_policy=recycle_policy, identity=identity, enricher=enricher,
+                              selector_registry=selector_registry)
+    
+    def worker(worker_id):
+        identity = None
+        try:
+            identity = identity_pool.lease(LEASE_TIMEOUT) if identity_pool else None
+            scraper = start_scraper(worker_id, identity)
+        except Exception as e:
+            logger.error("[worker %d] No se pudo iniciar el navegador: %s", worker_id, e)
+            if identity:
+                identity_pool.release(identity)
+            return
+        
+        try:
+            last_finished = None
+            switch_identity = False
+            while True:
+                try:
+                    url = pending.get_nowait()
+                except queue.Empty:
+                    break
+                
+                # Cambiar de identidad si la anterior salió de rotación; si no hay otra a tiempo
+                # o el navegador no arranca, la cuenta vuelve a la cola para otro worker
+                if switch_identity:
+                    try:
+                        identity = identity_pool.lease(LEASE_TIMEOUT)
+                        logger.info("[worker %d] Cambiando a la identidad %s", worker_id, identity)
+                        scraper = start_scraper(worker_id, identity)
+                    except Exception as e:
+                        logger.error("[worker %d] No se pudo cambiar de identidad: %s", worker_id, e)
+                        pending.put(url)
+                        return
+                    switch_identity = False
+                
+                # Pausa fija opcional entre cuentas de este mismo worker
+                if delay_range and last_finished is not None:
+                    wait_time = random.uniform(*delay_range) - (time.time() - last_finished)
+                    if wait_time > 0:
+                        time.sleep(wait_time)
+                
+                # La identidad se califica solo con la página de esta cuenta, no con la de la anterior
+                scraper.last_page = (None, None)
+                try:
+                    account_handle, count, record = scraper.scrape_and_save_account(
+                        url, sink, timestamp, num_tweets_per_account, state_store, refresh_days, checkpoint
+                    )
+                    if metrics_writer:
+                        metrics_writer.write(record)
+                    with results_lock:
+                        results[url] = (account_handle, count, record)
+                except Exception as e:
+                    logger.error("[worker %d] Error al raspar %s: %s", worker_id, url, e)
+                finally:
+                    last_finished = time.time()
+                
+                # Dejar la identidad si salió de rotación; la siguiente se toma con la próxima cuenta.
+                # Si la cuenta falló antes de cargar su página (como un proxy caído), cuenta como fallo
+                state, seconds = scraper.last_page
+                if identity and not identity_pool.report(identity, state == 'ok', seconds):
+                    scraper.session.close()
+                    identity_pool.release(identity)
+                    identity = None
+                    switch_identity = True
+        finally:
+            scraper.session.close()
+            if identity:
+                identity_pool.release(identity)
+    
+    num_workers = min(num_workers, pending.qsize())
+    if identity_pool:
+        # Cada worker necesita una identidad propia
+        num_workers = min(num_workers, len(identity_pool.identities))
+    threads = [threading.Thread(target=worker, args=(i + 1,), daemon=True) for i in range(num_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    if not pending.empty():
+        logger.warning("Advertencia: quedaron %d cuentas sin procesar", pending.qsize())
+    
+    # Resumen en el mismo orden en que se pidieron las cuentas
+    accounts_stats = {}
+    accounts_metrics = {}
+    for url in account_urls:
+        account_handle, count, record = results.get(url, (None, 0, None))
+        if count:
+            accounts_stats[account_handle] = count
+            accounts_metrics[account_handle] = record
+    
+    sink.close()
+    if metrics_writer:
+        metrics_writer.close()
+    save_extraction_summary(accounts_stats, output_dir, timestamp, accounts_metrics)
+    if checkpoint:
+        checkpoint.close(complete=all(checkpoint.is_done(account_name_from_url(url)) for url in account_urls))
+    return accounts_stats
 
 # Ejemplo de uso
 if __name__ == "__main__":  
+    # INFO muestra el avance por cuenta; DEBUG agrega el detalle de cada tweet
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Lista de cuentas a raspar
     accounts = [
         "https://x.com/BurgerKingMX",
@@ -627,14 +1057,39 @@ if __name__ == "__main__":
     ]
     
     # Iniciar el scraper (False para ver el navegador, True para modo headless)
-    scraper = TwitterScraper(headless=False)
+    # El modo "js" lee todos los tweets visibles con un solo execute_script por scroll
+    # El perfil persistente conserva cookies y caché entre ejecuciones
+    # El perfil de bloqueo "lite" evita descargar imágenes, video, fuentes y analítica
+    # El navegador se recicla cada 50 cuentas o si su memoria crece demasiado (recycle_policy)
+    scraper = TwitterScraper(headless=False, extraction_mode="js",
+                             session=BrowserSession(profile_dir=".browser_session/twitter"),
+                             blocking_profile="lite")
     
     try:
         # Directorio donde se guardarán los archivos CSV
         output_directory = "twitter_extracciones"
         
         # Raspar tweets por cuenta (20 tweets por cuenta, menos de 2 años de antigüedad)
-        scraper.scrape_multiple_accounts(accounts, output_directory, 20)
+        # Solo se extraen los tweets publicados desde la ejecución anterior
+        # Los destinos y extras opcionales se importan solo si se usan (Parquet requiere pyarrow):
+        # Para Parquet tipado y particionado: sink=sinks.ParquetSink(output_directory)
+        # Para una base con un tweet por ID y el historial de sus contadores:
+        # sink=sinks.DatabaseSink(os.path.join(output_directory, "tweets.db"))
+        # Para contadores exactos en lugar de "10.2K": TwitterScraper(..., enricher=enrichment.ExactCountEnricher())
+        # En modo "dom", TwitterScraper(..., selector_registry=SelectorRegistry(selector_registry.SELECTORS_FILE))
+        # conserva entre ejecuciones el selector que funciona para cada campo
+        # Las métricas por cuenta se agregan a metricas.jsonl; para Prometheus:
+        # metrics_writer=metrics.PrometheusMetricsWriter(os.path.join(output_directory, "scraper.prom"))
+        # Si la extracción se interrumpe, la siguiente ejecución la reanuda desde checkpoint.jsonl
+        scraper.scrape_multiple_accounts(accounts, output_directory, 20, state_store=StateStore(),
+                                         metrics_writer=JsonLinesMetricsWriter(os.path.join(output_directory, "metricas.jsonl")),
+                                         checkpoint=CheckpointJournal(os.path.join(output_directory, "checkpoint.jsonl")))
+        
+        # Alternativa para muchas cuentas: varios navegadores en paralelo
+        # scrape_multiple_accounts_parallel(accounts, output_directory, 20, num_workers=3)
+        # Para repartir la carga entre varios proxies (ver identities.load_identity_pool):
+        # scrape_multiple_accounts_parallel(accounts, output_directory, 20, num_workers=3,
+        #                                   identity_pool=load_identity_pool("identidades.json"))
     finally:
         # Asegurar que el navegador se cierre correctamente
         del scraper
\ No newline at end of file